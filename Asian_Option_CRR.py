@@ -1,7 +1,9 @@
-import networkx as nx
-from scipy.stats import norm
 import numpy as np
 
+from instrumentation import phase
+import treeKernels
+from treeLayout import tree_layout
+
 #######################################################################################################################
 ### Asian Option
 ### CRR model
@@ -30,8 +32,6 @@ def RepStrat_Asian_Option_CRR(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
     ####################################################################################################################
     #####################                  START accounts initialization                           #####################
 
-    G_Stock, G_Intrinsic, G_Price, G_Portfolio, G_CashAccount, G_Shares = nx.Graph(), nx.Graph(), nx.Graph(), nx.Graph(), nx.Graph(), nx.Graph()
-
     stockprices, sumstockprices, optionintrinsicvalue, optionprice, CashAccount, NbrOfShares, Portfolio = {}, {}, {}, {}, {}, {}, {}
 
     #####################                      END accounts initialization                         #####################
@@ -57,30 +57,11 @@ def RepStrat_Asian_Option_CRR(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
     stockprices[(1, 2)] = S*d
     sumstockprices[(1, 2)] = S*d
 
-    # Create the edges, compute the stock price and option intrinsic value at all nodes
+    # Compute the stock price and option intrinsic value at all nodes
     for i in range(0, tree__periods + 1):
         counter = 0
         for j in range(1, (2 ** i) + 1):
             if i < tree__periods:
-                # CREATION OF THE EDGES
-                G_Stock.add_edge((i, j), (i + 1, j + counter))
-                G_Stock.add_edge((i, j), (i + 1, j + 1 + counter))
-
-                G_Intrinsic.add_edge((i, j), (i + 1, j + counter))
-                G_Intrinsic.add_edge((i, j), (i + 1, j + 1 + counter))
-
-                G_Price.add_edge((i, j), (i + 1, j + counter))
-                G_Price.add_edge((i, j), (i + 1, j + 1 + counter))
-
-                G_Portfolio.add_edge((i, j), (i + 1, j + counter))
-                G_Portfolio.add_edge((i, j), (i + 1, j + 1 + counter))
-
-                G_CashAccount.add_edge((i, j), (i + 1, j + counter))
-                G_CashAccount.add_edge((i, j), (i + 1, j + 1 + counter))
-
-                G_Shares.add_edge((i, j), (i + 1, j + counter))
-                G_Shares.add_edge((i, j), (i + 1, j + 1 + counter))
-
                 # stock price and option intrinsic value at all nodes
                 stockprices[(i, j)] = stockprices[(i, j)]
                 stockprices[(i + 1, j + counter)] = stockprices[(i, j)] * u
@@ -137,17 +118,9 @@ def RepStrat_Asian_Option_CRR(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
                 CashAccount[(i, j)] = CashAccount[(i, j)] + NbrOfShares[(i, j)] * stockprices[(i, j)]
                 NbrOfShares[(i, j)] = 0
 
-    # creating the nodes itself in the networkx graph
-    pos = {}
-    count = tree__periods
-    for node in G_Stock.nodes():
-        pos[node] = (node[0], tree__periods + 2 + node[0] - (2 + count) * node[1])
-        count += 1
-
-    edge_x = []
-    edge_y = []
-    node_x = []
-    node_y = []
+    # node and edge coordinates, nodes listed level by level
+    edge_x, edge_y, node_x, node_y = tree_layout(tree__periods)
+
     stocksLabel = []
     optionpriceLabel = []
     portfolioLabel = []
@@ -155,28 +128,722 @@ def RepStrat_Asian_Option_CRR(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
     nbrofsharesLabel = []
     SumStockPricesLabel = []
 
-    for edge in G_Stock.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edge_x.append(x0)
-        edge_x.append(x1)
-        edge_x.append(None)
-        edge_y.append(y0)
-        edge_y.append(y1)
-        edge_y.append(None)
-
-
-    for node in pos:
-        x, y = pos[node]
-        node_x.append(x)
-        node_y.append(y)
-
-        stocksLabel.append(round(stockprices[node],2))
-        SumStockPricesLabel.append(round(sumstockprices[node],2))
-        optionpriceLabel.append(round(optionprice[node],2))
-        portfolioLabel.append(round(Portfolio[node],2))
-        cashLabel.append(round(CashAccount[node],2))
-        nbrofsharesLabel.append(round(NbrOfShares[node],2))
-                                                                                                   
+    for i in range(0, tree__periods + 1):
+        for j in range(1, (2 ** i) + 1):
+            node = (i, j)
+
+            stocksLabel.append(round(stockprices[node],2))
+            SumStockPricesLabel.append(round(sumstockprices[node],2))
+            optionpriceLabel.append(round(optionprice[node],2))
+            portfolioLabel.append(round(Portfolio[node],2))
+            cashLabel.append(round(CashAccount[node],2))
+            nbrofsharesLabel.append(round(NbrOfShares[node],2))
+
     return nbrofsharesLabel, cashLabel, portfolioLabel, optionpriceLabel, SumStockPricesLabel, stocksLabel, edge_x, edge_y, node_x, node_y, round(u,2), round(d,2), round(probUp,2), round(probDown,2)
 
+
+
+
+#######################################################################################################################
+### Array-backed engine
+###
+### Same model and same outputs as RepStrat_Asian_Option_CRR, but each tree level i is stored as a contiguous numpy
+### array of 2**i entries. The children of node j (0-based) at level i sit at positions 2j (up) and 2j+1 (down) of
+### level i+1, so the forward and backward passes are whole-level vector operations instead of per-node dict lookups.
+#######################################################################################################################
+
+def _payoff_sign(CallOrPut):
+    if CallOrPut == "Call":
+        return 1
+    elif CallOrPut == "Put":
+        return -1
+    raise ValueError(f"CallOrPut must be 'Call' or 'Put', got {CallOrPut!r}")
+
+
+# dt, up factor, down factor, discounting factor, probUpFactor, probDownFact
+def _crr_factors(rf, T, mu, vol, tree__periods):
+    step = T / tree__periods
+    u = np.exp(mu * step + vol * np.sqrt(step))
+    d = np.exp(mu * step - vol * np.sqrt(step))
+
+    discFact = np.exp(-rf * step)
+
+    probUp = (np.exp(rf * step) - d) / (u - d)
+    probDown = 1 - probUp
+
+    return step, u, d, discFact, probUp, probDown
+
+
+# one level of each pass, as numpy expressions over the strided children. treeKernels replaces them with compiled
+# loops doing the same operations when numba is installed.
+def _numpy_forward_step(stock, cumsum, u, d):
+    nextStock = np.empty(2 * stock.size)
+    nextStock[0::2] = stock * u
+    nextStock[1::2] = stock * d
+
+    nextSum = np.empty(2 * stock.size)
+    nextSum[0::2] = nextStock[0::2] + cumsum
+    nextSum[1::2] = nextStock[1::2] + cumsum
+    return nextStock, nextSum
+
+
+def _numpy_backward_step(children, discFact, probUp, probDown):
+    return discFact * (probUp * children[0::2] + probDown * children[1::2])
+
+
+def _numpy_replication_step(stock, nextStock, portfolio, children, u, d, growth):
+    shares = (children[0::2] - children[1::2]) / ((u - d) * stock)
+    cash = portfolio - shares * stock
+    return shares, cash, np.repeat(cash * growth, 2) + np.repeat(shares, 2) * nextStock
+
+
+if treeKernels.ENABLED:
+    _forward_step, _backward_step = treeKernels.forward_step, treeKernels.backward_step
+    _replication_step = treeKernels.replication_step
+else:
+    _forward_step, _backward_step, _replication_step = _numpy_forward_step, _numpy_backward_step, _numpy_replication_step
+
+
+# stock price and cumulative sum of stock prices, level by level. on_level, if given, is called after each level
+# (progress reporting and cancellation of background jobs), as in the two passes below.
+def _forward_levels(S, u, d, tree__periods, on_level=None):
+    stockprices = [np.array([S], dtype=float)]
+    sumstockprices = [np.array([S], dtype=float)]
+
+    for i in range(tree__periods):
+        nextStock, nextSum = _forward_step(stockprices[-1], sumstockprices[-1], u, d)
+        stockprices.append(nextStock)
+        sumstockprices.append(nextSum)
+        if on_level is not None:
+            on_level()
+
+    return stockprices, sumstockprices
+
+
+# payoff on the average of the tree__periods + 1 observed prices (t=0 included), as optionintrinsicvalue does
+def _asian_payoff(phi, K, sumstockprices_leaves, tree__periods):
+    return np.maximum(phi * (((1 / (tree__periods + 1)) * sumstockprices_leaves) - K), 0)
+
+
+# option price at all levels, filled backwards from the payoff
+def _backward_levels(payoff, discFact, probUp, probDown, tree__periods, on_level=None):
+    optionprice = [None] * (tree__periods + 1)
+    optionprice[tree__periods] = payoff
+
+    for i in range(tree__periods - 1, -1, -1):
+        optionprice[i] = _backward_step(optionprice[i + 1], discFact, probUp, probDown)
+        if on_level is not None:
+            on_level()
+
+    return optionprice
+
+
+# shares, cash account and portfolio at all levels. Levels 0..N-1 hold the values after rebalancing,
+# the portfolio of levels 1..N the value before rebalancing, and the leaves the liquidated position.
+def _replication_levels(stockprices, optionprice, u, d, rf, step, tree__periods, on_level=None):
+    growth = np.exp(rf * step)
+
+    NbrOfShares, CashAccount, Portfolio = [], [], [optionprice[0]]
+
+    for i in range(tree__periods):
+        shares, cash, nextPortfolio = _replication_step(stockprices[i], stockprices[i + 1], Portfolio[i],
+                                                        optionprice[i + 1], u, d, growth)
+        NbrOfShares.append(shares)
+        CashAccount.append(cash)
+        Portfolio.append(nextPortfolio)
+        if on_level is not None:
+            on_level()
+
+    NbrOfShares.append(np.zeros(2 ** tree__periods))
+    CashAccount.append(Portfolio[tree__periods])
+
+    return NbrOfShares, CashAccount, Portfolio
+
+
+def _levels_label(levels):
+    return np.round(np.concatenate(levels), 2).tolist()
+
+
+def RepStrat_Asian_Option_CRR_Array(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    phi = _payoff_sign(CallOrPut)
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+
+    with phase("forward", tree__periods):
+        stockprices, sumstockprices = _forward_levels(S, u, d, tree__periods)
+    with phase("payoff", tree__periods):
+        payoff = _asian_payoff(phi, K, sumstockprices[tree__periods], tree__periods)
+    with phase("backward", tree__periods):
+        optionprice = _backward_levels(payoff, discFact, probUp, probDown, tree__periods)
+    with phase("replication", tree__periods):
+        NbrOfShares, CashAccount, Portfolio = _replication_levels(stockprices, optionprice, u, d, rf, step,
+                                                                  tree__periods)
+
+    with phase("layout", tree__periods):
+        edge_x, edge_y, node_x, node_y = tree_layout(tree__periods)
+
+    # one "labels" phase per label list, as in the staged engine
+    labels = ()
+    for levels in (NbrOfShares, CashAccount, Portfolio, optionprice, sumstockprices, stockprices):
+        with phase("labels", tree__periods):
+            labels += (_levels_label(levels),)
+
+    return labels + (edge_x, edge_y, node_x, node_y, round(u,2), round(d,2), round(probUp,2), round(probDown,2))
+
+
+# min, median and max of the values of each level
+def _levels_bands(levels):
+    return ([float(level.min()) for level in levels], [float(np.median(level)) for level in levels],
+            [float(level.max()) for level in levels])
+
+
+# level-of-detail version of RepStrat_Asian_Option_CRR_Array, for trees too large for per-node labels: the same six
+# quantities as (min, median, max) bands per level, then the rounded factors. No labels or layout are built.
+def RepStrat_Asian_Option_CRR_Bands(CallOrPut, S, K, rf, T, mu, vol, tree__periods, on_level=None):
+    phi = _payoff_sign(CallOrPut)
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+
+    with phase("forward", tree__periods):
+        stockprices, sumstockprices = _forward_levels(S, u, d, tree__periods, on_level)
+    with phase("payoff", tree__periods):
+        payoff = _asian_payoff(phi, K, sumstockprices[tree__periods], tree__periods)
+    with phase("bands", tree__periods):
+        sumsBands = _levels_bands(sumstockprices)
+    del sumstockprices
+
+    with phase("backward", tree__periods):
+        optionprice = _backward_levels(payoff, discFact, probUp, probDown, tree__periods, on_level)
+    with phase("replication", tree__periods):
+        NbrOfShares, CashAccount, Portfolio = _replication_levels(stockprices, optionprice, u, d, rf, step,
+                                                                  tree__periods, on_level)
+
+    with phase("bands", tree__periods):
+        bands = (tuple(_levels_bands(levels) for levels in (NbrOfShares, CashAccount, Portfolio, optionprice))
+                 + (sumsBands, _levels_bands(stockprices)))
+
+    return bands + (round(u,2), round(d,2), round(probUp,2), round(probDown,2))
+
+
+
+#######################################################################################################################
+### Pricing-only fast path
+###
+### Only the leaf level of the running sums is kept during the forward pass, and the backward induction folds the
+### price levels in place. No graph, layout, replication strategy or labels are computed.
+#######################################################################################################################
+
+# the first axis is the tree level; S, u and d may carry trailing batch dimensions (see price_asian_crr_batch)
+def _leaf_sums(S, u, d, tree__periods):
+    stock = np.asarray(S, dtype=float)[None, ...]
+    cumsum = stock.copy()
+
+    for i in range(tree__periods):
+        nextStock = np.empty((2 * stock.shape[0],) + stock.shape[1:])
+        nextStock[0::2] = stock * u
+        nextStock[1::2] = stock * d
+
+        nextSum = np.empty(nextStock.shape)
+        nextSum[0::2] = nextStock[0::2] + cumsum
+        nextSum[1::2] = nextStock[1::2] + cumsum
+
+        stock, cumsum = nextStock, nextSum
+
+    return cumsum
+
+
+# discounts the values of level `fromLevel` back to level `toLevel`
+def _backward_to_level(values, discFact, probUp, probDown, fromLevel, toLevel):
+    for i in range(fromLevel - 1, toLevel - 1, -1):
+        values = discFact * (probUp * values[0::2] + probDown * values[1::2])
+    return values
+
+
+def price_asian_crr(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    phi = _payoff_sign(CallOrPut)
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+
+    payoff = _asian_payoff(phi, K, _leaf_sums(S, u, d, tree__periods), tree__periods)
+
+    return float(_backward_to_level(payoff, discFact, probUp, probDown, tree__periods, 0)[0])
+
+
+# number of shares and cash account of the replicating portfolio at t=0, after rebalancing
+def hedge_asian_crr(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    phi = _payoff_sign(CallOrPut)
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+
+    payoff = _asian_payoff(phi, K, _leaf_sums(S, u, d, tree__periods), tree__periods)
+    priceUp, priceDown = _backward_to_level(payoff, discFact, probUp, probDown, tree__periods, 1)
+    price = discFact * (probUp * priceUp + probDown * priceDown)
+
+    delta = (priceUp - priceDown) / ((u - d) * S)
+    cash = price - delta * S
+
+    return float(delta), float(cash)
+
+
+
+#######################################################################################################################
+### Recombining lattice with representative running sums (Hull-White)
+###
+### The stock follows the recombining CRR lattice: node k of level i (k down moves) has price S u^(i-k) d^k. Each
+### node carries grid_points representative running sums, spread geometrically over the running sums reachable at
+### that node. During the backward induction, the option value at a child node is interpolated (quadratic, three
+### points) on the child's grid. Cost is O(tree__periods^2 * grid_points) instead of 2**tree__periods.
+###
+### For long trees the reachable range (all ups then all downs vs the reverse) is far wider than the range the
+### paths actually visit, so each grid is also capped to band_width standard deviations of the Brownian bridge
+### around the log-linear path from S to the node. Sums outside a child's grid are extrapolated along the line
+### through the two grid points at that edge, rather than given the edge value: a capped grid cuts off paths deep
+### in (or out of) the money, where the value is close to linear in the running sum, and a constant there biases
+### the price by an amount that no number of grid points removes.
+###
+### Likewise, only the nodes within node_width standard deviations of the number of down moves (binomial under the
+### risk-neutral probabilities) are kept at each level: about 8 sqrt(i) nodes instead of i + 1, so the cost grows
+### like tree__periods^1.5 beyond the first 60 or so levels, which are kept whole. A kept node whose child falls
+### outside the window moves to the nearest kept child; its probability is below 1e-15 with the default width.
+###
+### With the default band and the app's inputs the grids are not capped below about 100 periods, and the error
+### against the exact tree is then that of the interpolation alone: it falls as grid_points grows, though not at every
+### step while the grid points are coarse next to the kink of the payoff (see benchmarks/lattice_convergence.py).
+###
+### SOURCES:
+# Hull, J. and White, A. (1993). Efficient procedures for valuing European and American path-dependent options.
+# The Journal of Derivatives, 1(1), 21-31.
+#######################################################################################################################
+
+def _lattice_stock(S, u, d, level, k=None):
+    k = np.arange(level + 1) if k is None else k
+    return S * u ** (level - k) * d ** k
+
+
+# first and last node kept at each level, within node_width standard deviations of the binomial number of down moves
+def _lattice_windows(tree__periods, probDown, node_width):
+    i = np.arange(tree__periods + 1)
+    mean, sd = i * probDown, np.sqrt(i * probDown * (1 - probDown))
+    first = np.maximum(np.floor(mean - node_width * sd), 0).astype(np.intp)
+    last = np.minimum(np.ceil(mean + node_width * sd), i).astype(np.intp)
+    return first, last
+
+
+# nodes the lattice visits (the time units of the cost model), for the app inputs' probDown of about 1/2
+def lattice_nodes(tree__periods, node_width=8.0):
+    first, last = _lattice_windows(tree__periods, 0.5, node_width)
+    return int(np.sum(last - first + 1))
+
+
+# log of the lowest and highest representative running sum at the kept nodes of each level (first to last)
+def _lattice_sum_bounds(S, u, d, vol, step, tree__periods, band_width, first, last):
+    sumMin, sumMax = np.array([float(S)]), np.array([float(S)])
+    logMin, logMax = [np.log(sumMin)], [np.log(sumMax)]
+
+    for i in range(1, tree__periods + 1):
+        stock = _lattice_stock(S, u, d, i)
+        # node k is reached by an up move from node k (k < i) or a down move from node k-1 (k > 0)
+        sumMin = np.minimum(np.append(sumMin, np.inf), np.insert(sumMin, 0, np.inf)) + stock
+        sumMax = np.maximum(np.append(sumMax, -np.inf), np.insert(sumMax, 0, -np.inf)) + stock
+
+        # running sum along the log-linear path from S to the node
+        ratio = (stock / S) ** (1 / i)
+        flat = np.isclose(ratio, 1)
+        centre = np.log(np.where(flat, (i + 1) * S, S * (ratio ** (i + 1) - 1) / np.where(flat, 2, ratio - 1)))
+        halfWidth = band_width * vol * np.sqrt(i * step) / 2
+
+        kept = slice(first[i], last[i] + 1)
+        logMin.append(np.maximum(np.log(sumMin[kept]), centre[kept] - halfWidth))
+        logMax.append(np.minimum(np.log(sumMax[kept]), centre[kept] + halfWidth))
+
+    return logMin, logMax
+
+
+def _lattice_grid(logMin, logMax, grid_points):
+    return np.exp(logMin[:, None] + np.linspace(0, 1, grid_points)[None, :] * (logMax - logMin)[:, None])
+
+
+# slope and half curvature, in grid steps, of the three-point quadratic around each grid point of each node; the edge
+# points get the line through them and their neighbour, which also extrapolates beyond the grid
+def _lattice_coefficients(values):
+    slope, curvature = np.empty_like(values), np.zeros_like(values)
+    slope[:, 1:-1] = (values[:, 2:] - values[:, :-2]) / 2
+    curvature[:, 1:-1] = (values[:, 2:] - 2 * values[:, 1:-1] + values[:, :-2]) / 2
+    slope[:, 0] = values[:, 1] - values[:, 0]
+    slope[:, -1] = values[:, -1] - values[:, -2]
+    return slope, curvature
+
+
+# values at running sums x (one row per parent), interpolated around the nearest grid point of the child node rows
+def _lattice_interp(values, slope, curvature, rows, logMin, scale, x):
+    grid_points = values.shape[1]
+    # scale is (grid_points - 1) / grid width, 0 for nodes reached by a single path (all their sums are the same)
+    position = np.log(x)
+    position -= logMin[rows, None]
+    position *= scale[rows, None]
+
+    centre = np.clip(np.rint(position), 0, grid_points - 1)
+    position -= centre
+    flatCentre = centre.astype(np.intp)
+    flatCentre += rows[:, None] * grid_points
+    slope, curvature = slope.ravel()[flatCentre], curvature.ravel()[flatCentre]
+    return values.ravel()[flatCentre] + position * (slope + position * curvature)
+
+
+# returns the t=0 price, and the root number of shares (V_1u - V_1d) / ((u - d) S) if return_delta
+def price_asian_crr_lattice(CallOrPut, S, K, rf, T, mu, vol, tree__periods, grid_points=50, band_width=5.0,
+                            node_width=8.0, return_delta=False):
+    if grid_points < 3:
+        raise ValueError("grid_points must be at least 3")
+
+    phi = _payoff_sign(CallOrPut)
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+    first, last = _lattice_windows(tree__periods, probDown, node_width)
+    logMin, logMax = _lattice_sum_bounds(S, u, d, vol, step, tree__periods, band_width, first, last)
+
+    values = _asian_payoff(phi, K, _lattice_grid(logMin[tree__periods], logMax[tree__periods], grid_points),
+                           tree__periods)
+
+    # rows of values and of logMin/logMax are the kept nodes, first[i] to last[i]
+    for i in range(tree__periods - 1, -1, -1):
+        k = np.arange(first[i], last[i] + 1)
+        grid = _lattice_grid(logMin[i], logMax[i], grid_points)
+
+        childStock = _lattice_stock(S, u, d, i + 1, np.arange(first[i + 1], last[i + 1] + 1))
+        childMin = logMin[i + 1]
+        childWidth = logMax[i + 1] - childMin
+        scale = np.where(childWidth > 0, (grid_points - 1) / np.where(childWidth > 0, childWidth, 1), 0)
+        slope, curvature = _lattice_coefficients(values)
+
+        up = np.clip(k - first[i + 1], 0, len(childStock) - 1)
+        down = np.clip(k + 1 - first[i + 1], 0, len(childStock) - 1)
+        valueUp = _lattice_interp(values, slope, curvature, up, childMin, scale, grid + childStock[up, None])
+        valueDown = _lattice_interp(values, slope, curvature, down, childMin, scale, grid + childStock[down, None])
+        values = discFact * (probUp * valueUp + probDown * valueDown)
+
+    if not return_delta:
+        return float(values[0, 0])
+    # the root grid is the single running sum S, so every grid point holds the level-1 values
+    return float(values[0, 0]), float((valueUp[0, 0] - valueDown[0, 0]) / ((u - d) * S))
+
+
+
+#######################################################################################################################
+### Batch pricing
+###
+### Prices many contracts sharing the same number of tree periods in one pass. Inputs are broadcast to a common batch
+### shape and every tree level becomes a (2**i, batch) array, so the per-contract and per-node Python overhead is paid
+### once per level instead.
+#######################################################################################################################
+
+def _payoff_signs(CallOrPut):
+    CallOrPut = np.asarray(CallOrPut)
+    isCall, isPut = CallOrPut == "Call", CallOrPut == "Put"
+    if not np.all(isCall | isPut):
+        raise ValueError("CallOrPut must only contain 'Call' or 'Put'")
+    return np.where(isCall, 1, -1)
+
+
+# contracts are priced in chunks whose leaf level holds about this many nodes, to stay cache-sized
+_BATCH_CHUNK_NODES = 2 ** 17
+_BATCH_MIN_CHUNK = 64
+
+
+# levels are (2**i, contracts) arrays, so each parent/child slice is a contiguous run over the contracts
+def _price_batch_chunk(phi, S, K, rf, T, mu, vol, tree__periods):
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+
+    payoff = _asian_payoff(phi, K, _leaf_sums(S, u, d, tree__periods), tree__periods)
+    priceUp, priceDown = _backward_to_level(payoff, discFact, probUp, probDown, tree__periods, 1)
+
+    price = discFact * (probUp * priceUp + probDown * priceDown)
+    delta = (priceUp - priceDown) / ((u - d) * S)
+    return price, delta
+
+
+# returns an array of t=0 prices with the broadcast shape of the inputs, and the root number of shares if return_delta
+def price_asian_crr_batch(CallOrPut, S, K, rf, T, mu, vol, tree__periods, return_delta=False):
+    phi, S, K, rf, T, mu, vol = np.broadcast_arrays(_payoff_signs(CallOrPut), S, K, rf, T, mu, vol)
+    shape = S.shape
+    inputs = [np.ravel(x).astype(float) for x in (phi, S, K, rf, T, mu, vol)]
+
+    price, delta = np.empty(S.size), np.empty(S.size)
+    chunk = _BATCH_CHUNK_NODES >> tree__periods
+    if chunk >= _BATCH_MIN_CHUNK:
+        for start in range(0, S.size, chunk):
+            price[start:start + chunk], delta[start:start + chunk] = _price_batch_chunk(
+                *(x[start:start + chunk] for x in inputs), tree__periods)
+    else:
+        # one contract already fills the cache, vectorizing across contracts would only add broadcasting overhead
+        for n in range(S.size):
+            price[n], delta[n] = _price_batch_chunk(*(x[n] for x in inputs), tree__periods)
+
+    if not return_delta:
+        return price.reshape(shape)
+    return price.reshape(shape), delta.reshape(shape)
+
+
+
+#######################################################################################################################
+### Streaming price-only mode
+###
+### Prices deep trees with bounded memory. The tree is cut at level m = tree__periods - b, where b is the deepest
+### subtree that fits in max_memory_bytes. Every subtree below a level-m node (stock s, running sum A) has the same
+### shape, and its leaf running sums are A + s * P, with P the partial sums of the relative path u, ud, ... of depth b.
+### P is computed once; each of the 2**m subtrees is then priced with the usual vectorized backward induction and the
+### level-m values are folded back to t=0. Peak memory is a few arrays of 2**b floats whatever tree__periods is; the
+### runtime is still proportional to 2**tree__periods.
+#######################################################################################################################
+
+# peak bytes per subtree leaf: P, the payoff being folded, and the temporaries of building P / folding the payoff
+_STREAMING_BYTES_PER_LEAF = 32
+
+
+def price_asian_crr_streaming(CallOrPut, S, K, rf, T, mu, vol, tree__periods, max_memory_bytes=64 * 2 ** 20):
+    phi = _payoff_sign(CallOrPut)
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+
+    subtreePeriods = min(tree__periods, max(0, int(np.log2(max(max_memory_bytes, 1) / _STREAMING_BYTES_PER_LEAF))))
+    cutLevel = tree__periods - subtreePeriods
+
+    stockprices, sumstockprices = _forward_levels(S, u, d, cutLevel)
+    relativeSums = _leaf_sums(1.0, u, d, subtreePeriods) - 1
+
+    cutValues = np.empty(2 ** cutLevel)
+    for n in range(2 ** cutLevel):
+        # same operations, in the same order, as _asian_payoff, done in place
+        values = relativeSums * stockprices[cutLevel][n]
+        values += sumstockprices[cutLevel][n]
+        values *= 1 / (tree__periods + 1)
+        values -= K
+        values *= phi
+        np.maximum(values, 0, out=values)
+
+        cutValues[n] = _backward_to_level(values, discFact, probUp, probDown, subtreePeriods, 0)[0]
+
+    return float(_backward_to_level(cutValues, discFact, probUp, probDown, cutLevel, 0)[0])
+
+
+
+#######################################################################################################################
+### Analytic prices
+###
+### Under the continuous-time limit of the model (geometric Brownian motion, drift rf under the pricing measure), on the
+### same tree__periods + 1 equally spaced averaging dates as the tree (t=0 included):
+###
+###   - price_asian_geometric: the geometric average is lognormal, so the option on it has a Black-Scholes type price
+###   - price_asian_levy: the arithmetic average is approximated by the lognormal with the same first two moments
+###
+### mu only shapes the CRR up/down factors, not the risk-neutral dynamics, so it does not appear in the formulas. Both
+### take scalars or numpy arrays (broadcast together). The normal CDF is scipy's ndtr, which is what norm.cdf calls
+### once it has validated its arguments; on a scalar that validation alone costs about 50 microseconds. scipy.special
+### is imported on the first call rather than with this module: it is a tenth of a second of the app's startup.
+###
+### SOURCES:
+# Kemna, A. G. Z. and Vorst, A. C. F. (1990). A pricing method for options based on average asset values.
+# Journal of Banking and Finance, 14(1), 113-129.
+#
+# Turnbull, S. M. and Wakeman, L. M. (1991). A quick algorithm for pricing European average options. Journal of
+# Financial and Quantitative Analysis, 26(3), 377-389.
+#
+# Levy, E. (1992). Pricing European average rate currency options. Journal of International Money and Finance,
+# 11(5), 474-491.
+#######################################################################################################################
+
+def _as_result(x):
+    return float(x) if np.ndim(x) == 0 else x
+
+
+# discounted Black-Scholes type price of an option on a lognormal average with the given forward and log variance
+def _lognormal_average_price(phi, forward, logVariance, K, rf, T):
+    from scipy.special import ndtr
+
+    logStd = np.sqrt(np.maximum(logVariance, 0))
+    safeStd = np.where(logStd > 0, logStd, 1)
+
+    d1 = (np.log(forward / K) + logVariance / 2) / safeStd
+    d2 = d1 - safeStd
+    price = phi * (forward * ndtr(phi * d1) - K * ndtr(phi * d2))
+
+    # no volatility: the average is known, the option is worth its discounted intrinsic value
+    price = np.where(logStd > 0, price, np.maximum(phi * (forward - K), 0))
+    return np.exp(-rf * T) * price
+
+
+def price_asian_geometric(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    phi = _payoff_signs(CallOrPut)
+    step = np.asarray(T) / tree__periods
+
+    logMean = np.log(S) + (rf - vol ** 2 / 2) * T / 2
+    logVariance = vol ** 2 * step * tree__periods * (2 * tree__periods + 1) / (6 * (tree__periods + 1))
+
+    return _as_result(_lognormal_average_price(phi, np.exp(logMean + logVariance / 2), logVariance, K, rf, T))
+
+
+# first two moments of the arithmetic average of S_0, ..., S_N
+def _arithmetic_average_moments(S, rf, T, vol, tree__periods):
+    S, rf, T, vol = (np.asarray(x, dtype=float)[..., None] for x in (S, rf, T, vol))
+    times = T / tree__periods * np.arange(tree__periods + 1)
+
+    growth = np.exp(rf * times)
+    laterGrowth = np.cumsum(growth[..., ::-1], axis=-1)[..., ::-1] - growth
+    varianceGrowth = np.exp(vol ** 2 * times)
+
+    firstMoment = S[..., 0] * growth.mean(axis=-1)
+    # E[S_i S_j] = S^2 exp(rf (t_i + t_j) + vol^2 min(t_i, t_j)), the diagonal once and the pairs i < j twice
+    secondMoment = (S[..., 0] / (tree__periods + 1)) ** 2 * np.sum(
+        growth * varianceGrowth * (growth + 2 * laterGrowth), axis=-1)
+    return firstMoment, secondMoment
+
+
+def price_asian_levy(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    phi = _payoff_signs(CallOrPut)
+    firstMoment, secondMoment = _arithmetic_average_moments(S, rf, T, vol, tree__periods)
+    logVariance = np.log(secondMoment / firstMoment ** 2)
+
+    return _as_result(_lognormal_average_price(phi, firstMoment, logVariance, K, rf, T))
+
+
+#######################################################################################################################
+### Greeks
+###
+### All Greeks from one forward and one backward pass over the tree.
+###
+###   - delta and gamma are read from the option prices of levels 1 and 2, as differences over the stock prices
+###   - vega, rho and theta are the exact derivatives of the tree price with respect to vol, rf and T. The price is
+###     differentiated with respect to u and d (pathwise, through the running sums of the payoffs), probUp and
+###     discFact, and these are chained with the derivatives of the factors. Theta is -dV/dT, with the number of
+###     periods held fixed.
+###
+### Each pass carries three extra arrays per level, so the Greeks cost about four prices, where bump-and-reprice of
+### vega, rho and theta by central differences costs six (see benchmarks/bench_greeks.py).
+#######################################################################################################################
+
+# derivatives of u, d, discFact and probUp with respect to (vol, rf, T)
+def _crr_factor_sensitivities(rf, T, mu, vol, tree__periods):
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+    growth = np.exp(rf * step)
+    sqrtStep = np.sqrt(step)
+
+    du = np.array([u * sqrtStep, 0, u * (mu + vol / (2 * sqrtStep)) / tree__periods])
+    dd = np.array([-d * sqrtStep, 0, d * (mu - vol / (2 * sqrtStep)) / tree__periods])
+    dGrowth = np.array([0, step * growth, rf * growth / tree__periods])
+    dDiscFact = np.array([0, -step * discFact, -rf * discFact / tree__periods])
+    dProbUp = (dGrowth - dd) / (u - d) - (growth - d) * (du - dd) / (u - d) ** 2
+
+    return du, dd, dDiscFact, dProbUp
+
+
+# returns a dict with the price and its delta, gamma, vega, rho and theta
+def greeks_asian_crr(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    phi = _payoff_sign(CallOrPut)
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+    du, dd, dDiscFact, dProbUp = _crr_factor_sensitivities(rf, T, mu, vol, tree__periods)
+
+    # forward pass: stock prices and running sums, and the running sums of the stock price times the number of up
+    # (resp. down) moves so far, which divided by u (resp. d) are the derivatives of the running sums with respect
+    # to u (resp. d)
+    stock, upWeighted, downWeighted = (np.array([x]) for x in (float(S), 0.0, 0.0))
+    cumsum, upCumsum, downCumsum = stock.copy(), upWeighted.copy(), downWeighted.copy()
+    for i in range(tree__periods):
+        nextArrays = [np.empty(2 * stock.size) for _ in range(6)]
+        nextStock, nextUp, nextDown, nextSum, nextUpSum, nextDownSum = nextArrays
+
+        nextStock[0::2], nextStock[1::2] = stock * u, stock * d
+        nextUp[0::2], nextUp[1::2] = (upWeighted + stock) * u, upWeighted * d
+        nextDown[0::2], nextDown[1::2] = downWeighted * u, (downWeighted + stock) * d
+        for level, running, total in ((nextStock, cumsum, nextSum), (nextUp, upCumsum, nextUpSum),
+                                      (nextDown, downCumsum, nextDownSum)):
+            total[0::2], total[1::2] = level[0::2] + running, level[1::2] + running
+
+        stock, upWeighted, downWeighted, cumsum, upCumsum, downCumsum = nextArrays
+
+    # backward pass: option prices, and their partial derivatives with respect to u and d (through the payoffs) and
+    # probUp. The one with respect to discFact is tree__periods * price / discFact.
+    values = _asian_payoff(phi, K, cumsum, tree__periods)
+    inTheMoney = phi * (values > 0) / (tree__periods + 1)
+    valuesU, valuesD, valuesP = inTheMoney * upCumsum / u, inTheMoney * downCumsum / d, np.zeros(values.size)
+
+    levels = {tree__periods: values}
+    for i in range(tree__periods - 1, -1, -1):
+        up, down = values[0::2], values[1::2]
+        valuesP = discFact * (probUp * valuesP[0::2] + probDown * valuesP[1::2] + up - down)
+        valuesU = discFact * (probUp * valuesU[0::2] + probDown * valuesU[1::2])
+        valuesD = discFact * (probUp * valuesD[0::2] + probDown * valuesD[1::2])
+        values = discFact * (probUp * up + probDown * down)
+        levels[i] = values
+
+    price, dPriceDu, dPriceDd, dPriceDProbUp = values[0], valuesU[0], valuesD[0], valuesP[0]
+    vega, rho, dPriceDT = (dPriceDu * du + dPriceDd * dd + dPriceDProbUp * dProbUp
+                           + tree__periods * price / discFact * dDiscFact)
+
+    priceUp, priceDown = levels[1]
+    delta = (priceUp - priceDown) / (S * u - S * d)
+
+    gamma = float("nan")
+    if tree__periods >= 2:
+        upUp, upDown, downUp, downDown = levels[2]
+        deltaUp = (upUp - upDown) / (S * u * (u - d))
+        deltaDown = (downUp - downDown) / (S * d * (u - d))
+        gamma = (deltaUp - deltaDown) / ((S * u * u - S * d * d) / 2)
+
+    return {"price": float(price), "delta": float(delta), "gamma": float(gamma),
+            "vega": float(vega), "rho": float(rho), "theta": float(-dPriceDT)}
+
+
+
+#######################################################################################################################
+### Path-sum compression
+###
+### The option value at a node only depends on its number of up moves (the stock price) and its running sum, so
+### paths reaching the same (up moves, running sum) state can be merged. Each level keeps its distinct states only,
+### with the index of the two children of each state in the next level, and the backward induction runs over the
+### distinct states. The price is the one of the full tree.
+###
+### Running sums are compared after rounding to a quantum of sum_tolerance times the largest sum of the level, so
+### that equal sums added up in different orders are merged despite their last bits.
+###
+### States mostly repeat when u d = 1, i.e. mu = 0: the price after m steps is S (ud)^(m/2) (u/d)^(h_m/2) with
+### h_m = ups - downs, so two paths have equal sums when they visit the same multiset of heights h_m. Otherwise
+### (ud)^(m/2) weighs each step differently and paths only meet when u^a d^b = 1 for small integers a, b (e.g. u d^2 = 1
+### with the app's defaults at 12 periods); for most mu != 0 nothing is merged and this mode costs more than
+### price_asian_crr.
+#######################################################################################################################
+
+# rounded sums are at most 1 / sum_tolerance < 2**40, so (ups, rounded sum) packs exactly into one float64 key
+_COMPRESSION_UPS_SHIFT = 2.0 ** 41
+
+
+# distinct (ups, sum) states of each level, the children of each state, and the number of paths merged into it
+def _compressed_levels(S, u, d, tree__periods, sum_tolerance):
+    ups, sums, paths = np.zeros(1), np.array([float(S)]), np.ones(1)
+    levels, children = [(ups, sums, paths)], []
+
+    for i in range(tree__periods):
+        childUps = np.concatenate([ups + 1, ups])
+        childSums = np.concatenate([sums, sums]) + S * u ** childUps * d ** (i + 1 - childUps)
+
+        keys = childUps * _COMPRESSION_UPS_SHIFT + np.round(childSums / (sum_tolerance * childSums.max()))
+        keys, first, stateOf = np.unique(keys, return_index=True, return_inverse=True)
+        children.append((stateOf[:ups.size], stateOf[ups.size:]))
+
+        ups, sums = childUps[first], childSums[first]
+        paths = np.bincount(stateOf, weights=np.concatenate([paths, paths]), minlength=keys.size)
+        levels.append((ups, sums, paths))
+
+    return levels, children
+
+
+# returns the price, and with return_stats the number of distinct states and of paths per level
+def price_asian_crr_compressed(CallOrPut, S, K, rf, T, mu, vol, tree__periods, sum_tolerance=1e-12,
+                               return_stats=False):
+    if sum_tolerance < 1e-12:
+        raise ValueError("sum_tolerance must be at least 1e-12")
+    phi = _payoff_sign(CallOrPut)
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+
+    levels, children = _compressed_levels(S, u, d, tree__periods, sum_tolerance)
+    values = _asian_payoff(phi, K, levels[tree__periods][1], tree__periods)
+    for childUp, childDown in reversed(children):
+        values = discFact * (probUp * values[childUp] + probDown * values[childDown])
+
+    if not return_stats:
+        return float(values[0])
+    return float(values[0]), {"states": [int(ups.size) for ups, sums, paths in levels],
+                              "paths": [int(paths.sum()) for ups, sums, paths in levels]}
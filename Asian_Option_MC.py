@@ -0,0 +1,154 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Asian_Option_CRR import _crr_factors, _payoff_sign, price_asian_geometric
+
+#######################################################################################################################
+### Asian Option
+### Monte Carlo
+###
+### Simulates the tree__periods + 1 averaged prices (t=0 included, as in the tree) either under the CRR up/down
+### dynamics of the tree ("crr") or under its continuous-time limit, geometric Brownian motion with drift rf ("gbm").
+### Variance is reduced with antithetic paths, and with the geometric-average Asian option as control variate. Its
+### exact price is known: the Kemna-Vorst closed form under "gbm", and a dynamic programme over the weighted number of
+### up moves under "crr".
+###
+### Under "crr" the first move is stratified: each simulated path of the remaining moves is evaluated after both an
+### up and a down first move. This gives the price and, with common random numbers, the root number of shares
+### (V_1u - V_1d) / ((u - d) S) of the replication strategy. Under "gbm" the delta is the pathwise estimate dV/dS.
+###
+### Paths are simulated in chunks of at most max_chunk_bytes, each chunk with its own random stream spawned from seed,
+### so the results only depend on seed, paths and the chunk size, whether the chunks run here or in worker processes.
+#######################################################################################################################
+
+# rough bytes per simulated path and per period, across the moves, their twins and the cumulative sums
+_BYTES_PER_PATH_PERIOD = 64
+
+
+# exact price of the geometric-average option in the CRR tree. The log move of step m enters the prices of steps
+# m..N, so it has weight N + 1 - m in the log of the geometric average: we track the distribution of the total
+# weight of the up moves.
+def _geometric_crr_price(phi, S, K, u, d, discFact, probUp, tree__periods):
+    distribution = np.ones(1)
+    for m in range(1, tree__periods + 1):
+        weight = tree__periods + 1 - m
+        nextDistribution = np.zeros(distribution.size + weight)
+        nextDistribution[:distribution.size] += (1 - probUp) * distribution
+        nextDistribution[weight:] += probUp * distribution
+        distribution = nextDistribution
+
+    upWeight = np.arange(distribution.size)
+    allDownWeight = tree__periods * (tree__periods + 1) / 2
+    logAverage = np.log(S) + (allDownWeight * np.log(d) + upWeight * (np.log(u) - np.log(d))) / (tree__periods + 1)
+
+    payoff = np.maximum(phi * (np.exp(logAverage) - K), 0)
+    return discFact ** tree__periods * np.dot(distribution, payoff)
+
+
+# arithmetic sum and geometric average of the prices of paths starting at S with the given log moves
+def _path_statistics(S, logMoves, tree__periods):
+    logPrices = np.cumsum(logMoves, axis=1)
+    sumPrices = S + S * np.exp(logPrices).sum(axis=1)
+    geometric = S * np.exp(logPrices.sum(axis=1) / (tree__periods + 1))
+    return sumPrices, geometric
+
+
+# per sample (antithetic twins averaged): discounted payoff, discounted geometric payoff, delta
+def _chunk_samples(rng, nbrPaths, phi, S, K, rf, T, mu, vol, tree__periods, dynamics, antithetic):
+    step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+    samples = []
+
+    if dynamics == "crr":
+        uniform = rng.random((nbrPaths, tree__periods - 1))
+        twins = (uniform, 1 - uniform) if antithetic else (uniform,)
+        for twin in twins:
+            remainingMoves = np.where(twin < probUp, np.log(u), np.log(d))
+            branches = []
+            for firstMove in (np.log(u), np.log(d)):
+                sumPrices, geometric = _path_statistics(
+                    S, np.hstack([np.full((nbrPaths, 1), firstMove), remainingMoves]), tree__periods)
+                branches.append((np.maximum(phi * (sumPrices / (tree__periods + 1) - K), 0),
+                                 np.maximum(phi * (geometric - K), 0)))
+            (payoffUp, geometricUp), (payoffDown, geometricDown) = branches
+
+            discount = discFact ** tree__periods
+            samples.append((discount * (probUp * payoffUp + probDown * payoffDown),
+                            discount * (probUp * geometricUp + probDown * geometricDown),
+                            discFact ** (tree__periods - 1) * (payoffUp - payoffDown) / ((u - d) * S)))
+    else:
+        normal = rng.standard_normal((nbrPaths, tree__periods))
+        twins = (normal, -normal) if antithetic else (normal,)
+        for twin in twins:
+            logMoves = (rf - vol ** 2 / 2) * step + vol * np.sqrt(step) * twin
+            sumPrices, geometric = _path_statistics(S, logMoves, tree__periods)
+            average = sumPrices / (tree__periods + 1)
+
+            discount = np.exp(-rf * T)
+            samples.append((discount * np.maximum(phi * (average - K), 0),
+                            discount * np.maximum(phi * (geometric - K), 0),
+                            discount * phi * (phi * (average - K) > 0) * average / S))
+
+    return [sum(twin) / len(samples) for twin in zip(*samples)]
+
+
+# count, means and co-moments of (payoff, control, delta) over one chunk
+def _chunk_moments(seed, nbrPaths, phi, S, K, rf, T, mu, vol, tree__periods, dynamics, antithetic):
+    price, control, delta = _chunk_samples(np.random.default_rng(seed), nbrPaths, phi, S, K, rf, T, mu, vol,
+                                           tree__periods, dynamics, antithetic)
+    samples = np.vstack([price, control, delta])
+    mean = samples.mean(axis=1)
+    centred = samples - mean[:, None]
+    return nbrPaths, mean, centred @ centred.T
+
+
+# pairwise merge of chunk moments (Chan et al.), so that chunks can be reduced in any grouping
+def _merge_moments(a, b):
+    countA, meanA, comomentA = a
+    countB, meanB, comomentB = b
+    count = countA + countB
+    shift = meanB - meanA
+    return count, meanA + shift * countB / count, comomentA + comomentB + np.outer(shift, shift) * countA * countB / count
+
+
+# returns the price, its standard error and the root delta
+def price_asian_mc(CallOrPut, S, K, rf, T, mu, vol, tree__periods, paths=100000, seed=None, dynamics="crr",
+                   antithetic=True, control_variate=True, max_chunk_bytes=64 * 2 ** 20, workers=None):
+    if dynamics not in ("crr", "gbm"):
+        raise ValueError(f"dynamics must be 'crr' or 'gbm', got {dynamics!r}")
+    if dynamics == "crr" and tree__periods < 1:
+        raise ValueError("tree__periods must be at least 1")
+
+    phi = _payoff_sign(CallOrPut)
+
+    chunkPaths = max(1, int(max_chunk_bytes // (_BYTES_PER_PATH_PERIOD * tree__periods)))
+    chunkSizes = [min(chunkPaths, paths - start) for start in range(0, paths, chunkPaths)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunkSizes))
+    arguments = (phi, S, K, rf, T, mu, vol, tree__periods, dynamics, antithetic)
+
+    if workers is None or workers <= 1:
+        chunks = [_chunk_moments(chunkSeed, size, *arguments) for chunkSeed, size in zip(seeds, chunkSizes)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_chunk_moments, seeds, chunkSizes, *([argument] * len(chunkSizes)
+                                                                             for argument in arguments)))
+
+    moments = chunks[0]
+    for chunk in chunks[1:]:
+        moments = _merge_moments(moments, chunk)
+    count, mean, comoment = moments
+    covariance = comoment / max(count - 1, 1)
+
+    price, variance = mean[0], covariance[0, 0]
+    if control_variate and covariance[1, 1] > 0:
+        if dynamics == "crr":
+            step, u, d, discFact, probUp, probDown = _crr_factors(rf, T, mu, vol, tree__periods)
+            controlPrice = _geometric_crr_price(phi, S, K, u, d, discFact, probUp, tree__periods)
+        else:
+            controlPrice = price_asian_geometric(CallOrPut, S, K, rf, T, mu, vol, tree__periods)
+
+        beta = covariance[0, 1] / covariance[1, 1]
+        price = price - beta * (mean[1] - controlPrice)
+        variance = variance - covariance[0, 1] ** 2 / covariance[1, 1]
+
+    return float(price), float(np.sqrt(max(variance, 0) / count)), float(mean[2])
@@ -5,14 +5,35 @@ import dash_html_components as html
 from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
 import plotly.graph_objs as go
-import base64
+import os
+import numpy as np
 
 # Replication strategy library
-from Asian_Option_CRR import *
+from Asian_Option_CRR import price_asian_crr_lattice, price_asian_levy
 
 # Input of rep strat descriptions
 from inputDescriptions import list_input
 
+# Memoization of the replication strategy
+from resultCache import cached_rep_strat, cached_rep_strat_bands, repStratCache, sharedTreeCache, stagedRepStrat
+
+# Compact dcc.Store payload
+from storeEncoding import encode_rep_strat, encode_bands, encode_hidden, decode_labels, decode_layout, decode_factors
+
+# Per-phase timings (ASIAN_INSTRUMENTATION=1)
+import instrumentation
+from instrumentation import callback_phase, phase
+
+# Compiled tree kernels when numba is installed (ASIAN_NUMBA)
+import treeKernels
+
+# Cost estimate of the requests, measured on first use (or read from ASIAN_COST_MODEL_FILE), and engine routing
+# (see costModel.py)
+from costModel import format_estimate, get_cost_model
+
+# Background computation of large trees (ASIAN_BACKGROUND_WORKERS > 0)
+from backgroundJobs import jobManager
+
 
 # Creating the app object from Dash library
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], #theme for modern-looking buttons, sliders, etc
@@ -21,6 +42,39 @@ app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], #theme fo
 	                      )
 server = app.server
 
+# Hit/miss counters of the replication strategy cache, to tune ASIAN_CACHE_MAX_BYTES
+@server.route("/cache-stats")
+def cache_stats():
+    stats = repStratCache.stats()
+    stats["stages"] = stagedRepStrat.stats()
+    if sharedTreeCache is not None:
+        stats["shared"] = sharedTreeCache.stats()
+    if jobManager is not None:
+        stats["jobs"] = jobManager.stats()
+    stats["cost_model"] = get_cost_model().stats()
+    stats["kernels"] = "numba" if treeKernels.ENABLED else "numpy"
+    stats["pricing"] = pricingBatcher.stats()
+    return stats
+
+# JSON pricing endpoint for other services, POST /api/price (see pricingService.py)
+from pricingService import install_pricing_routes
+pricingBatcher = install_pricing_routes(server)
+
+# Latency percentiles per phase and tree periods, when ASIAN_INSTRUMENTATION=1
+@server.route("/metrics")
+def phase_metrics():
+    return {"enabled": instrumentation.ENABLED, "phases": instrumentation.metrics.summary()}
+
+if instrumentation.ENABLED:
+    instrumentation.install_flask_hooks(server)
+
+# Optional precomputation of the slider grid (ASIAN_WARMUP=star|full, see warmup.py)
+if os.environ.get("ASIAN_WARMUP"):
+    from warmup import format_report, warm_cache, warmup_inputs
+    warmupPeriods = [int(n) for n in os.environ.get("ASIAN_WARMUP_PERIODS", "3").split(",")]
+    warmupWorkers = int(os.environ["ASIAN_WARMUP_WORKERS"]) if os.environ.get("ASIAN_WARMUP_WORKERS") else None
+    print(format_report(warm_cache(warmup_inputs(os.environ["ASIAN_WARMUP"], warmupPeriods), warmupWorkers)), flush=True)
+
 # Author parameters
 bg_color="#506784",
 font_color="#F3F6FA"
@@ -28,9 +82,10 @@ author = "Michel Vanderhulst"
 emailAuthor = "michelvanderhulst@hotmail.com"
 supervisor = "Prof. Frédéric Vrins"
 emailSupervisor = "frederic.vrins@uclouvain.be"
-logo1path = "./pictures/1200px-Louvain_School_of_Management_logo.svg.png"
+# logos are served as static files from assets/ (cached by the browser) instead of base64 inlined in the layout
+logo1path = app.get_asset_url("1200px-Louvain_School_of_Management_logo.svg.png")
 logo1URL  = "https://uclouvain.be/en/faculties/lsm"
-logo2path = "./pictures/1280px-NovaSBE_Logo.svg.png"
+logo2path = app.get_asset_url("1280px-NovaSBE_Logo.svg.png")
 logo2URL  = "https://www2.novasbe.unl.pt/en/"
 
 # Creating the app header
@@ -39,7 +94,7 @@ def header():
                 id='app-page-header',
                 children=[
                     html.Div(children=[html.A(id='lsm-logo', 
-                                              children=[html.Img(style={'height':'6%', 'width':'6%'}, src='data:image/png;base64,{}'.format(base64.b64encode(open(f"{logo1path}", 'rb').read()).decode()))],
+                                              children=[html.Img(style={'height':'6%', 'width':'6%'}, src=logo1path)],
                                               href=f"{logo1URL}",
                                               target="_blank", #open link in new tab
                                               style={"margin-left":"10px"}
@@ -65,7 +120,7 @@ def header():
                                                  style={"display":"inline-block","font-family":"sans-serif","marginLeft":"55%", "margin-right":"10px"}),
 
                                      html.A(id="nova-logo",
-                                            children=[html.Img(style={"height":"9%","width":"9%"}, src="data:image/png;base64,{}".format(base64.b64encode(open(f"{logo2path}","rb").read()).decode()))],
+                                            children=[html.Img(style={"height":"9%","width":"9%"}, src=logo2path)],
                                             href=f"{logo2URL}",
                                             target="_blank",                   
                                             style={}
@@ -231,6 +286,9 @@ def body():
                                                                    html.P("",id="message_tree", style={"font-size":12, "color":"red", "padding":5, 'width': '40%', "text-align":"left", 'display': 'inline-block'})
                                                                   ],
                                                         ),
+                                                html.P("", id="lattice_price", style={"font-size":12, "padding":5}),
+                                                html.P("", id="indicative_price", title="Moment-matching (Levy) approximation, available before the tree is computed", style={"font-size":12, "padding":5}),
+                                                dbc.Progress(id="tree_progress", value=0, striped=True, animated=True, style={"display":"none"}),
                                                 ])),
         ],),], style={'float': 'left', 'width': '25%', 'margin':"30px"}),
     ])
@@ -275,34 +333,126 @@ app.layout = html.Div(
                 id='main_page',
                 children=[
                     dcc.Store(id='memory-output'),
+                    dcc.Store(id='tree-job'),
+                    dcc.Interval(id='tree-job-poll', interval=250, disabled=True),
                     header(),
                     body(),
                     graphs(),
                          ],
                      )
 
-# App interactivity 1: calling the replication strategy everytime the user changes an input
-@app.callback(
-	Output('memory-output', 'data'),
-	[Input('CallOrPut', 'value'),
-     Input("S","value"),
-     Input("K", "value"),
-     Input("Rf", "value"),
-     Input("T","value"),
-     Input("mu","value"),
-     Input("vol", "value"),
-     Input("tree_periods", "value"),])
+# Level of detail: above ASIAN_LOD_MAX_NODES nodes (default: 8 periods) the trees are unreadable and slow to draw,
+# so the cost model routes them to the bands engine and the figures show the min/median/max band of the values at
+# each period instead, with WebGL traces and no text
+lodMaxNodes = int(os.environ.get("ASIAN_LOD_MAX_NODES", 2 ** 9 - 1))
+
+def use_lod(data):
+    return "bands" in data
+
+def lod_figure(data, name, legend=()):
+    minimum, median, maximum = data["bands"][name]
+    periods = list(range(data["periods"] + 1))
+    return{
+       'layout': go.Layout(
+        margin=dict(l=0, t=15),
+        xaxis={'showgrid': False, 'zeroline': False, 'title': 'Period'},
+        yaxis={'showgrid': False, 'zeroline': False},
+        legend=dict(x=0, y=1, traceorder='normal', bgcolor='rgba(0,0,0,0)'),
+    ),
+    	'data': [
+	        go.Scattergl(x=periods, y=maximum, mode='lines', line=dict(width=0.5), name='Max'),
+	        go.Scattergl(x=periods, y=minimum, mode='lines', line=dict(width=0.5), fill='tonexty', name='Min'),
+	        go.Scattergl(x=periods, y=median, mode='lines+markers', name='Median'),
+	    ] + [go.Scattergl(x=[None], y=[None], mode='markers', name=entry) for entry in legend],
+}
+
+# Figures of a request that gets no tree: empty, with the reason
+def hidden_figure(data):
+    return {'layout': go.Layout(xaxis={'visible': False}, yaxis={'visible': False},
+                                annotations=[dict(text=data["hidden"], showarrow=False, font=dict(size=14))]),
+            'data': []}
+
+# None when the inputs give a tree, otherwise the reason stored instead of it
+def hidden_reason(S, K, tree_periods, engine):
+    if None in (S, K, tree_periods) or S <= 0 or K <= 0 or tree_periods < 1:
+        return "Incomplete inputs: no tree shown."
+    if engine == "lattice":
+        return "Too large for a tree: price from the lattice only (see the tree periods input)."
+    if engine == "reject":
+        return "Too large: lower the tree periods."
+    return None
+
+# App interactivity 1: calling the replication strategy everytime the user changes an input. The cost model picks
+# the full tree or, for large trees, the level-of-detail bands; requests it routes to the lattice (price only, shown
+# under the tree periods input) or rejects store the reason, and the figures are emptied.
 def get_rep_strat_data(CallOrPut, S, K, Rf,T,mu,vol,tree_periods):
-	nbrofsharesLabel, cashLabel, portfolioLabel, optionpriceLabel, intrinsicLabel, stocksLabel, edge_x, edge_y, node_x, node_y, u, d, probUp, probDown = RepStrat_Asian_Option_CRR(CallOrPut, S, K, Rf, T, mu, vol, tree_periods)
-																
-	return nbrofsharesLabel, cashLabel, portfolioLabel, optionpriceLabel, intrinsicLabel, stocksLabel, edge_x, edge_y, node_x, node_y, u, d, probUp, probDown
+	with callback_phase(tree_periods):
+		engine, estimate = get_cost_model().plan(tree_periods, lodMaxNodes)
+		reason = hidden_reason(S, K, tree_periods, engine)
+		if reason is not None:
+			return encode_hidden(reason, tree_periods)
+		if engine == "tree":
+			result = cached_rep_strat(CallOrPut, S, K, Rf, T, mu, vol, tree_periods)
+			with phase("encode", tree_periods):
+				return encode_rep_strat(result, tree_periods)
+		if engine == "bands":
+			result = cached_rep_strat_bands(CallOrPut, S, K, Rf, T, mu, vol, tree_periods)
+			with phase("encode", tree_periods):
+				return encode_bands(result, tree_periods)
+
+# In background mode, the inputs submit a job (cancelling the one it supersedes) and the poll fills the store
+def submit_rep_strat_job(CallOrPut, S, K, Rf,T,mu,vol,tree_periods, previousJob):
+	# a hidden tree submitted no job
+	if previousJob is not None and "id" in previousJob:
+		jobManager.cancel(previousJob["id"])
+	engine, estimate = get_cost_model().plan(tree_periods, lodMaxNodes)
+	reason = hidden_reason(S, K, tree_periods, engine)
+	if reason is not None:
+		return {"hidden": reason, "periods": tree_periods}
+	inputs = [CallOrPut, S, K, Rf, T, mu, vol, tree_periods]
+	return {"id": jobManager.submit(*inputs, engine=engine), "inputs": inputs, "engine": engine}
+
+def poll_rep_strat_job(n_intervals, job):
+	if job is None:
+		return dash.no_update, 0, "", {"display":"none"}, True
+	if "hidden" in job:
+		return encode_hidden(job["hidden"], job["periods"]), 0, "", {"display":"none"}, True
+	status, value = jobManager.status(job["id"])
+	if status == "unknown":
+		# accepted by another worker process, or already collected: resubmitted here, a cache hit if it finished
+		status, value = jobManager.status(jobManager.submit(*job["inputs"], engine=job["engine"], jobId=job["id"]))
+	if status == "running":
+		return dash.no_update, 100 * value, f"{100 * value:.0f}%", {"display":"flex"}, False
+	if status == "failed":
+		return dash.no_update, 0, "", {"display":"none"}, True
+	encode = encode_rep_strat if job["engine"] == "tree" else encode_bands
+	with callback_phase(job["inputs"][-1]), phase("encode", job["inputs"][-1]):
+		data = encode(value, job["inputs"][-1])
+	return data, 100, "", {"display":"none"}, True
+
+rep_strat_inputs = [Input('CallOrPut', 'value'), Input("S","value"), Input("K", "value"), Input("Rf", "value"),
+                    Input("T","value"), Input("mu","value"), Input("vol", "value"), Input("tree_periods", "value")]
+if jobManager is None:
+	app.callback(Output('memory-output', 'data'), rep_strat_inputs)(get_rep_strat_data)
+else:
+	app.callback(Output('tree-job', 'data'), rep_strat_inputs, [State('tree-job', 'data')])(submit_rep_strat_job)
+	app.callback([Output('memory-output', 'data'), Output('tree_progress', 'value'), Output('tree_progress', 'children'),
+	              Output('tree_progress', 'style'), Output('tree-job-poll', 'disabled')],
+	             [Input('tree-job-poll', 'n_intervals'), Input('tree-job', 'data')])(poll_rep_strat_job)
 
 # App interactivity 2: plot of stock simulation + CRR u, d, probUp & probDown values
 @app.callback(
     Output('stock_simul', 'figure'),
     [Input('memory-output', 'data'),])
 def graph_stock_simul(data):
-	nbrofsharesLabel, cashLabel, portfolioLabel, optionpriceLabel, intrinsicLabel, stocksLabel, edge_x, edge_y, node_x, node_y, u, d, probUp, probDown = data
+	if "hidden" in data:
+		return hidden_figure(data)
+	u, d, probUp, probDown = decode_factors(data)
+	if use_lod(data):
+		return lod_figure(data, "stocks", legend=[f'Up factor: {u}', f'Down factor: {d}', f'Prob up: {probUp}', f'Prob down: {probDown}'])
+
+	edge_x, edge_y, node_x, node_y = decode_layout(data)
+	stocksLabel = decode_labels(data, "stocks")
 
 	return{
        'layout': go.Layout(
@@ -382,7 +532,13 @@ def graph_stock_simul(data):
     Output('port_details', 'figure'),
     [Input('memory-output', 'data'),])
 def graph_portf_details(data):
-		nbrofsharesLabel, cashLabel, portfolioLabel, optionpriceLabel, intrinsicLabel, stocksLabel, edge_x, edge_y, node_x, node_y, u, d, probUp, probDown = data
+		if "hidden" in data:
+			return hidden_figure(data)
+		if use_lod(data):
+			return lod_figure(data, "portfolio")
+
+		edge_x, edge_y, node_x, node_y = decode_layout(data)
+		portfolioLabel = decode_labels(data, "portfolio")
 
 		return{
        'layout': go.Layout(
@@ -429,7 +585,13 @@ def graph_portf_details(data):
     Output('nbr_shares', 'figure'),
     [Input('memory-output', 'data'),])
 def graph_nbr_of_shares(data):
-		nbrofsharesLabel, cashLabel, portfolioLabel, optionpriceLabel, intrinsicLabel, stocksLabel, edge_x, edge_y, node_x, node_y, u, d, probUp, probDown = data
+		if "hidden" in data:
+			return hidden_figure(data)
+		if use_lod(data):
+			return lod_figure(data, "nbrofshares")
+
+		edge_x, edge_y, node_x, node_y = decode_layout(data)
+		nbrofsharesLabel = decode_labels(data, "nbrofshares")
 
 		return{
        'layout': go.Layout(
@@ -474,7 +636,13 @@ def graph_nbr_of_shares(data):
     Output('cash_acc', 'figure'),
     [Input('memory-output', 'data'),])
 def graph_cash_account(data):
-		nbrofsharesLabel, cashLabel, portfolioLabel, optionpriceLabel, intrinsicLabel, stocksLabel, edge_x, edge_y, node_x, node_y, u, d, probUp, probDown = data
+		if "hidden" in data:
+			return hidden_figure(data)
+		if use_lod(data):
+			return lod_figure(data, "cash")
+
+		edge_x, edge_y, node_x, node_y = decode_layout(data)
+		cashLabel = decode_labels(data, "cash")
 		return{
        'layout': go.Layout(
         title={'yref':"paper",
@@ -519,7 +687,13 @@ def graph_cash_account(data):
     Output('option_price', 'figure'),
     [Input('memory-output', 'data'),])
 def graph_option_pricee(data):
-		nbrofsharesLabel, cashLabel, portfolioLabel, optionpriceLabel, intrinsicLabel, stocksLabel, edge_x, edge_y, node_x, node_y, u, d, probUp, probDown = data
+		if "hidden" in data:
+			return hidden_figure(data)
+		if use_lod(data):
+			return lod_figure(data, "optionprice")
+
+		edge_x, edge_y, node_x, node_y = decode_layout(data)
+		optionpriceLabel = decode_labels(data, "optionprice")
 		return{
        'layout': go.Layout(
         title={'yref':"paper",
@@ -564,7 +738,13 @@ def graph_option_pricee(data):
     Output('option_intrinsic', 'figure'),
     [Input('memory-output', 'data'),])
 def graph_option_cumsum(data):
-		nbrofsharesLabel, cashLabel, portfolioLabel, optionpriceLabel, intrinsicLabel, stocksLabel, edge_x, edge_y, node_x, node_y, u, d, probUp, probDown = data
+		if "hidden" in data:
+			return hidden_figure(data)
+		if use_lod(data):
+			return lod_figure(data, "sumstockprices")
+
+		edge_x, edge_y, node_x, node_y = decode_layout(data)
+		intrinsicLabel = decode_labels(data, "sumstockprices")
 		return{
        'layout': go.Layout(
         title={'yref':"paper",
@@ -622,13 +802,58 @@ def check_input_K(K):
     else:
         return ""
 
-@app.callback(Output('message_tree', 'children'),
+# Tree periods guardrail: estimated cost of the request, and what is shown instead of the full tree
+@app.callback([Output('message_tree', 'children'), Output('message_tree', 'style')],
               [Input('tree_periods', 'value')])
-def check_input_K(tree__periods):
-    if tree__periods<1:
-        return f'Cannot be lower than 1.'
-    else:
+def check_input_tree_periods(tree__periods):
+    style = {"font-size":12, "color":"red", "padding":5, 'width': '40%', "text-align":"left", 'display': 'inline-block'}
+    if tree__periods is None or tree__periods<1:
+        return f'Cannot be lower than 1.', style
+
+    costModel = get_cost_model()
+    engine, estimate = costModel.plan(tree__periods, lodMaxNodes)
+    treeEstimate = format_estimate(costModel.estimate("tree", tree__periods))
+    if engine == "tree":
+        return f'Estimated: {format_estimate(estimate)}.', dict(style, color="grey")
+    if engine == "bands":
+        return f'Per-period bands shown (full tree: {treeEstimate}; bands: {format_estimate(estimate)}).', dict(style, color="grey")
+    if engine == "lattice":
+        return f'Too large for a tree ({treeEstimate}), priced by the lattice.', style
+    return f'Too large ({treeEstimate}), lower the tree periods.', style
+
+
+# Price of the trees routed to the lattice, in its own callback so that the guardrail message never waits for it
+@app.callback(Output('lattice_price', 'children'),
+              [Input('CallOrPut', 'value'),
+               Input("S","value"),
+               Input("K", "value"),
+               Input("Rf", "value"),
+               Input("T","value"),
+               Input("mu","value"),
+               Input("vol", "value"),
+               Input("tree_periods", "value"),])
+def display_lattice_price(CallOrPut, S, K, Rf, T, mu, vol, tree_periods):
+    if None in (S, K, tree_periods) or S <= 0 or K <= 0 or tree_periods < 1:
+        return ""
+    if get_cost_model().plan(tree_periods, lodMaxNodes)[0] != "lattice":
+        return ""
+    return f"Lattice price: {price_asian_crr_lattice(CallOrPut, S, K, Rf, T, mu, vol, tree_periods):.2f}"
+
+
+# Instant indicative price, shown while the tree is being computed
+@app.callback(Output('indicative_price', 'children'),
+              [Input('CallOrPut', 'value'),
+               Input("S","value"),
+               Input("K", "value"),
+               Input("Rf", "value"),
+               Input("T","value"),
+               Input("mu","value"),
+               Input("vol", "value"),
+               Input("tree_periods", "value"),])
+def display_indicative_price(CallOrPut, S, K, Rf, T, mu, vol, tree_periods):
+    if None in (S, K, tree_periods) or S <= 0 or K <= 0 or tree_periods < 1:
         return ""
+    return f"Indicative price (analytic approximation): {price_asian_levy(CallOrPut, S, K, Rf, T, mu, vol, tree_periods):.2f}"
 
 
 # App input visuals
@@ -0,0 +1,187 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Bands
+import resultCache
+from resultCache import bands_key, normalize_inputs
+from stagedEngine import total_steps
+
+#######################################################################################################################
+### Background jobs for large trees
+###
+### With ASIAN_BACKGROUND_WORKERS > 0 the app no longer computes the tree inside the callback that reacts to the
+### inputs. That callback submits a job to a local process pool and returns its id, and a dcc.Interval polls the job
+### until its result is ready. A gunicorn worker is held for a few milliseconds per request instead of for the whole
+### tree, and the other users' requests never wait behind it.
+###
+### Jobs report the steps they completed (each level of the forward, backward and replication passes, then each
+### label list and the layout) to a shared dict, which drives the progress bar. A newer input set from the same page
+### cancels the job it supersedes: pending jobs are dropped from the pool queue, running ones stop at their next step.
+###
+### Jobs run the engine chosen by the cost model: the full tree, or the level-of-detail bands of large trees.
+### Trees under ASIAN_BACKGROUND_MIN_PERIODS periods, and results already in the caches, are computed inline.
+### Jobs live in the process that accepted them; a poll that reaches another gunicorn worker resubmits the inputs
+### there, which is a cache hit if ASIAN_SHARED_CACHE_DIR is set.
+###
+### A finished job hands its result to the result cache and leaves the job table whether or not it is ever polled.
+### The result (or the exception) waits for the poll FINISHED_TTL seconds at most: a page closed mid-job leaves
+### nothing behind but a cache entry.
+###
+### The pool and its manager are started with "spawn", not forked: the gunicorn workers run request threads, and a
+### fork could copy a lock (of the staged engine or of a cache) held by one of them into the pool processes forever.
+#######################################################################################################################
+
+BACKGROUND_WORKERS = int(os.environ.get("ASIAN_BACKGROUND_WORKERS", 0))
+BACKGROUND_MIN_PERIODS = int(os.environ.get("ASIAN_BACKGROUND_MIN_PERIODS", 10))
+
+# seconds a finished job waits for its poll
+FINISHED_TTL = 60
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# set in each pool process: job id -> fraction of the steps done, and the ids of the cancelled jobs
+_progress = _cancelled = None
+
+
+def _init_worker(progress, cancelled):
+    global _progress, _cancelled
+    _progress, _cancelled = progress, cancelled
+
+
+def _run_job(jobId, key, engine):
+    # one more step for the transfer of the result, so that 100% means it has arrived
+    totalSteps = (total_steps(key[-1]) if engine == "tree" else 3 * key[-1]) + 1
+    stepsDone = itertools.count(1)
+
+    def on_level():
+        if jobId in _cancelled:
+            raise JobCancelled(jobId)
+        _progress[jobId] = next(stepsDone) / totalSteps
+
+    if engine == "bands":
+        return RepStrat_Asian_Option_CRR_Bands(*key, on_level=on_level)
+
+    sharedTreeCache = resultCache.sharedTreeCache
+    result = sharedTreeCache.get(key) if sharedTreeCache is not None else None
+    if result is None:
+        result = resultCache.stagedRepStrat.compute(*key, on_level=on_level)
+        if sharedTreeCache is not None:
+            sharedTreeCache.put(key, result)
+    return result
+
+
+class JobManager:
+    def __init__(self, workers=BACKGROUND_WORKERS, min_periods=BACKGROUND_MIN_PERIODS):
+        self.workers = workers
+        self.min_periods = min_periods
+        self._executor = None
+        self._jobs = {}
+        self._finished = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # the pool and the shared dicts are created on the first job, after the app has been imported
+    def _pool(self):
+        if self._executor is None:
+            context = multiprocessing.get_context("spawn")
+            manager = context.Manager()
+            self._progress, self._cancelled = manager.dict(), manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                 initializer=_init_worker, initargs=(self._progress, self._cancelled))
+        return self._executor
+
+    # returns the job id; jobId is given when a job of another process is resubmitted here
+    def submit(self, CallOrPut, S, K, rf, T, mu, vol, tree__periods, engine="tree", jobId=None):
+        key = normalize_inputs(CallOrPut, S, K, rf, T, mu, vol, tree__periods)
+        cacheKey = key if engine == "tree" else bands_key(key)
+        jobId = jobId or f"{os.getpid()}-{next(self._ids)}"
+
+        result = resultCache.repStratCache.get(cacheKey)
+        if result is None and tree__periods < self.min_periods:
+            cached = resultCache.cached_rep_strat if engine == "tree" else resultCache.cached_rep_strat_bands
+            result = cached(*key)
+
+        with self._lock:
+            if result is not None:
+                self._jobs[jobId] = (cacheKey, None, result)
+                return jobId
+            future = self._pool().submit(_run_job, jobId, key, engine)
+            self._jobs[jobId] = (cacheKey, future, None)
+        future.add_done_callback(lambda future: self._finish(jobId, future))
+        return jobId
+
+    def cancel(self, jobId):
+        with self._lock:
+            job = self._jobs.pop(jobId, None)
+        if job is None or job[1] is None:
+            return
+        if not job[1].cancel():
+            self._cancelled[jobId] = True
+            job[1].add_done_callback(lambda future: self._forget(jobId))
+        self._progress.pop(jobId, None)
+
+    def _forget(self, jobId):
+        self._progress.pop(jobId, None)
+        self._cancelled.pop(jobId, None)
+
+    # drops the finished jobs nobody polled in time (_finished is in finishing order, so the oldest come first)
+    def _expire(self):
+        now = time.monotonic()
+        while self._finished and next(iter(self._finished.values()))[0] < now:
+            self._finished.popitem(last=False)
+
+    # done callback of the pool jobs, or the poll that sees the job done first: the result goes to the cache and
+    # waits for the poll out of the job table
+    def _finish(self, jobId, future):
+        with self._lock:
+            job = self._jobs.get(jobId)
+            if job is None or job[1] is not future:
+                return
+        if future.exception() is None:
+            resultCache.repStratCache.put(job[0], future.result())
+            status = ("done", future.result())
+        else:
+            status = ("failed", future.exception())
+        self._forget(jobId)
+
+        with self._lock:
+            # the poll and the callback may both get here
+            if self._jobs.get(jobId) is not job:
+                return
+            del self._jobs[jobId]
+            self._finished[jobId] = (time.monotonic() + FINISHED_TTL,) + status
+            self._expire()
+
+    # ("running", fraction of steps done), ("done", result), ("failed", exception) or ("unknown", None)
+    def status(self, jobId):
+        with self._lock:
+            job = self._jobs.get(jobId)
+        if job is not None and job[1] is not None:
+            if not job[1].done():
+                return "running", self._progress.get(jobId, 0.0)
+            self._finish(jobId, job[1])
+
+        with self._lock:
+            if job is not None and job[1] is None:
+                self._jobs.pop(jobId, None)
+                return "done", job[2]
+            self._expire()
+            finished = self._finished.pop(jobId, None)
+        return finished[1:] if finished is not None else ("unknown", None)
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for key, future, result in self._jobs.values() if future is not None and not future.done())
+            return {"workers": self.workers, "min_periods": self.min_periods, "jobs": len(self._jobs),
+                    "running": running}
+
+
+jobManager = JobManager() if BACKGROUND_WORKERS > 0 else None
@@ -0,0 +1,296 @@
+import argparse
+import collections
+import csv
+import itertools
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Asian_Option_CRR import price_asian_crr_batch, price_asian_crr_lattice, price_asian_levy
+from Asian_Option_MC import price_asian_mc
+
+#######################################################################################################################
+### Headless batch pricing
+###
+### Prices a file of contracts (CSV, or Parquet when pyarrow is installed) chunk by chunk and appends each priced chunk
+### to the output file as soon as it and the chunks before it are done, so memory stays flat whatever the number of
+### rows. The input has the columns CallOrPut, S, K, rf, T, mu, vol and optionally tree__periods (--periods otherwise);
+### other columns are copied to the output as they are. The output adds price, delta, seconds (the engine time of the
+### chunk spread over its rows) and, for Monte Carlo, std_error.
+###
+###   tree      exact CRR tree, vectorized over the contracts (price_asian_crr_batch)    delta = root number of shares
+###   lattice   Hull-White lattice, polynomial in tree__periods                          delta = root number of shares
+###   mc        Monte Carlo under the CRR dynamics, with its standard error             delta = root number of shares
+###   analytic  Levy lognormal approximation, continuous-time limit                      delta = dV/dS (central bump)
+###
+###   python batchPricing.py contracts.csv prices.csv --engine tree --periods 10 --workers 4
+###
+### With --workers > 1 the chunks are priced in worker processes, at most two per worker in flight.
+###
+### The engine, the formats and the columns of the first chunk are checked before anything is written, and the output
+### is written to a temporary file next to it, renamed into place once every chunk is priced: a bad input or a failed
+### run leaves an existing output file as it was.
+#######################################################################################################################
+
+CONTRACT_FIELDS = ("CallOrPut", "S", "K", "rf", "T", "mu", "vol")
+ENGINES = ("tree", "lattice", "mc", "analytic")
+
+# relative bump of S for the analytic delta
+_ANALYTIC_DELTA_BUMP = 1e-4
+
+
+def _tree_engine(contracts, tree__periods, options):
+    price, delta = price_asian_crr_batch(**contracts, tree__periods=tree__periods, return_delta=True)
+    return {"price": price, "delta": delta}
+
+
+def _lattice_engine(contracts, tree__periods, options):
+    results = [price_asian_crr_lattice(*contract, tree__periods, return_delta=True)
+               for contract in zip(*(contracts[field] for field in CONTRACT_FIELDS))]
+    price, delta = np.array(results).reshape(-1, 2).T
+    return {"price": price, "delta": delta}
+
+
+# row n uses the random stream (seed, row number), so results do not depend on the chunking or on the workers
+def _mc_engine(contracts, tree__periods, options):
+    seed, rows = options.get("seed"), options["rows"]
+    results = [price_asian_mc(*contract, tree__periods, paths=options.get("paths", 100000),
+                              seed=None if seed is None else [seed, int(row)])
+               for contract, row in zip(zip(*(contracts[field] for field in CONTRACT_FIELDS)), rows)]
+    price, stdError, delta = np.array(results).reshape(-1, 3).T
+    return {"price": price, "delta": delta, "std_error": stdError}
+
+
+def _analytic_engine(contracts, tree__periods, options):
+    S = contracts["S"]
+    bump = _ANALYTIC_DELTA_BUMP * S
+    bumped = {field: contracts[field] for field in CONTRACT_FIELDS if field != "S"}
+    delta = (price_asian_levy(S=S + bump, **bumped, tree__periods=tree__periods)
+             - price_asian_levy(S=S - bump, **bumped, tree__periods=tree__periods)) / (2 * bump)
+    return {"price": np.asarray(price_asian_levy(**contracts, tree__periods=tree__periods)), "delta": delta}
+
+
+ENGINE_FUNCTIONS = {"tree": _tree_engine, "lattice": _lattice_engine, "mc": _mc_engine, "analytic": _analytic_engine}
+
+
+def output_fields(engine):
+    return ("price", "delta", "std_error", "seconds") if engine == "mc" else ("price", "delta", "seconds")
+
+
+def check_columns(columns, tree__periods=None):
+    missing = [field for field in CONTRACT_FIELDS if field not in columns]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+    if "tree__periods" not in columns and tree__periods is None:
+        raise ValueError("no tree__periods column: give the number of tree periods")
+
+
+# prices one chunk of columns; rows of the same tree__periods go to the engine together
+def price_chunk(columns, engine, tree__periods=None, first_row=0, **options):
+    check_columns(columns, tree__periods)
+    if "tree__periods" in columns:
+        periods = np.asarray(columns["tree__periods"]).astype(float).astype(int)
+    else:
+        periods = np.full(len(columns["S"]), tree__periods)
+
+    contracts = {field: np.asarray(columns[field]).astype(float) for field in CONTRACT_FIELDS if field != "CallOrPut"}
+    contracts["CallOrPut"] = np.asarray(columns["CallOrPut"]).astype(str)
+    results = {field: np.full(periods.size, np.nan) for field in output_fields(engine)}
+
+    for groupPeriods in np.unique(periods):
+        rows = np.flatnonzero(periods == groupPeriods)
+        start = time.perf_counter()
+        group = ENGINE_FUNCTIONS[engine]({field: column[rows] for field, column in contracts.items()},
+                                         int(groupPeriods), dict(options, rows=first_row + rows))
+        seconds = time.perf_counter() - start
+        for field, values in group.items():
+            results[field][rows] = values
+        results["seconds"][rows] = seconds / rows.size
+
+    return results
+
+
+#######################################################################################################################
+### Streaming readers and writers
+###
+### Readers yield {column: array of strings or numbers} of at most chunk_size rows, writers take the same mapping.
+#######################################################################################################################
+
+def _read_csv_chunks(path, chunk_size):
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        while True:
+            rows = [row for _, row in zip(range(chunk_size), reader)]
+            if not rows:
+                return
+            yield dict(zip(header, map(np.array, zip(*rows))))
+
+
+def _import_parquet():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet files need pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def _read_parquet_chunks(path, chunk_size):
+    pyarrow = _import_parquet()
+    for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield {name: column.to_numpy(zero_copy_only=False) for name, column in zip(batch.schema.names, batch.columns)}
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._header = None
+
+    def write(self, columns):
+        if self._header is None:
+            self._header = list(columns)
+            self._writer.writerow(self._header)
+        self._writer.writerows(zip(*(np.asarray(columns[name]).tolist() for name in self._header)))
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        self._pyarrow = _import_parquet()
+        self._path = path
+        self._writer = None
+
+    def write(self, columns):
+        table = self._pyarrow.table({name: np.asarray(column) for name, column in columns.items()})
+        if self._writer is None:
+            self._writer = self._pyarrow.parquet.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def read_chunks(path, chunk_size):
+    return _read_parquet_chunks(path, chunk_size) if _is_parquet(path) else _read_csv_chunks(path, chunk_size)
+
+
+def open_writer(path):
+    return _ParquetWriter(path) if _is_parquet(path) else _CsvWriter(path)
+
+
+#######################################################################################################################
+### Driver
+#######################################################################################################################
+
+def _price_numbered_chunk(columns, first_row, engine, tree__periods, options):
+    return price_chunk(columns, engine, tree__periods, first_row, **options)
+
+
+# the first chunk, checked, and the chunks after it; raises before the output is touched
+def _checked_chunks(input_path, output_path, engine, tree__periods, chunk_size):
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {', '.join(ENGINES)}, got {engine!r}")
+    if _is_parquet(input_path) or _is_parquet(output_path):
+        _import_parquet()
+
+    chunks = read_chunks(input_path, chunk_size)
+    first = next(chunks, None)
+    if first is None:
+        return iter(())
+    check_columns(first, tree__periods)
+    return itertools.chain([first], chunks)
+
+
+# returns {"rows", "chunks", "seconds", "rows_per_second", "peak_rss_bytes"}
+def price_file(input_path, output_path, engine="tree", tree__periods=None, workers=1, chunk_size=10000, **options):
+    start = time.perf_counter()
+    chunks = _checked_chunks(input_path, output_path, engine, tree__periods, chunk_size)
+
+    # same directory (so the rename is atomic) and same extension (so the same format) as the output
+    directory, name = os.path.split(os.path.abspath(output_path))
+    partialPath = os.path.join(directory, f".{name}.{os.getpid()}.partial{os.path.splitext(name)[1]}")
+    nbrRows = nbrChunks = 0
+    writer = open_writer(partialPath)
+
+    def write(columns, results):
+        nonlocal nbrRows, nbrChunks
+        writer.write(dict(columns, **results))
+        nbrRows += len(results["price"])
+        nbrChunks += 1
+
+    try:
+        if workers <= 1:
+            firstRow = 0
+            for columns in chunks:
+                write(columns, price_chunk(columns, engine, tree__periods, firstRow, **options))
+                firstRow += len(columns["S"])
+        else:
+            # chunks are written in input order, and reading waits while 2 * workers chunks are in flight
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = collections.deque()
+                firstRow = 0
+                for columns in chunks:
+                    if len(pending) >= 2 * workers:
+                        done = pending.popleft()
+                        write(done[0], done[1].result())
+                    pending.append((columns, executor.submit(_price_numbered_chunk, columns, firstRow, engine,
+                                                             tree__periods, options)))
+                    firstRow += len(columns["S"])
+                while pending:
+                    done = pending.popleft()
+                    write(done[0], done[1].result())
+        writer.close()
+        os.replace(partialPath, output_path)
+    except BaseException:
+        writer.close()
+        if os.path.exists(partialPath):
+            os.remove(partialPath)
+        raise
+
+    seconds = time.perf_counter() - start
+    return {"rows": nbrRows, "chunks": nbrChunks, "seconds": seconds,
+            "rows_per_second": nbrRows / seconds if seconds > 0 else float("inf"),
+            "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+
+
+def format_report(report):
+    return (f"{report['rows']} rows in {report['chunks']} chunks, {report['seconds']:.1f} s "
+            f"({report['rows_per_second']:.0f} rows/s), peak RSS of this process "
+            f"{report['peak_rss_bytes'] / 2 ** 20:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Price a CSV or Parquet file of Asian option contracts.")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--engine", choices=ENGINES, default="tree")
+    parser.add_argument("--periods", type=int, default=None,
+                        help="tree periods of the rows, when the input has no tree__periods column")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--paths", type=int, default=100000, help="Monte Carlo paths per contract")
+    parser.add_argument("--seed", type=int, default=None, help="Monte Carlo seed")
+    args = parser.parse_args()
+
+    options = {"paths": args.paths, "seed": args.seed} if args.engine == "mc" else {}
+    try:
+        report = price_file(args.input, args.output, args.engine, args.periods, args.workers, args.chunk_size,
+                            **options)
+    except (ImportError, OSError, ValueError) as error:
+        parser.exit(1, f"error: {error}\n")
+    print(format_report(report), file=sys.stderr)
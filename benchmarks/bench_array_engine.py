@@ -0,0 +1,45 @@
+# Compares the dict engine with the array-backed engine on the same inputs, and reports the cost of the
+# pricing-only fast path (price_asian_crr). The dict engine is only run up to 15 periods by default: 20 periods is
+# 32 times the work and memory of 15.
+#
+#   python benchmarks/bench_array_engine.py             -> 10, 15 and 20 periods, the dict engine on 10 and 15
+#   python benchmarks/bench_array_engine.py 8 12 --skip-dict-above 10
+#   python benchmarks/bench_array_engine.py 20 --skip-dict-above 20
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR, RepStrat_Asian_Option_CRR_Array, price_asian_crr
+
+INPUTS = dict(CallOrPut="Call", S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+def timed(engine, tree__periods):
+    start = time.perf_counter()
+    result = engine(tree__periods=tree__periods, **INPUTS)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("periods", nargs="*", type=int, default=[10, 15, 20])
+    parser.add_argument("--skip-dict-above", type=int, default=15,
+                        help="do not run the dict engine above this number of periods (default 15)")
+    args = parser.parse_args()
+
+    print(f"{'periods':>8} {'dict (s)':>10} {'array (s)':>10} {'speedup':>8} {'labels':>7} {'price (s)':>10}")
+    for tree__periods in args.periods:
+        arrayTime, arrayResult = timed(RepStrat_Asian_Option_CRR_Array, tree__periods)
+        priceTime, price = timed(price_asian_crr, tree__periods)
+
+        if tree__periods > args.skip_dict_above:
+            print(f"{tree__periods:>8} {'-':>10} {arrayTime:>10.3f} {'-':>8} {'-':>7} {priceTime:>10.4f}")
+            continue
+
+        dictTime, dictResult = timed(RepStrat_Asian_Option_CRR, tree__periods)
+        same = all(list(a) == list(b) if isinstance(a, list) else a == b for a, b in zip(dictResult, arrayResult))
+        print(f"{tree__periods:>8} {dictTime:>10.3f} {arrayTime:>10.3f} {dictTime / arrayTime:>7.1f}x {str(same):>7} {priceTime:>10.4f}")
@@ -0,0 +1,49 @@
+# Throughput of price_asian_crr_batch against a Python loop over price_asian_crr on random contracts.
+#
+#   python benchmarks/bench_batch.py
+#   python benchmarks/bench_batch.py --contracts 10000 --periods 3 10
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Asian_Option_CRR import price_asian_crr, price_asian_crr_batch
+
+
+def random_contracts(nbrContracts, seed=0):
+    rng = np.random.default_rng(seed)
+    return dict(CallOrPut=np.where(rng.random(nbrContracts) < 0.5, "Call", "Put"),
+                S=rng.uniform(80, 120, nbrContracts),
+                K=rng.uniform(80, 120, nbrContracts),
+                rf=rng.uniform(0, 0.1, nbrContracts),
+                T=rng.choice(np.arange(0.25, 5.25, 0.25), nbrContracts),
+                mu=rng.uniform(-0.3, 0.3, nbrContracts),
+                vol=rng.uniform(0.05, 0.5, nbrContracts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contracts", type=int, default=5000)
+    parser.add_argument("--periods", nargs="*", type=int, default=[3, 6, 10])
+    args = parser.parse_args()
+
+    contracts = random_contracts(args.contracts)
+    keys = ("CallOrPut", "S", "K", "rf", "T", "mu", "vol")
+
+    print(f"{'periods':>8} {'loop (c/s)':>12} {'batch (c/s)':>12} {'speedup':>8} {'max diff':>10}")
+    for tree__periods in args.periods:
+        start = time.perf_counter()
+        looped = [price_asian_crr(*(contracts[k][n] for k in keys), tree__periods) for n in range(args.contracts)]
+        loopTime = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = price_asian_crr_batch(tree__periods=tree__periods, **contracts)
+        batchTime = time.perf_counter() - start
+
+        print(f"{tree__periods:>8} {args.contracts / loopTime:>12.0f} {args.contracts / batchTime:>12.0f} "
+              f"{loopTime / batchTime:>7.1f}x {np.max(np.abs(batched - looped)):>10.1e}")
@@ -0,0 +1,40 @@
+# States eliminated per level by the path-sum compression, and its runtime against price_asian_crr.
+#
+#   python benchmarks/bench_compression.py
+#   python benchmarks/bench_compression.py --periods 24 --mu 0 0.1
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Asian_Option_CRR import price_asian_crr, price_asian_crr_compressed
+
+INPUTS = dict(CallOrPut="Call", S=100, K=100, rf=0.05, T=3, vol=0.15)
+
+
+def timed(function, **kwargs):
+    start = time.perf_counter()
+    result = function(**kwargs)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--periods", type=int, default=20)
+    parser.add_argument("--mu", nargs="*", type=float, default=[0.0, 0.10])
+    args = parser.parse_args()
+
+    for mu in args.mu:
+        (price, stats), compressedTime = timed(price_asian_crr_compressed, mu=mu, tree__periods=args.periods,
+                                               return_stats=True, **INPUTS)
+        fullPrice, fullTime = timed(price_asian_crr, mu=mu, tree__periods=args.periods, **INPUTS)
+
+        print(f"mu={mu}: compressed {compressedTime * 1e3:.1f} ms, full tree {fullTime * 1e3:.1f} ms, "
+              f"price difference {abs(price - fullPrice):.1e}")
+        print(f"{'level':>6} {'paths':>10} {'states':>10} {'eliminated':>11}")
+        for level, (paths, states) in enumerate(zip(stats["paths"], stats["states"])):
+            print(f"{level:>6} {paths:>10} {states:>10} {1 - states / paths:>10.1%}")
+        print()
@@ -0,0 +1,49 @@
+# Cost of greeks_asian_crr relative to one price_asian_crr, and to bump-and-reprice of vega, rho and theta
+# (central differences, six repricings).
+#
+#   python benchmarks/bench_greeks.py
+#   python benchmarks/bench_greeks.py 10 16 20
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Asian_Option_CRR import greeks_asian_crr, price_asian_crr
+
+INPUTS = dict(CallOrPut="Call", S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+def best_time(function, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bump_and_reprice(tree__periods, h=1e-4):
+    price = lambda **bump: price_asian_crr(tree__periods=tree__periods, **dict(INPUTS, **bump))
+    return {"vega": (price(vol=INPUTS["vol"] + h) - price(vol=INPUTS["vol"] - h)) / (2 * h),
+            "rho": (price(rf=INPUTS["rf"] + h) - price(rf=INPUTS["rf"] - h)) / (2 * h),
+            "theta": -(price(T=INPUTS["T"] + h) - price(T=INPUTS["T"] - h)) / (2 * h)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("periods", nargs="*", type=int, default=[8, 12, 16, 20])
+    args = parser.parse_args()
+
+    print(f"{'periods':>8} {'price (ms)':>11} {'greeks (ms)':>12} {'x price':>8} {'bumps (ms)':>11} {'max diff':>9}")
+    for tree__periods in args.periods:
+        priceTime = best_time(lambda: price_asian_crr(tree__periods=tree__periods, **INPUTS))
+        greeksTime = best_time(lambda: greeks_asian_crr(tree__periods=tree__periods, **INPUTS))
+        bumpTime = best_time(lambda: bump_and_reprice(tree__periods))
+
+        greeks, bumped = greeks_asian_crr(tree__periods=tree__periods, **INPUTS), bump_and_reprice(tree__periods)
+        difference = max(abs(greeks[name] - bumped[name]) for name in bumped)
+        print(f"{tree__periods:>8} {priceTime * 1e3:>11.2f} {greeksTime * 1e3:>12.2f} {greeksTime / priceTime:>7.1f}x "
+              f"{bumpTime * 1e3:>11.2f} {difference:>9.1e}")
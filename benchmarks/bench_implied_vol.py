@@ -0,0 +1,70 @@
+# Implied vols of a quote sheet: implied_vol_asian_crr_batch against scipy's brentq around price_asian_crr, quote by
+# quote. Quotes are tree prices of random contracts, so the repricing error at the solved vol should be ~tol.
+#
+#   python benchmarks/bench_implied_vol.py
+#   python benchmarks/bench_implied_vol.py --quotes 2000 --periods 6 12 --brentq-quotes 50
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.optimize import brentq
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Asian_Option_CRR import price_asian_crr, price_asian_crr_batch
+from bench_batch import random_contracts
+from impliedVolatility import _VOL_MAX, _vol_min, implied_vol_asian_crr_batch
+
+
+# random contracts whose vol keeps probUp within (0, 1), with their tree prices as quotes
+def quote_sheet(nbrQuotes, tree__periods):
+    contracts = random_contracts(nbrQuotes)
+    valid = contracts["vol"] > _vol_min(contracts["rf"], contracts["T"], contracts["mu"], tree__periods)
+    contracts = {name: column[valid] for name, column in contracts.items()}
+    return contracts, price_asian_crr_batch(tree__periods=tree__periods, **contracts)
+
+
+# quotes priced at one end of the bracket (worthless options at the lowest vol) have no sign change for brentq
+def brentq_vols(quotes, contracts, tree__periods, indices):
+    vols, calls = [], 0
+    for n in indices:
+        contract = {name: column[n] for name, column in contracts.items() if name != "vol"}
+        low = _vol_min(contract["rf"], contract["T"], contract["mu"], tree__periods)
+        vol, report = brentq(lambda vol: price_asian_crr(vol=vol, tree__periods=tree__periods, **contract) - quotes[n],
+                             low, _VOL_MAX, xtol=1e-12, full_output=True)
+        vols.append(vol)
+        calls += report.function_calls
+    return np.array(vols), calls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quotes", type=int, default=1000)
+    parser.add_argument("--periods", nargs="*", type=int, default=[4, 8, 12])
+    parser.add_argument("--brentq-quotes", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'periods':>8} {'quotes':>7} {'batch (q/s)':>12} {'prices/q':>9} {'max':>4} {'repricing err':>14} "
+          f"{'brentq (q/s)':>13} {'prices/q':>9}")
+    for tree__periods in args.periods:
+        contracts, quotes = quote_sheet(args.quotes, tree__periods)
+        withoutVol = {name: column for name, column in contracts.items() if name != "vol"}
+
+        result = implied_vol_asian_crr_batch(quotes, tree__periods=tree__periods, **withoutVol)
+        solved = result["converged"]
+        repriced = price_asian_crr_batch(vol=result["vol"][solved], tree__periods=tree__periods,
+                                         **{name: column[solved] for name, column in withoutVol.items()})
+
+        bracketed = np.flatnonzero(solved & (result["iterations"] > 2))[:args.brentq_quotes]
+        nbrBrentq = bracketed.size
+        start = time.perf_counter()
+        _, calls = brentq_vols(quotes, contracts, tree__periods, bracketed)
+        brentqSeconds = time.perf_counter() - start
+
+        print(f"{tree__periods:>8} {quotes.size:>7} {quotes.size / result['seconds']:>12.0f} "
+              f"{result['iterations'].mean():>9.1f} {result['iterations'].max():>4} "
+              f"{np.max(np.abs(repriced - quotes[solved])):>14.1e} {nbrBrentq / brentqSeconds:>13.0f} "
+              f"{calls / nbrBrentq:>9.1f}")
@@ -0,0 +1,79 @@
+# Forward, backward and replication passes with the numpy steps against the numba kernels of treeKernels, and the
+# largest difference between their outputs. The kernels are compiled (or loaded from the on-disk cache) before timing.
+#
+#   python benchmarks/bench_kernels.py
+#   python benchmarks/bench_kernels.py --periods 12 16 20
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import Asian_Option_CRR
+import treeKernels
+from Asian_Option_CRR import _asian_payoff, _backward_levels, _crr_factors, _forward_levels, _replication_levels
+
+INPUTS = dict(rf=0.05, T=3, mu=0.10, vol=0.15)
+STEPS = ("_forward_step", "_backward_step", "_replication_step")
+NUMPY_STEPS = {name: getattr(Asian_Option_CRR, "_numpy" + name) for name in STEPS}
+
+
+def use_steps(steps):
+    for name, function in zip(STEPS, steps):
+        setattr(Asian_Option_CRR, name, function)
+
+
+def passes(tree__periods):
+    step, u, d, discFact, probUp, probDown = _crr_factors(**INPUTS, tree__periods=tree__periods)
+    stockprices, sumstockprices = _forward_levels(100, u, d, tree__periods)
+    payoff = _asian_payoff(1, 100, sumstockprices[tree__periods], tree__periods)
+    optionprice = _backward_levels(payoff, discFact, probUp, probDown, tree__periods)
+    return (stockprices, sumstockprices, optionprice,
+            *_replication_levels(stockprices, optionprice, u, d, INPUTS["rf"], step, tree__periods))
+
+
+def best_time(tree__periods, repeat=3):
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        passes(tree__periods)
+        seconds = min(seconds, time.perf_counter() - start)
+    return seconds
+
+
+def max_difference(first, second):
+    return max(np.max(np.abs(x - y)) for a, b in zip(first, second) for x, y in zip(a, b))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--periods", nargs="*", type=int, default=[10, 14, 18])
+    args = parser.parse_args()
+
+    if not treeKernels.ENABLED:
+        use_steps(NUMPY_STEPS.values())
+        print("numba is not installed (or ASIAN_NUMBA=0): numpy steps only")
+        print(f"{'periods':>8} {'numpy (ms)':>11}")
+        for tree__periods in args.periods:
+            print(f"{tree__periods:>8} {best_time(tree__periods) * 1e3:>11.2f}")
+        sys.exit()
+
+    kernelSteps = (treeKernels.forward_step, treeKernels.backward_step, treeKernels.replication_step)
+    start = time.perf_counter()
+    use_steps(kernelSteps)
+    passes(2)
+    print(f"kernel compilation or cache load: {time.perf_counter() - start:.2f} s")
+
+    print(f"{'periods':>8} {'numpy (ms)':>11} {'numba (ms)':>11} {'speedup':>8} {'max diff':>9}")
+    for tree__periods in args.periods:
+        use_steps(NUMPY_STEPS.values())
+        numpyTime, numpyOutputs = best_time(tree__periods), passes(tree__periods)
+        use_steps(kernelSteps)
+        numbaTime, numbaOutputs = best_time(tree__periods), passes(tree__periods)
+        difference = max_difference(numpyOutputs, numbaOutputs)
+        print(f"{tree__periods:>8} {numpyTime * 1e3:>11.2f} {numbaTime * 1e3:>11.2f} {numpyTime / numbaTime:>7.1f}x "
+              f"{difference:>9.1e}")
@@ -0,0 +1,66 @@
+# Time of the closed-form layout (treeLayout.tree_layout) against the former networkx layout: a graph of the tree,
+# a position per node from a running counter over G.nodes(), and per-edge appends. The latter needs networkx.
+#
+#   python benchmarks/bench_layout.py
+#   python benchmarks/bench_layout.py 10 15 18
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Asian_Option_CRR import price_asian_crr
+from treeLayout import tree_layout
+
+
+def networkx_layout(tree__periods):
+    import networkx as nx
+
+    G_Stock = nx.Graph()
+    for i in range(0, tree__periods):
+        for j in range(1, (2 ** i) + 1):
+            G_Stock.add_edge((i, j), (i + 1, 2 * j - 1))
+            G_Stock.add_edge((i, j), (i + 1, 2 * j))
+
+    pos = {}
+    count = tree__periods
+    for node in G_Stock.nodes():
+        pos[node] = (node[0], tree__periods + 2 + node[0] - (2 + count) * node[1])
+        count += 1
+
+    edge_x, edge_y = [], []
+    for edge in G_Stock.edges():
+        x0, y0 = pos[edge[0]]
+        x1, y1 = pos[edge[1]]
+        edge_x += [x0, x1, None]
+        edge_y += [y0, y1, None]
+
+    node_x = [pos[node][0] for node in pos]
+    node_y = [pos[node][1] for node in pos]
+    return edge_x, edge_y, node_x, node_y
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("periods", nargs="*", type=int, default=[10, 15, 17])
+    args = parser.parse_args()
+
+    print(f"{'periods':>8} {'networkx (s)':>13} {'closed form (s)':>16} {'price only (s)':>15} {'same':>5}")
+    for tree__periods in args.periods:
+        formulaTime, formula = timed(tree_layout, tree__periods)
+        priceTime, _ = timed(price_asian_crr, "Call", 100, 100, 0.05, 3, 0.10, 0.15, tree__periods)
+        try:
+            networkxTime, reference = timed(networkx_layout, tree__periods)
+        except ImportError:
+            print(f"{tree__periods:>8} {'-':>13} {formulaTime:>16.3f} {priceTime:>15.3f} {'-':>5}")
+            continue
+        print(f"{tree__periods:>8} {networkxTime:>13.3f} {formulaTime:>16.3f} {priceTime:>15.3f} "
+              f"{str(list(formula) == list(reference)):>5}")
@@ -0,0 +1,42 @@
+# Scaling of price_portfolio with the number of worker processes.
+#
+#   python benchmarks/bench_portfolio.py
+#   python benchmarks/bench_portfolio.py --contracts 200000 --periods 8 --workers 1 2 4 8 16 32
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Asian_Option_CRR import price_asian_crr_batch
+from bench_batch import random_contracts
+from portfolioPricing import price_portfolio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contracts", type=int, default=50000)
+    parser.add_argument("--periods", type=int, default=8)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--workers", nargs="*", type=int,
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    contracts = random_contracts(args.contracts)
+    reference = price_asian_crr_batch(tree__periods=args.periods, **contracts)
+
+    print(f"{'workers':>8} {'wall (s)':>9} {'speedup':>8} {'efficiency':>10} {'busiest (s)':>11} {'idlest (s)':>10} {'max diff':>9}")
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        prices, deltas, workerStats = price_portfolio(contracts, args.periods, workers=workers, chunk_size=args.chunk_size)
+        wall = time.perf_counter() - start
+        baseline = baseline or wall
+
+        busy = [stats["seconds"] for stats in workerStats.values()]
+        print(f"{workers:>8} {wall:>9.3f} {baseline / wall:>7.2f}x {baseline / wall / workers:>10.0%} "
+              f"{max(busy):>11.3f} {min(busy):>10.3f} {np.max(np.abs(prices - reference)):>9.1e}")
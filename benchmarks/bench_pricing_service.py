@@ -0,0 +1,91 @@
+# Load generator for the JSON pricing endpoint: closed-loop clients, each sending single-contract requests to
+# POST /api/price one after the other, with distinct random contracts (cache misses). Reports the throughput, the client
+# latency percentiles and the mean engine batch size (X-Pricing-Batch-Size) for each batching window.
+#
+# Without --url, a threaded local Flask server with only the pricing routes is started for each window. With --url,
+# the requests go to a running app (e.g. gunicorn app:server --threads 8) and its own window is used.
+#
+#   python benchmarks/bench_pricing_service.py
+#   python benchmarks/bench_pricing_service.py --clients 32 --windows 0 2 5 --periods 12
+#   python benchmarks/bench_pricing_service.py --url http://127.0.0.1:8000
+
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import resultCache
+from pricingService import MicroBatcher, install_pricing_routes
+
+
+def local_server(window_ms):
+    import flask
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = flask.Flask(__name__)
+    install_pricing_routes(server, MicroBatcher(window_ms=window_ms))
+    httpServer = make_server("127.0.0.1", 0, server, threaded=True)
+    threading.Thread(target=httpServer.serve_forever, daemon=True).start()
+    return httpServer, f"http://127.0.0.1:{httpServer.server_port}"
+
+
+def client(url, tree__periods, seconds, seed, latencies, batchSizes):
+    rng = np.random.default_rng(seed)
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        contract = {"CallOrPut": str(rng.choice(["Call", "Put"])), "S": float(rng.uniform(80, 120)),
+                    "K": float(rng.uniform(80, 120)), "rf": 0.05, "T": 3, "mu": 0.10, "vol": 0.15,
+                    "tree__periods": tree__periods}
+        request = urllib.request.Request(url + "/api/price", data=json.dumps(contract).encode(),
+                                         headers={"Content-Type": "application/json"})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            batchSizes.append(int(response.headers["X-Pricing-Batch-Size"]))
+        latencies.append(time.perf_counter() - start)
+
+
+def run_load(url, clients, tree__periods, seconds):
+    latencies, batchSizes = [], []
+    threads = [threading.Thread(target=client, args=(url, tree__periods, seconds, seed, latencies, batchSizes))
+               for seed in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+    return len(latencies) / elapsed, p50, p99, np.mean(batchSizes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--periods", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--windows", nargs="*", type=float, default=[0, 2, 5])
+    args = parser.parse_args()
+
+    print(f"{'window (ms)':>12} {'requests/s':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'mean batch':>11}")
+    for window in ([None] if args.url else args.windows):
+        if args.url:
+            url = args.url
+        else:
+            resultCache.repStratCache.clear()
+            httpServer, url = local_server(window)
+        throughput, p50, p99, meanBatch = run_load(url, args.clients, args.periods, args.seconds)
+        if not args.url:
+            httpServer.shutdown()
+        print(f"{'app' if window is None else window:>12} {throughput:>11.0f} {p50:>9.2f} {p99:>9.2f} {meanBatch:>11.1f}")
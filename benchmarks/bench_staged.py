@@ -0,0 +1,49 @@
+# Slider drags through the staged engine against full recomputations with RepStrat_Asian_Option_CRR_Array: each drag
+# moves one input over its slider positions, the others held at the app defaults.
+#
+#   python benchmarks/bench_staged.py
+#   python benchmarks/bench_staged.py --periods 10 14
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Array
+from stagedEngine import StagedRepStrat
+
+DEFAULTS = dict(CallOrPut="Call", S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+DRAGS = {"K": np.arange(80, 121, 2.0), "CallOrPut": ["Put", "Call"] * 5, "rf": np.arange(0, 0.1001, 0.01),
+         "mu": np.arange(-0.1, 0.1001, 0.01), "vol": np.arange(0.05, 0.3001, 0.01)}
+
+
+def drag_inputs(slider, tree__periods):
+    return [dict(DEFAULTS, tree__periods=tree__periods, **{slider: value}) for value in DRAGS[slider]]
+
+
+def total_time(compute, drag):
+    start = time.perf_counter()
+    for inputs in drag:
+        compute(**inputs)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--periods", nargs="*", type=int, default=[8, 12])
+    args = parser.parse_args()
+
+    print(f"{'periods':>8} {'slider':>10} {'full (ms/step)':>15} {'staged (ms/step)':>17} {'speedup':>8}")
+    for tree__periods in args.periods:
+        for slider in DRAGS:
+            drag = drag_inputs(slider, tree__periods)
+            engine = StagedRepStrat()
+            engine.compute(**DEFAULTS, tree__periods=tree__periods)
+
+            full = total_time(RepStrat_Asian_Option_CRR_Array, drag) / len(drag)
+            staged = total_time(engine.compute, drag) / len(drag)
+            print(f"{tree__periods:>8} {slider:>10} {full * 1e3:>15.2f} {staged * 1e3:>17.2f} {full / staged:>7.1f}x")
@@ -0,0 +1,57 @@
+# Cold start of a worker: a new interpreter imports the app and serves its first requests (the page, its layout and
+# its dependencies, through the Flask test client). Reports the import time, the time from the process start to the
+# first complete response, and the peak RSS of the process. Each --repo is a checkout to measure, e.g. the current
+# tree against an older commit checked out with `git worktree add /tmp/before <commit>`.
+#
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --repo /tmp/before . --runs 10
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# run in the worker process: prints the import time, the end of the first responses (epoch seconds) and the peak RSS
+WORKER = """
+import json, resource, sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+import app
+importSeconds = time.perf_counter() - start
+with app.server.test_client() as client:
+    for path in ("/", "/_dash-layout", "/_dash-dependencies"):
+        assert client.get(path).status_code == 200, path
+firstResponse = time.time()
+print(json.dumps({"import": importSeconds, "first_response": firstResponse,
+                  "rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+                  "layout_bytes": len(app.server.test_client().get("/_dash-layout").data)}))
+"""
+
+
+def start_worker(repo):
+    start = time.time()
+    output = subprocess.run([sys.executable, "-c", WORKER], cwd=repo, capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONPATH=repo))
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result["first_response"] -= start
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repo", nargs="*", default=[REPO])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'repo':>30} {'import (s)':>11} {'first response (s)':>19} {'peak RSS (MB)':>14} {'layout (kB)':>12}")
+    for repo in args.repo:
+        runs = [start_worker(os.path.abspath(repo)) for _ in range(args.runs)]
+        median = {key: np.median([run[key] for run in runs]) for key in runs[0]}
+        print(f"{os.path.abspath(repo)[-30:]:>30} {median['import']:>11.3f} {median['first_response']:>19.3f} "
+              f"{median['rss_bytes'] / 2 ** 20:>14.1f} {median['layout_bytes'] / 1e3:>12.1f}")
@@ -0,0 +1,63 @@
+# Size of the dcc.Store payload and time spent (de)serializing it, for the legacy JSON tuple and the compact encoding.
+#
+# "store" is the time to build and serialize the payload in get_rep_strat_data, "per figure" the time a figure
+# callback spends parsing the payload and getting its labels and coordinates (there are six of them).
+#
+#   python benchmarks/bench_store_payload.py
+#   python benchmarks/bench_store_payload.py --periods 8 12 14
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from plotly.utils import PlotlyJSONEncoder
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Array
+from storeEncoding import encode_rep_strat, decode_labels, decode_layout
+
+INPUTS = dict(CallOrPut="Call", S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+def timed(function, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def legacy_figure(payload):
+    data = json.loads(payload)
+    return data[5], data[6], data[7], data[8], data[9]
+
+
+def compact_figure(payload):
+    data = json.loads(payload)
+    return decode_labels(data, "stocks"), decode_layout(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--periods", nargs="*", type=int, default=[3, 8, 12, 14])
+    args = parser.parse_args()
+
+    print(f"{'periods':>8} {'format':>8} {'bytes':>12} {'gzip':>11} {'store (ms)':>11} {'per figure (ms)':>16}")
+    for tree__periods in args.periods:
+        result = RepStrat_Asian_Option_CRR_Array(tree__periods=tree__periods, **INPUTS)
+
+        legacyTime, legacy = timed(lambda: json.dumps(result, cls=PlotlyJSONEncoder))
+        compactTime, compact = timed(lambda: json.dumps(encode_rep_strat(result, tree__periods), cls=PlotlyJSONEncoder))
+        legacyFigure, legacyLabels = timed(lambda: legacy_figure(legacy))
+        compactFigure, compactLabels = timed(lambda: compact_figure(compact))
+        assert legacyLabels[0] == compactLabels[0]
+
+        for name, payload, storeTime, figureTime in (("json", legacy, legacyTime, legacyFigure),
+                                                     ("compact", compact, compactTime, compactFigure)):
+            print(f"{tree__periods:>8} {name:>8} {len(payload):>12,} {len(gzip.compress(payload.encode())):>11,} "
+                  f"{storeTime * 1e3:>11.2f} {figureTime * 1e3:>16.2f}")
@@ -0,0 +1,45 @@
+# Runtime and peak numpy allocation (tracemalloc) of the streaming price-only mode against the in-memory fast path.
+#
+#   python benchmarks/bench_streaming.py
+#   python benchmarks/bench_streaming.py 20 24 28 --max-memory-mb 64 --skip-full-above 22
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Asian_Option_CRR import price_asian_crr, price_asian_crr_streaming
+
+INPUTS = dict(CallOrPut="Call", S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+def measured(function, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    price = function(**kwargs)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return price, elapsed, peak / 2 ** 20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("periods", nargs="*", type=int, default=[16, 20, 24])
+    parser.add_argument("--max-memory-mb", type=float, default=64)
+    parser.add_argument("--skip-full-above", type=int, default=22)
+    args = parser.parse_args()
+
+    print(f"{'periods':>8} {'price':>10} {'stream (s)':>11} {'stream (MB)':>12} {'full (s)':>9} {'full (MB)':>10}")
+    for tree__periods in args.periods:
+        price, streamTime, streamPeak = measured(price_asian_crr_streaming, tree__periods=tree__periods,
+                                                 max_memory_bytes=args.max_memory_mb * 2 ** 20, **INPUTS)
+        if tree__periods > args.skip_full_above:
+            print(f"{tree__periods:>8} {price:>10.5f} {streamTime:>11.2f} {streamPeak:>12.1f} {'-':>9} {'-':>10}")
+            continue
+
+        _, fullTime, fullPeak = measured(price_asian_crr, tree__periods=tree__periods, **INPUTS)
+        print(f"{tree__periods:>8} {price:>10.5f} {streamTime:>11.2f} {streamPeak:>12.1f} {fullTime:>9.2f} {fullPeak:>10.1f}")
@@ -0,0 +1,49 @@
+# Convergence of the representative-sums lattice (price_asian_crr_lattice) against the exact exponential tree
+# (price_asian_crr) for small trees, and timings of the lattice on long trees. --band caps the grids (see band_width):
+# a narrow band shows whether the cap biases the price, i.e. whether the error stops falling with the grid points.
+#
+#   python benchmarks/lattice_convergence.py
+#   python benchmarks/lattice_convergence.py --exact 4 8 12 16 --grid 25 50 100 --long 500 1000
+#   python benchmarks/lattice_convergence.py --band 1.5
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Asian_Option_CRR import price_asian_crr, price_asian_crr_lattice
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--exact", nargs="*", type=int, default=[4, 8, 12, 16, 20])
+    parser.add_argument("--grid", nargs="*", type=int, default=[50, 100, 200, 400])
+    parser.add_argument("--long", nargs="*", type=int, default=[500, 1000, 2000])
+    parser.add_argument("--band", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print("Error of the lattice against the exact tree")
+    print(f"{'option':>6} {'periods':>8} {'exact':>10} " + " ".join(f"{'M=' + str(m):>10}" for m in args.grid))
+    for CallOrPut in ("Call", "Put"):
+        for tree__periods in args.exact:
+            exact = price_asian_crr(CallOrPut, tree__periods=tree__periods, **INPUTS)
+            errors = [price_asian_crr_lattice(CallOrPut, tree__periods=tree__periods, grid_points=m,
+                                              band_width=args.band, **INPUTS) - exact
+                      for m in args.grid]
+            print(f"{CallOrPut:>6} {tree__periods:>8} {exact:>10.5f} " + " ".join(f"{e:>10.2e}" for e in errors))
+
+    print()
+    print("Lattice price and time on long trees (Call)")
+    print(f"{'periods':>8} " + " ".join(f"{'M=' + str(m):>20}" for m in args.grid))
+    for tree__periods in args.long:
+        cells = []
+        for m in args.grid:
+            start = time.perf_counter()
+            price = price_asian_crr_lattice("Call", tree__periods=tree__periods, grid_points=m, band_width=args.band,
+                                            **INPUTS)
+            cells.append(f"{price:>9.5f} ({time.perf_counter() - start:>6.2f}s)")
+        print(f"{tree__periods:>8} " + " ".join(f"{c:>20}" for c in cells))
@@ -0,0 +1,159 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from Asian_Option_CRR import (RepStrat_Asian_Option_CRR_Array, RepStrat_Asian_Option_CRR_Bands, lattice_nodes,
+                              price_asian_crr_lattice)
+from instrumentation import PeakAllocation, unrecorded
+from storeEncoding import encode_bands, encode_rep_strat
+
+#######################################################################################################################
+### Cost model and guardrails for tree__periods
+###
+### The tree engines cost O(2**tree__periods): 30 periods is about 2**31 nodes per structure and takes the worker
+### down. Each engine is run once, on first use, on a small tree to measure its time and peak memory per unit of work,
+### and requests are routed with the extrapolated estimate:
+###
+###   tree     full replication strategy with per-node labels and layout    2**(N+1) - 1 nodes
+###   bands    level-of-detail (min, median, max) bands of each level        2**(N+1) - 1 nodes, no labels
+###   lattice  price only, from the polynomial-time Hull-White lattice       lattice_nodes(N) (time), N+1 (memory)
+###
+### The first engine within ASIAN_MAX_REQUEST_SECONDS and ASIAN_MAX_REQUEST_BYTES is used. Trees that the app would
+### draw as bands anyway (over ASIAN_LOD_MAX_NODES nodes) skip the tree engine. Requests no engine can serve are
+### rejected.
+###
+### The app calibrates on first use (get_cost_model), not at import. With ASIAN_COST_MODEL_FILE set, the rates are
+### read from that JSON file if it exists, and written there after a calibration otherwise, so that later workers
+### and restarts skip it. The file can also be written by hand to override the measured rates.
+#######################################################################################################################
+
+MAX_REQUEST_SECONDS = float(os.environ.get("ASIAN_MAX_REQUEST_SECONDS", 10))
+MAX_REQUEST_BYTES = int(os.environ.get("ASIAN_MAX_REQUEST_BYTES", 2 ** 30))
+COST_MODEL_FILE = os.environ.get("ASIAN_COST_MODEL_FILE")
+
+ENGINES = ("tree", "bands", "lattice")
+
+# calibration inputs (the app defaults) and tree size of each engine
+CALIBRATION_INPUTS = ("Call", 100, 100, 0.05, 3, 0.10, 0.15)
+CALIBRATION_PERIODS = {"tree": 12, "bands": 14, "lattice": 50}
+
+# what a request computes with each engine, with the store encoding the callback adds
+ENGINE_FUNCTIONS = {"tree": lambda *inputs: encode_rep_strat(RepStrat_Asian_Option_CRR_Array(*inputs), inputs[-1]),
+                    "bands": lambda *inputs: encode_bands(RepStrat_Asian_Option_CRR_Bands(*inputs), inputs[-1]),
+                    "lattice": price_asian_crr_lattice}
+
+
+# units of work for the time and for the memory of an engine, capped so that absurd inputs give a huge estimate
+# instead of an overflow or a huge allocation
+def _units(engine, tree__periods):
+    if engine == "lattice":
+        return lattice_nodes(min(tree__periods, 10 ** 6)), tree__periods + 1
+    nodes = 2.0 ** min(tree__periods + 1, 1000) - 1
+    return nodes, nodes
+
+
+# the engines' own phases are neither recorded in the instrumentation metrics nor allowed to reset this peak
+def _measure(engine, tree__periods, repeat=3):
+    function = ENGINE_FUNCTIONS[engine]
+    with unrecorded():
+        seconds = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function(*CALIBRATION_INPUTS, tree__periods)
+            seconds = min(seconds, time.perf_counter() - start)
+
+        # tracemalloc may already be running for the instrumentation, in which case it is left running
+        wasTracing = tracemalloc.is_tracing()
+        if not wasTracing:
+            tracemalloc.start()
+        with PeakAllocation() as allocation:
+            function(*CALIBRATION_INPUTS, tree__periods)
+        if not wasTracing:
+            tracemalloc.stop()
+    return seconds, allocation.peak_bytes
+
+
+class CostModel:
+    # rates: engine -> (seconds per time unit, bytes per memory unit)
+    def __init__(self, rates, max_seconds=MAX_REQUEST_SECONDS, max_bytes=MAX_REQUEST_BYTES):
+        self.rates = rates
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def calibrate(cls, **limits):
+        rates = {}
+        for engine in ENGINES:
+            seconds, peakBytes = _measure(engine, CALIBRATION_PERIODS[engine])
+            timeUnits, memoryUnits = _units(engine, CALIBRATION_PERIODS[engine])
+            rates[engine] = (seconds / timeUnits, peakBytes / memoryUnits)
+        return cls(rates, **limits)
+
+    # rates file: {engine: [seconds per time unit, bytes per memory unit]}
+    @classmethod
+    def load(cls, path, **limits):
+        with open(path) as file:
+            rates = json.load(file)
+        return cls({engine: tuple(rates[engine]) for engine in ENGINES}, **limits)
+
+    # written to a temporary file first, so that a worker reading it never sees it half written
+    def save(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile("w", dir=directory, suffix=".tmp", delete=False) as file:
+            json.dump({engine: list(rates) for engine, rates in self.rates.items()}, file)
+        os.replace(file.name, path)
+
+    # {"seconds", "bytes"} predicted for a request
+    def estimate(self, engine, tree__periods):
+        timeUnits, memoryUnits = _units(engine, tree__periods)
+        secondsPerUnit, bytesPerUnit = self.rates[engine]
+        return {"seconds": secondsPerUnit * timeUnits, "bytes": bytesPerUnit * memoryUnits}
+
+    def within_limits(self, estimate):
+        return estimate["seconds"] <= self.max_seconds and estimate["bytes"] <= self.max_bytes
+
+    # (engine, estimate) for the request, engine "reject" if none is within the limits
+    def plan(self, tree__periods, lod_max_nodes=None):
+        if tree__periods is None or tree__periods < 1:
+            return "reject", None
+
+        engines = ENGINES
+        if lod_max_nodes is not None and _units("tree", tree__periods)[0] > lod_max_nodes:
+            engines = ENGINES[1:]
+
+        for engine in engines:
+            estimate = self.estimate(engine, tree__periods)
+            if self.within_limits(estimate):
+                return engine, estimate
+        return "reject", estimate
+
+    def stats(self):
+        return {"rates": {engine: {"seconds_per_unit": seconds, "bytes_per_unit": bytesPerUnit}
+                          for engine, (seconds, bytesPerUnit) in self.rates.items()},
+                "max_seconds": self.max_seconds, "max_bytes": self.max_bytes}
+
+
+_costModel = None
+_costModelLock = threading.Lock()
+
+
+# the cost model of this process, loaded or calibrated on the first call
+def get_cost_model(path=COST_MODEL_FILE):
+    global _costModel
+    with _costModelLock:
+        if _costModel is None:
+            if path and os.path.exists(path):
+                _costModel = CostModel.load(path)
+            else:
+                _costModel = CostModel.calibrate()
+                if path:
+                    _costModel.save(path)
+        return _costModel
+
+
+def format_estimate(estimate):
+    seconds, megabytes = estimate["seconds"], estimate["bytes"] / 2 ** 20
+    return f"{seconds:.2g} s, {megabytes:.3g} MB" if seconds < 3600 else f"{seconds / 3600:.2g} h, {megabytes:.3g} MB"
@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+
+from Asian_Option_CRR import _payoff_signs, price_asian_crr_batch, price_asian_levy
+
+#######################################################################################################################
+### Implied volatility
+###
+### Backs out the vol at which the CRR tree reprices quoted Asian premiums. Each tree price costs 2**tree__periods
+### leaves, so the solver spends as few of them as it can:
+###
+###   - the seed is the vol implied by the Levy approximation, found by bisection on the closed form (no tree)
+###   - the first step is a Newton step from the seed, with the Levy vega standing in for the tree vega
+###   - the following steps are secant steps through the last two tree prices, kept inside a bracket of the root.
+###     A step that leaves the bracket, or that does not halve the pricing error, is replaced by a bisection of the
+###     bracket, so the solver cannot do worse than bisection (as in Brent's method).
+###
+### The bracket starts at [vol_min, vol_max]: vol_min is the smallest vol for which probUp is within (0, 1), since
+### u = exp(mu step + vol sqrt(step)) must stay above exp(rf step) > d. Quotes outside the tree prices at the two
+### ends have no implied vol and come back as NaN.
+###
+### The batch form solves a whole quote sheet at once: each round prices the quotes that have not converged yet
+### with price_asian_crr_batch.
+#######################################################################################################################
+
+_VOL_MAX = 5.0
+_LEVY_BISECTIONS = 60
+
+
+# smallest vol with probUp strictly within (0, 1)
+def _vol_min(rf, T, mu, tree__periods):
+    return np.abs(mu - rf) * np.sqrt(T / tree__periods) * (1 + 1e-9) + 1e-9
+
+
+def _levy_implied_vol(price, contract, volLow, volHigh):
+    low, high = volLow.copy(), volHigh.copy()
+    for _ in range(_LEVY_BISECTIONS):
+        middle = (low + high) / 2
+        above = price_asian_levy(vol=middle, **contract) > price
+        high, low = np.where(above, middle, high), np.where(above, low, middle)
+    return (low + high) / 2
+
+
+def _levy_vega(contract, vol, h=1e-5):
+    return (price_asian_levy(vol=vol + h, **contract) - price_asian_levy(vol=vol - h, **contract)) / (2 * h)
+
+
+# returns a dict of arrays with the broadcast shape of the inputs: "vol" (NaN where there is no implied vol),
+# "iterations" (tree prices per quote, the two bracket ends included), "converged", and "seconds" for the whole sheet
+def implied_vol_asian_crr_batch(price, CallOrPut, S, K, rf, T, mu, tree__periods, tol=1e-8, max_iterations=50):
+    start = time.perf_counter()
+    _payoff_signs(CallOrPut)
+    price, CallOrPut, S, K, rf, T, mu = np.broadcast_arrays(price, CallOrPut, S, K, rf, T, mu)
+    shape = price.shape
+    CallOrPut = np.ravel(CallOrPut)
+    price, S, K, rf, T, mu = (np.ravel(x).astype(float) for x in (price, S, K, rf, T, mu))
+    contract = lambda idx: dict(CallOrPut=CallOrPut[idx], S=S[idx], K=K[idx], rf=rf[idx], T=T[idx], mu=mu[idx],
+                                tree__periods=tree__periods)
+
+    # bracket: the pricing error (tree price - quote) is negative at low and positive at high
+    low, high = _vol_min(rf, T, mu, tree__periods), np.full(price.size, _VOL_MAX)
+    everyQuote = np.arange(price.size)
+    errorLow = price_asian_crr_batch(vol=low, **contract(everyQuote)) - price
+    errorHigh = price_asian_crr_batch(vol=high, **contract(everyQuote)) - price
+    iterations = np.full(price.size, 2)
+
+    vol = np.full(price.size, np.nan)
+    converged = np.zeros(price.size, dtype=bool)
+    converged[np.abs(errorLow) <= tol], vol[np.abs(errorLow) <= tol] = True, low[np.abs(errorLow) <= tol]
+    converged[np.abs(errorHigh) <= tol], vol[np.abs(errorHigh) <= tol] = True, high[np.abs(errorHigh) <= tol]
+    active = ~converged & (errorLow < 0) & (errorHigh > 0)
+
+    # seed, and first step with the Levy vega
+    idx = np.flatnonzero(active)
+    x = np.clip(_levy_implied_vol(price[idx], contract(idx), low[idx], high[idx]), low[idx], high[idx])
+    error = price_asian_crr_batch(vol=x, **contract(idx)) - price[idx]
+    iterations[idx] += 1
+
+    previousX, previousError = x, np.full(idx.size, np.inf)
+    levyVega = _levy_vega(contract(idx), x)
+    step = np.where(levyVega > 0, error / np.where(levyVega > 0, levyVega, 1), np.inf)
+
+    while idx.size:
+        # record the last evaluation, shrink the bracket and retire the quotes that converged
+        below = error < 0
+        low[idx], errorLow[idx] = np.where(below, x, low[idx]), np.where(below, error, errorLow[idx])
+        high[idx], errorHigh[idx] = np.where(below, high[idx], x), np.where(below, errorHigh[idx], error)
+        vol[idx] = x
+
+        done = (np.abs(error) <= tol) | (high[idx] - low[idx] <= tol * np.maximum(1, x))
+        converged[idx[done]] = True
+        keep = ~done & (iterations[idx] < max_iterations)
+        idx, x, error, previousX, previousError, step = (
+            a[keep] for a in (idx, x, error, previousX, previousError, step))
+        if not idx.size:
+            break
+
+        # safeguarded step: bisect when the step leaves the bracket or the error did not halve
+        candidate = x - step
+        slowed = np.abs(error) > np.abs(previousError) / 2
+        outside = ~((candidate > low[idx]) & (candidate < high[idx]))
+        nextX = np.where(outside | slowed, (low[idx] + high[idx]) / 2, candidate)
+
+        nextError = price_asian_crr_batch(vol=nextX, **contract(idx)) - price[idx]
+        iterations[idx] += 1
+
+        # secant slope through the last two tree prices
+        slope = (nextError - error) / (nextX - x)
+        step = np.where(slope > 0, nextError / np.where(slope > 0, slope, 1), np.inf)
+        previousX, previousError, x, error = x, error, nextX, nextError
+
+    vol[~converged] = np.nan
+    return {"vol": vol.reshape(shape), "iterations": iterations.reshape(shape), "converged": converged.reshape(shape),
+            "seconds": time.perf_counter() - start}
+
+
+# returns a dict with the implied "vol" (NaN if the quote is outside the tree prices), the number of tree prices it
+# took ("iterations"), "converged" and "seconds"
+def implied_vol_asian_crr(price, CallOrPut, S, K, rf, T, mu, tree__periods, tol=1e-8, max_iterations=50):
+    result = implied_vol_asian_crr_batch(price, CallOrPut, S, K, rf, T, mu, tree__periods, tol, max_iterations)
+    return {"vol": float(result["vol"]), "iterations": int(result["iterations"]),
+            "converged": bool(result["converged"]), "seconds": result["seconds"]}
@@ -0,0 +1,194 @@
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+
+import numpy as np
+
+#######################################################################################################################
+### Per-phase instrumentation
+###
+### With ASIAN_INSTRUMENTATION=1, the engines and the app record the wall time and the peak allocation of each phase
+### (forward pass, backward pass, replication, labels, layout, store encoding, the Dash callback, and the JSON
+### serialisation of its response). Each measurement is logged as one JSON line on the "asian.instrumentation"
+### logger (stderr, or the file ASIAN_INSTRUMENTATION_LOG), and the last ASIAN_INSTRUMENTATION_HISTORY ones per
+### phase and tree__periods are kept for the latency percentiles served at /metrics.
+###
+### When off, phase() returns a shared no-op context manager, so the instrumented code only pays a function call.
+### Peak allocations come from tracemalloc, which is started when on and slows allocations down: they are per
+### process, so phases running at the same time in several threads see each other's allocations. Phases run in
+### background job processes are measured there and not served at /metrics.
+#######################################################################################################################
+
+ENABLED = os.environ.get("ASIAN_INSTRUMENTATION", "") not in ("", "0")
+HISTORY = int(os.environ.get("ASIAN_INSTRUMENTATION_HISTORY", 1000))
+
+logger = logging.getLogger("asian.instrumentation")
+
+_NULL_PHASE = contextlib.nullcontext()
+_local = threading.local()
+
+
+class PhaseMetrics:
+    def __init__(self, history=HISTORY):
+        self._samples = defaultdict(lambda: deque(maxlen=history))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name, tree__periods, seconds, peakBytes):
+        with self._lock:
+            self._samples[name, tree__periods].append((seconds, peakBytes))
+            self._counts[name, tree__periods] += 1
+
+    # {phase: {tree__periods: {"count", "p50", "p90", "p99", "max" (seconds), "peak_bytes_max"}}} over the kept samples
+    def summary(self):
+        with self._lock:
+            samples = {key: np.array(values) for key, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        summary = defaultdict(dict)
+        for (name, tree__periods), values in sorted(samples.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            p50, p90, p99 = np.percentile(values[:, 0], [50, 90, 99])
+            summary[name][str(tree__periods)] = {"count": counts[name, tree__periods], "p50": p50, "p90": p90,
+                                                 "p99": p99, "max": values[:, 0].max(),
+                                                 "peak_bytes_max": int(values[:, 1].max())}
+        return dict(summary)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+metrics = PhaseMetrics()
+
+
+# tracemalloc.reset_peak is Python 3.9+. Before it, the peak is reset by restarting tracing: the traced size then
+# restarts from 0 (blocks allocated before are no longer traced), and the returned shift rebases the enclosing blocks.
+def _reset_peak():
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+        return 0
+    if not tracemalloc.is_tracing():
+        return 0
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    return current
+
+
+# peak traced allocation of a block above the traced size at its start (tracemalloc must be tracing)
+class PeakAllocation:
+    seconds = peak_bytes = None
+
+    # nested blocks: the enclosing block keeps the peak reached before tracemalloc's peak is reset for this one
+    def __enter__(self):
+        stack = _local.__dict__.setdefault("stack", [])
+        if stack:
+            stack[-1][1] = max(stack[-1][1], tracemalloc.get_traced_memory()[1])
+        shift = _reset_peak()
+        for entry in stack:
+            entry[0] -= shift
+            entry[1] -= shift
+        current = tracemalloc.get_traced_memory()[0]
+        stack.append([current, current])
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self._start
+        stack = _local.stack
+        start, peak = stack.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        self.peak_bytes = max(peak - start, 0)
+        return False
+
+
+class _Phase(PeakAllocation):
+    def __init__(self, name, tree__periods):
+        self.name = name
+        self.tree__periods = tree__periods
+
+    def __exit__(self, *exc_info):
+        super().__exit__(*exc_info)
+        record(self.name, self.tree__periods, self.seconds, self.peak_bytes)
+        return False
+
+
+def record(name, tree__periods, seconds, peakBytes=0):
+    metrics.record(name, tree__periods, seconds, peakBytes)
+    logger.info(json.dumps({"phase": name, "periods": tree__periods, "seconds": seconds, "peak_bytes": peakBytes}))
+
+
+# with phase("forward", tree__periods): ...
+def phase(name, tree__periods=None):
+    if not ENABLED or getattr(_local, "unrecorded", False):
+        return _NULL_PHASE
+    return _Phase(name, tree__periods)
+
+
+# phases run inside, in this thread, are not recorded: the cost model calibration is not a request
+@contextlib.contextmanager
+def unrecorded():
+    previous = getattr(_local, "unrecorded", False)
+    _local.unrecorded = True
+    try:
+        yield
+    finally:
+        _local.unrecorded = previous
+
+
+def enable(log_path=os.environ.get("ASIAN_INSTRUMENTATION_LOG")):
+    global ENABLED
+    ENABLED = True
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if not logger.handlers:
+        logger.addHandler(logging.FileHandler(log_path) if log_path else logging.StreamHandler())
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+# Dash callbacks run inside the request to /_dash-update-component: the response time minus the "callback" phases
+# recorded during the request is the JSON serialisation (and dispatch) added by Dash
+def install_flask_hooks(server):
+    import flask
+
+    @server.before_request
+    def start_request_timer():
+        flask.g.instrumentationStart = time.perf_counter()
+        flask.g.instrumentationCallbacks = []
+
+    @server.after_request
+    def record_response_time(response):
+        callbacks = flask.g.get("instrumentationCallbacks")
+        if callbacks:
+            seconds = time.perf_counter() - flask.g.instrumentationStart
+            tree__periods = callbacks[0][0]
+            record("response", tree__periods, seconds)
+            record("serialisation", tree__periods, seconds - sum(callbackSeconds for _, callbackSeconds in callbacks))
+        return response
+
+
+# a phase wrapping a Dash callback body, attributed to the request it runs in
+@contextlib.contextmanager
+def callback_phase(tree__periods):
+    if not ENABLED:
+        yield
+        return
+
+    import flask
+    with phase("callback", tree__periods) as timing:
+        yield
+    if flask.has_request_context() and "instrumentationCallbacks" in flask.g:
+        flask.g.instrumentationCallbacks.append((tree__periods, timing.seconds))
+
+
+if ENABLED:
+    enable()
@@ -0,0 +1,60 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Asian_Option_CRR import price_asian_crr_batch
+
+#######################################################################################################################
+### Portfolio pricing on several cores
+###
+### The contracts are split into chunks of chunk_size, each chunk is priced with price_asian_crr_batch in a worker
+### process, and the results are put back in input order. Every chunk also reports which process priced it and how
+### long it took, aggregated per worker.
+#######################################################################################################################
+
+CONTRACT_FIELDS = ("CallOrPut", "S", "K", "rf", "T", "mu", "vol")
+
+
+# contracts are either a mapping of columns (as price_asian_crr_batch takes them) or a list of mappings, one per contract
+def _as_columns(contracts):
+    if hasattr(contracts, "keys"):
+        columns = {field: np.asarray(contracts[field]) for field in CONTRACT_FIELDS}
+    else:
+        columns = {field: np.asarray([contract[field] for contract in contracts]) for field in CONTRACT_FIELDS}
+
+    columns = dict(zip(CONTRACT_FIELDS, np.broadcast_arrays(*(columns[field] for field in CONTRACT_FIELDS))))
+    return {field: np.ravel(column) for field, column in columns.items()}
+
+
+def _price_chunk(start, chunk, tree__periods):
+    began = time.perf_counter()
+    price, delta = price_asian_crr_batch(tree__periods=tree__periods, return_delta=True, **chunk)
+    return start, price, delta, os.getpid(), time.perf_counter() - began
+
+
+# returns prices and root deltas in input order, and {pid: {"chunks", "contracts", "seconds"}} for the workers used
+def price_portfolio(contracts, tree__periods, workers=None, chunk_size=2000):
+    columns = _as_columns(contracts)
+    nbrContracts = columns["S"].size
+    prices, deltas = np.empty(nbrContracts), np.empty(nbrContracts)
+    workerStats = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_price_chunk, start,
+                                   {field: column[start:start + chunk_size] for field, column in columns.items()},
+                                   tree__periods)
+                   for start in range(0, nbrContracts, chunk_size)]
+
+        for future in futures:
+            start, price, delta, pid, seconds = future.result()
+            prices[start:start + price.size] = price
+            deltas[start:start + delta.size] = delta
+
+            stats = workerStats.setdefault(pid, {"chunks": 0, "contracts": 0, "seconds": 0.0})
+            stats["chunks"] += 1
+            stats["contracts"] += price.size
+            stats["seconds"] += seconds
+
+    return prices, deltas, workerStats
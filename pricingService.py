@@ -0,0 +1,226 @@
+import math
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from Asian_Option_CRR import price_asian_crr_batch
+from instrumentation import phase
+from resultCache import price_key, repStratCache
+
+#######################################################################################################################
+### JSON pricing endpoint
+###
+### POST /api/price on the Flask server of the app, with one contract or a batch:
+###
+###   {"CallOrPut": "Call", "S": 100, "K": 100, "rf": 0.05, "T": 3, "mu": 0.1, "vol": 0.15, "tree__periods": 10}
+###       -> {"price": ..., "delta": ...}
+###   {"contracts": [{...}, ...]}
+###       -> {"results": [{"price": ..., "delta": ...}, ...]}
+###
+### Prices come from the exact tree and delta is the root number of shares. Invalid requests get a 400 with
+### {"error": ...}, and so do requests over ASIAN_PRICING_MAX_LEAVES tree leaves (2**tree__periods per distinct
+### contract; the default 2**27 is a few seconds of pricing): one request cannot hold the dispatcher for minutes.
+###
+### Micro-batching: contracts that miss the result cache are queued, and a dispatcher thread waits up to
+### ASIAN_PRICING_BATCH_WINDOW_MS after the first of them for more (across all the requests in flight). It then prices
+### ASIAN_PRICING_MAX_BATCH contracts at most, each tree__periods group with one price_asian_crr_batch call, and keeps
+### the rest for the next batch. A window of 0 prices every request in its own thread instead, in batches of the same
+### size. Batching only helps when the server handles requests concurrently: gunicorn with --threads (4 in the
+### Procfile), or the threaded Flask server.
+###
+### Each response reports its timings in headers:
+###   X-Pricing-Latency-Ms    time spent handling the request
+###   X-Pricing-Queue-Ms      longest time one of its contracts waited for its batch to be priced
+###   X-Pricing-Batch-Size    largest engine batch its contracts were priced in
+###   X-Pricing-Cache-Hits    contracts answered from the result cache
+#######################################################################################################################
+
+BATCH_WINDOW_MS = float(os.environ.get("ASIAN_PRICING_BATCH_WINDOW_MS", 2))
+MAX_BATCH = int(os.environ.get("ASIAN_PRICING_MAX_BATCH", 1024))
+MAX_PERIODS = int(os.environ.get("ASIAN_PRICING_MAX_PERIODS", 20))
+MAX_CONTRACTS = int(os.environ.get("ASIAN_PRICING_MAX_CONTRACTS", 10000))
+MAX_LEAVES = int(os.environ.get("ASIAN_PRICING_MAX_LEAVES", 2 ** 27))
+
+CONTRACT_FIELDS = ("CallOrPut", "S", "K", "rf", "T", "mu", "vol", "tree__periods")
+
+
+class InvalidContract(ValueError):
+    pass
+
+
+def _number(contract, field):
+    value = contract.get(field)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise InvalidContract(f"{field} must be a finite number, got {value!r}")
+    return value
+
+
+# the contract as an exact cache key, see resultCache.price_key
+def contract_key(contract, max_periods=MAX_PERIODS):
+    if not isinstance(contract, dict):
+        raise InvalidContract(f"a contract must be a JSON object, got {contract!r}")
+    missing = [field for field in CONTRACT_FIELDS if field not in contract]
+    if missing:
+        raise InvalidContract(f"missing fields: {', '.join(missing)}")
+
+    CallOrPut = contract["CallOrPut"]
+    if CallOrPut not in ("Call", "Put"):
+        raise InvalidContract(f"CallOrPut must be 'Call' or 'Put', got {CallOrPut!r}")
+    S, K, rf, T, mu, vol = (_number(contract, field) for field in ("S", "K", "rf", "T", "mu", "vol"))
+    if S <= 0 or K < 0 or T <= 0 or vol <= 0:
+        raise InvalidContract("S, T and vol must be positive and K non-negative")
+    tree__periods = contract["tree__periods"]
+    if isinstance(tree__periods, bool) or not isinstance(tree__periods, int) or not 1 <= tree__periods <= max_periods:
+        raise InvalidContract(f"tree__periods must be an integer from 1 to {max_periods}, got {tree__periods!r}")
+
+    return price_key(CallOrPut, S, K, rf, T, mu, vol, tree__periods)
+
+
+# prices the keys (without duplicates) with one engine call per tree__periods: {key: (price, delta)}
+def price_keys(keys):
+    results = {}
+    byPeriods = {}
+    for key in keys:
+        byPeriods.setdefault(key[-1], []).append(key)
+
+    for tree__periods, group in byPeriods.items():
+        columns = list(zip(*(key[1:-1] for key in group)))
+        with phase("api_batch", tree__periods):
+            prices, deltas = price_asian_crr_batch(np.array(columns[0]), *(np.array(column) for column in columns[1:]),
+                                                   tree__periods, return_delta=True)
+        for key, price, delta in zip(group, prices.tolist(), deltas.tolist()):
+            results[key] = (price, delta)
+    return results
+
+
+class MicroBatcher:
+    def __init__(self, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = self.contracts = 0
+
+    # the dispatcher is started on the first request, in the worker process (not in a gunicorn --preload master)
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name="pricing-batcher", daemon=True)
+                self._thread.start()
+
+    # returns {key: Future of (price, delta, batch size, seconds queued)}
+    def submit(self, keys):
+        futures = {key: Future() for key in keys}
+        if not futures:
+            return futures
+
+        if self.window <= 0:
+            pending = [(key, future, time.perf_counter()) for key, future in futures.items()]
+            for start in range(0, len(pending), self.max_batch):
+                self._price(pending[start:start + self.max_batch])
+        else:
+            self._start()
+            enqueued = time.perf_counter()
+            self._queue.put([(key, future, enqueued) for key, future in futures.items()])
+        return futures
+
+    # contracts over max_batch wait for the next batch, ahead of the requests queued since
+    def _dispatch(self):
+        pending = []
+        while True:
+            if not pending:
+                pending = self._queue.get()
+            deadline = time.perf_counter() + self.window
+            while len(pending) < self.max_batch:
+                try:
+                    pending += self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+            self._price(pending[:self.max_batch])
+            pending = pending[self.max_batch:]
+
+    # one key can be pending for several requests: it is priced once and given to all of them
+    def _price(self, pending):
+        started = time.perf_counter()
+        keys = list(dict.fromkeys(key for key, future, enqueued in pending))
+        try:
+            results = price_keys(keys)
+        except Exception as error:
+            for key, future, enqueued in pending:
+                future.set_exception(error)
+            return
+
+        with self._lock:
+            self.batches += 1
+            self.contracts += len(keys)
+        for key, future, enqueued in pending:
+            future.set_result(results[key] + (len(keys), started - enqueued))
+
+    def stats(self):
+        with self._lock:
+            return {"window_ms": self.window * 1000, "max_batch": self.max_batch, "batches": self.batches,
+                    "contracts": self.contracts, "mean_batch": self.contracts / self.batches if self.batches else 0.0}
+
+
+# (results in the order of the contracts, headers). Raises InvalidContract.
+def price_contracts(contracts, batcher, max_periods=MAX_PERIODS, max_leaves=MAX_LEAVES):
+    keys = [contract_key(contract, max_periods) for contract in contracts]
+    leaves = sum(2 ** key[-1] for key in dict.fromkeys(keys))
+    if leaves > max_leaves:
+        raise InvalidContract(f"the contracts add up to {leaves} tree leaves, over the limit of {max_leaves}: "
+                              f"split the request or lower tree__periods")
+
+    cached = {}
+    for key in dict.fromkeys(keys):
+        result = repStratCache.get(key)
+        if result is not None:
+            cached[key] = result
+    futures = batcher.submit([key for key in dict.fromkeys(keys) if key not in cached])
+
+    batchSize, queueSeconds = 0, 0.0
+    for key, future in futures.items():
+        price, delta, size, queued = future.result()
+        cached[key] = (price, delta)
+        repStratCache.put(key, (price, delta))
+        batchSize, queueSeconds = max(batchSize, size), max(queueSeconds, queued)
+
+    results = [{"price": cached[key][0], "delta": cached[key][1]} for key in keys]
+    headers = {"X-Pricing-Queue-Ms": f"{queueSeconds * 1000:.3f}", "X-Pricing-Batch-Size": str(batchSize),
+               "X-Pricing-Cache-Hits": str(sum(key in cached and key not in futures for key in keys))}
+    return results, headers
+
+
+def install_pricing_routes(server, batcher=None, max_periods=MAX_PERIODS, max_contracts=MAX_CONTRACTS,
+                           max_leaves=MAX_LEAVES):
+    import flask
+
+    batcher = batcher if batcher is not None else MicroBatcher()
+
+    @server.route("/api/price", methods=["POST"])
+    def api_price():
+        start = time.perf_counter()
+        body = flask.request.get_json(silent=True)
+        isBatch = isinstance(body, dict) and "contracts" in body
+        contracts = body["contracts"] if isBatch else [body]
+
+        try:
+            if not isinstance(contracts, list) or not 1 <= len(contracts) <= max_contracts:
+                raise InvalidContract(f"contracts must be a list of 1 to {max_contracts} contracts")
+            results, headers = price_contracts(contracts, batcher, max_periods, max_leaves)
+        except InvalidContract as error:
+            headers = {}
+            response = flask.jsonify({"error": str(error)})
+            response.status_code = 400
+        else:
+            response = flask.jsonify({"results": results} if isBatch else results[0])
+
+        headers["X-Pricing-Latency-Ms"] = f"{(time.perf_counter() - start) * 1000:.3f}"
+        response.headers.update(headers)
+        return response
+
+    return batcher
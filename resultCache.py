@@ -0,0 +1,144 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Bands
+from sharedCache import SharedTreeCache
+from stagedEngine import StagedRepStrat
+
+#######################################################################################################################
+### Result cache for the Dash callback
+###
+### Bounded LRU memoization of the replication strategy. Inputs are normalized to the app's slider steps
+### before being used as key (and as engine inputs), so moving a slider back to a value already shown, or toggling
+### Call/Put back and forth, is a cache hit. The cache is capped in bytes, the label lists dominating the size.
+###
+### When ASIAN_SHARED_CACHE_DIR is set, misses are looked up in the on-disk cache shared by all the workers
+### (sharedCache) before computing the tree, and computed trees are published there. Shared hits are memory-mapped and
+### are not kept in the LRU (each mapping holds a file descriptor): the next request for them reads the mapping again.
+###
+### Level-of-detail bands of large trees (see costModel) are kept in the same LRU, under their own keys, and so are
+### the prices and deltas of the JSON pricing endpoint (pricingService), keyed by the exact inputs: API callers do not
+### move sliders, and rounding their rates to 1% would change the price.
+###
+### Misses are computed by the staged engine (stagedEngine), which reruns only the stages invalidated by the inputs
+### that changed since the previous miss: one slider moved at a time reuses the stages upstream of it.
+#######################################################################################################################
+
+# steps of the app sliders: Rf, mu and vol move by 1%, T by 3 months
+SLIDER_STEPS = {"rf": 0.01, "T": 0.25, "mu": 0.01, "vol": 0.01}
+
+DEFAULT_MAX_BYTES = int(os.environ.get("ASIAN_CACHE_MAX_BYTES", 256 * 2 ** 20))
+
+
+def _to_step(x, step):
+    return round(round(x / step) * step, 10)
+
+
+def normalize_inputs(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    return (CallOrPut, round(float(S), 10), round(float(K), 10),
+            _to_step(rf, SLIDER_STEPS["rf"]), _to_step(T, SLIDER_STEPS["T"]),
+            _to_step(mu, SLIDER_STEPS["mu"]), _to_step(vol, SLIDER_STEPS["vol"]), int(tree__periods))
+
+
+# approximate memory held by a RepStrat result: the lists, their elements (sized on the first one) and the scalars
+def estimate_size(result):
+    size = sys.getsizeof(result)
+    for item in result:
+        size += sys.getsizeof(item)
+        if isinstance(item, list) and item:
+            size += sys.getsizeof(item[0]) * len(item)
+    return size
+
+
+class LRUCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, size=None):
+        size = estimate_size(value) if size is None else size
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+repStratCache = LRUCache()
+stagedRepStrat = StagedRepStrat()
+
+sharedTreeCache = None
+if os.environ.get("ASIAN_SHARED_CACHE_DIR"):
+    sharedTreeCache = SharedTreeCache(os.environ["ASIAN_SHARED_CACHE_DIR"],
+                                      int(os.environ.get("ASIAN_SHARED_CACHE_MAX_BYTES", 2 ** 30)))
+
+
+def cached_rep_strat(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    key = normalize_inputs(CallOrPut, S, K, rf, T, mu, vol, tree__periods)
+
+    result = repStratCache.get(key)
+    if result is not None:
+        return result
+
+    if sharedTreeCache is not None:
+        result = sharedTreeCache.get(key)
+        if result is not None:
+            return result
+
+    result = stagedRepStrat.compute(*key)
+    if sharedTreeCache is not None:
+        sharedTreeCache.put(key, result)
+
+    repStratCache.put(key, result)
+    return result
+
+
+def bands_key(key):
+    return ("bands",) + tuple(key)
+
+
+def price_key(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    return ("price", CallOrPut, float(S), float(K), float(rf), float(T), float(mu), float(vol), int(tree__periods))
+
+
+def cached_rep_strat_bands(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    key = normalize_inputs(CallOrPut, S, K, rf, T, mu, vol, tree__periods)
+
+    result = repStratCache.get(bands_key(key))
+    if result is None:
+        result = RepStrat_Asian_Option_CRR_Bands(*key)
+        repStratCache.put(bands_key(key), result)
+    return result
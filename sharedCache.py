@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from treeLayout import cached_tree_layout
+
+#######################################################################################################################
+### Shared on-disk cache of replication strategies
+###
+### Gunicorn workers are separate processes, so the in-process LRU of resultCache only helps the worker that filled
+### it. This cache keeps each result as a labels.npy file (the six label lists as rows of one float64 array) and a
+### meta.json with the scalars, in a local directory shared by all workers. Hits return the rows of the memory-mapped
+### array, not copies: a finished tree is read from the page cache, and only the pages the store encoding touches.
+### The layout depends only on tree__periods, so it is not stored but taken from treeLayout.cached_tree_layout.
+###
+### Entries are written in a private temporary directory and renamed into place, which is atomic on POSIX: a
+### reader sees either no entry or a complete one, and an entry evicted while mapped stays readable until unmapped.
+###
+### Each process keeps a running total of the cache size: the directory is scanned when the process starts putting
+### and again only when its total goes over max_bytes. The scan evicts the least recently read entries (meta.json
+### mtime), renaming them away before deleting them, down to 3/4 of max_bytes so that the next scan is a while away.
+### Entries written by the other workers since the last scan are only counted at the next one, so the directory can
+### go over max_bytes by that much in between.
+#######################################################################################################################
+
+FORMAT_VERSION = 2
+
+# order of the arrays in a RepStrat result tuple
+LABEL_FIELDS = ("nbrofshares", "cash", "portfolio", "optionprice", "sumstockprices", "stocks")
+
+# fraction of max_bytes left after an eviction scan
+EVICT_TO = 0.75
+
+
+def entry_name(key):
+    return hashlib.sha256(repr((FORMAT_VERSION, key)).encode()).hexdigest()
+
+
+class SharedTreeCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._bytes = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, entry_name(key))
+
+    # the label rows are read-only memory-mapped arrays
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            labels = np.load(os.path.join(path, "labels.npy"), mmap_mode="r")
+            os.utime(os.path.join(path, "meta.json"))
+        except (FileNotFoundError, ValueError):
+            # not written yet, or evicted by another worker while we were reading it
+            return None
+
+        return tuple(labels) + cached_tree_layout(key[-1]) + tuple(meta["factors"])
+
+    def put(self, key, result):
+        path = self._path(key)
+        if os.path.isdir(path):
+            return
+
+        labels, factors = np.asarray(result[:6], dtype=float), result[10:]
+
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.directory)
+        try:
+            np.save(os.path.join(staging, "labels.npy"), labels)
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump({"key": list(key), "factors": [float(x) for x in factors], "bytes": labels.nbytes}, f)
+            os.rename(staging, path)
+        except OSError:
+            # another worker renamed the same entry into place first
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        if self._bytes is None:
+            self.evict()
+        else:
+            self._bytes += labels.nbytes
+            if self._bytes > self.max_bytes:
+                self.evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue
+            meta = os.path.join(self.directory, name, "meta.json")
+            try:
+                with open(meta) as f:
+                    size = json.load(f)["bytes"]
+                entries.append((os.stat(meta).st_mtime, size, name))
+            except (FileNotFoundError, ValueError, KeyError):
+                continue
+        return sorted(entries)
+
+    # scans the directory: evicts down to EVICT_TO * max_bytes when over max_bytes, and resets the running total
+    def evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+
+        if total > self.max_bytes:
+            for _, size, name in entries:
+                if total <= EVICT_TO * self.max_bytes:
+                    break
+                doomed = os.path.join(self.directory, f".evicted-{name}-{os.getpid()}-{time.monotonic_ns()}")
+                try:
+                    os.rename(os.path.join(self.directory, name), doomed)
+                except OSError:
+                    continue
+                shutil.rmtree(doomed, ignore_errors=True)
+                total -= size
+
+        self._bytes = total
+
+    def stats(self):
+        entries = self._entries()
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries), "max_bytes": self.max_bytes,
+                "directory": self.directory}
@@ -0,0 +1,151 @@
+import threading
+
+from Asian_Option_CRR import (_asian_payoff, _backward_levels, _crr_factors, _forward_levels, _levels_label,
+                              _payoff_sign, _replication_levels)
+from instrumentation import phase
+from sharedCache import LABEL_FIELDS
+from treeLayout import tree_layout
+
+#######################################################################################################################
+### Incremental replication strategy
+###
+### RepStrat_Asian_Option_CRR_Array split into stages, each keeping the arrays (and label lists) of its last run.
+### A stage reruns only when one of its own inputs or an upstream stage changed:
+###
+###   layout       tree__periods                       node and edge coordinates
+###   forward      S, T, mu, vol, tree__periods        stock prices and running sums (u and d)
+###   payoff       CallOrPut, K              <- forward
+###   backward     rf                        <- payoff                 option prices (discFact and probUp)
+###   replication                            <- forward, backward      shares, cash account and portfolio
+###
+### So dragging K or toggling Call/Put reuses the stock prices, the running sums and their labels, and moving rf
+### reuses the payoff as well. mu, T and vol move u and d, hence everything but the layout.
+#######################################################################################################################
+
+INPUT_NAMES = ("CallOrPut", "S", "K", "rf", "T", "mu", "vol", "tree__periods")
+
+# stage: (own inputs, upstream stages), in an order where upstream stages come first
+STAGES = {"layout": (("tree__periods",), ()),
+          "forward": (("S", "T", "mu", "vol", "tree__periods"), ()),
+          "payoff": (("CallOrPut", "K"), ("forward",)),
+          "backward": (("rf",), ("payoff",)),
+          "replication": ((), ("forward", "backward"))}
+
+
+def _factors(inputs):
+    return _crr_factors(inputs["rf"], inputs["T"], inputs["mu"], inputs["vol"], inputs["tree__periods"])
+
+
+# label lists are as long as the whole tree, so on_level is also called after each of them and after the layout
+def _labels(levels, on_level, tree__periods):
+    with phase("labels", tree__periods):
+        label = _levels_label(levels)
+    if on_level is not None:
+        on_level()
+    return label
+
+
+def _layout_stage(inputs, on_level=None):
+    with phase("layout", inputs["tree__periods"]):
+        layout = tree_layout(inputs["tree__periods"])
+    if on_level is not None:
+        on_level()
+    return layout
+
+
+def _forward_stage(inputs, on_level=None):
+    step, u, d, discFact, probUp, probDown = _factors(inputs)
+    tree__periods = inputs["tree__periods"]
+    with phase("forward", tree__periods):
+        stockprices, sumstockprices = _forward_levels(inputs["S"], u, d, tree__periods, on_level)
+    return (stockprices, sumstockprices, _labels(stockprices, on_level, tree__periods),
+            _labels(sumstockprices, on_level, tree__periods))
+
+
+def _payoff_stage(inputs, forward, on_level=None):
+    tree__periods = inputs["tree__periods"]
+    with phase("payoff", tree__periods):
+        return _asian_payoff(_payoff_sign(inputs["CallOrPut"]), inputs["K"], forward[1][tree__periods], tree__periods)
+
+
+def _backward_stage(inputs, payoff, on_level=None):
+    step, u, d, discFact, probUp, probDown = _factors(inputs)
+    tree__periods = inputs["tree__periods"]
+    with phase("backward", tree__periods):
+        optionprice = _backward_levels(payoff, discFact, probUp, probDown, tree__periods, on_level)
+    return optionprice, _labels(optionprice, on_level, tree__periods)
+
+
+def _replication_stage(inputs, forward, backward, on_level=None):
+    step, u, d, discFact, probUp, probDown = _factors(inputs)
+    tree__periods = inputs["tree__periods"]
+    with phase("replication", tree__periods):
+        levels = _replication_levels(forward[0], backward[0], u, d, inputs["rf"], step, tree__periods, on_level)
+    return tuple(_labels(level, on_level, tree__periods) for level in levels)
+
+
+# calls of on_level when every stage reruns
+def total_steps(tree__periods):
+    return 3 * tree__periods + len(LABEL_FIELDS) + 1
+
+
+STAGE_FUNCTIONS = {"layout": _layout_stage, "forward": _forward_stage, "payoff": _payoff_stage,
+                   "backward": _backward_stage, "replication": _replication_stage}
+
+
+class StagedRepStrat:
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+        self.runs = dict.fromkeys(STAGES, 0)
+        self.reuses = dict.fromkeys(STAGES, 0)
+
+    # own input values followed by the keys of the upstream stages
+    def _stage_key(self, name, inputs):
+        ownInputs, upstream = STAGES[name]
+        return tuple(inputs[x] for x in ownInputs) + tuple(self._stage_key(stage, inputs) for stage in upstream)
+
+    # outputs of the stage, rerun if its key changed. resolved holds the stages already settled for these inputs.
+    # An exception raised by on_level leaves the stages that did not finish as they were.
+    def _run(self, name, inputs, resolved, on_level):
+        if name in resolved:
+            return resolved[name]
+
+        key = self._stage_key(name, inputs)
+        cached = self._stages.get(name)
+        if cached is not None and cached[0] == key:
+            self.reuses[name] += 1
+            outputs = cached[1]
+        else:
+            upstream = [self._run(stage, inputs, resolved, on_level) for stage in STAGES[name][1]]
+            outputs = STAGE_FUNCTIONS[name](inputs, *upstream, on_level=on_level)
+            self._stages[name] = (key, outputs)
+            self.runs[name] += 1
+
+        resolved[name] = outputs
+        return outputs
+
+    # same tuple as RepStrat_Asian_Option_CRR_Array. on_level is called after each level of the forward, backward
+    # and replication passes, each label list and the layout that are rerun (at most total_steps(tree__periods) calls).
+    def compute(self, CallOrPut, S, K, rf, T, mu, vol, tree__periods, on_level=None):
+        inputs = dict(zip(INPUT_NAMES, (CallOrPut, S, K, rf, T, mu, vol, tree__periods)))
+        _payoff_sign(CallOrPut)
+        step, u, d, discFact, probUp, probDown = _factors(inputs)
+
+        with self._lock:
+            resolved = {}
+            NbrOfShares, CashAccount, Portfolio = self._run("replication", inputs, resolved, on_level)
+            stockprices, sumstockprices, stocksLabel, sumsLabel = self._run("forward", inputs, resolved, on_level)
+            optionpriceLabel = self._run("backward", inputs, resolved, on_level)[1]
+            edge_x, edge_y, node_x, node_y = self._run("layout", inputs, resolved, on_level)
+
+        return (NbrOfShares, CashAccount, Portfolio, optionpriceLabel, sumsLabel, stocksLabel,
+                edge_x, edge_y, node_x, node_y, round(u,2), round(d,2), round(probUp,2), round(probDown,2))
+
+    def clear(self):
+        with self._lock:
+            self._stages.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"runs": dict(self.runs), "reuses": dict(self.reuses)}
@@ -0,0 +1,71 @@
+import base64
+import numpy as np
+
+from sharedCache import LABEL_FIELDS
+from treeLayout import cached_tree_layout
+
+#######################################################################################################################
+### Compact payload for the dcc.Store
+###
+### The store used to carry the whole RepStrat tuple as JSON lists (six label lists, edges with None separators and
+### node coordinates), downloaded and parsed again by each of the six figure callbacks. It now carries a small
+### header and the six label lists as base64 typed arrays. Each figure callback decodes only the labels it shows;
+### the coordinates depend only on the number of periods and are rebuilt server-side.
+###
+### Labels are rounded to cents, so they are sent as little-endian float32 whenever that round-trips exactly to the
+### same cents, and as float64 otherwise (very large stock prices).
+###
+### Trees routed to the level-of-detail engine (see costModel) carry no labels, only the (min, median, max) bands of
+### each level, as plain lists: there are tree__periods + 1 entries per band.
+###
+### Requests that get no tree at all (priced by the lattice only, rejected, or with incomplete inputs) store the
+### reason instead, and the figures are drawn empty with it rather than keeping a tree of other inputs.
+#######################################################################################################################
+
+FORMAT_VERSION = 1
+
+
+def _encode_array(values):
+    values = np.asarray(values, dtype=float)
+    single = values.astype("<f4")
+    if np.array_equal(np.round(single.astype(float), 2), values):
+        dtype, data = "float32", single
+    else:
+        dtype, data = "float64", values.astype("<f8")
+    return {"dtype": dtype, "length": int(values.size), "data": base64.b64encode(data.tobytes()).decode("ascii")}
+
+
+def encode_rep_strat(result, tree__periods):
+    labels, (u, d, probUp, probDown) = result[:6], result[10:]
+    return {"version": FORMAT_VERSION,
+            "periods": int(tree__periods),
+            "factors": [float(u), float(d), float(probUp), float(probDown)],
+            "arrays": {name: _encode_array(label) for name, label in zip(LABEL_FIELDS, labels)}}
+
+
+def encode_bands(result, tree__periods):
+    bands, (u, d, probUp, probDown) = result[:6], result[6:]
+    return {"version": FORMAT_VERSION,
+            "periods": int(tree__periods),
+            "factors": [float(u), float(d), float(probUp), float(probDown)],
+            "bands": {name: np.round(band, 2).tolist() for name, band in zip(LABEL_FIELDS, bands)}}
+
+
+def encode_hidden(reason, tree__periods):
+    return {"version": FORMAT_VERSION, "periods": tree__periods, "hidden": reason}
+
+
+def decode_labels(data, name):
+    array = data["arrays"][name]
+    dtype = "<f4" if array["dtype"] == "float32" else "<f8"
+    values = np.frombuffer(base64.b64decode(array["data"]), dtype=dtype, count=array["length"])
+    return np.round(values.astype(float), 2).tolist()
+
+
+# edge_x, edge_y, node_x, node_y of the tree in the store
+def decode_layout(data):
+    return cached_tree_layout(data["periods"])
+
+
+def decode_factors(data):
+    return tuple(data["factors"])
@@ -0,0 +1,5 @@
+# the modules live at the repository root, as for the app and the benchmarks
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
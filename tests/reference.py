@@ -0,0 +1,43 @@
+import itertools
+
+import numpy as np
+
+# Reference values of the CRR model by enumeration of all its 2**tree__periods paths, written from the model
+# definitions of RepStrat_Asian_Option_CRR and independent of the engines under test. Small trees only.
+
+
+def crr_factors(rf, T, mu, vol, tree__periods):
+    step = T / tree__periods
+    u = np.exp(mu * step + vol * np.sqrt(step))
+    d = np.exp(mu * step - vol * np.sqrt(step))
+    probUp = (np.exp(rf * step) - d) / (u - d)
+    return u, d, np.exp(-rf * step), probUp
+
+
+# discounted expected payoff given the first move (None: from t=0)
+def path_value(CallOrPut, S, K, rf, T, mu, vol, tree__periods, first_move=None):
+    phi = 1 if CallOrPut == "Call" else -1
+    u, d, discFact, probUp = crr_factors(rf, T, mu, vol, tree__periods)
+
+    downs = np.array(list(itertools.product((0, 1), repeat=tree__periods)))
+    stocks = S * np.cumprod(np.where(downs == 1, d, u), axis=1)
+    payoffs = np.maximum(phi * ((S + stocks.sum(axis=1)) / (tree__periods + 1) - K), 0)
+    probabilities = np.prod(np.where(downs == 1, 1 - probUp, probUp), axis=1)
+
+    if first_move is None:
+        return float(discFact ** tree__periods * np.sum(probabilities * payoffs))
+    paths = downs[:, 0] == (first_move == "down")
+    firstProbability = probUp if first_move == "up" else 1 - probUp
+    return float(discFact ** (tree__periods - 1) * np.sum(probabilities[paths] * payoffs[paths]) / firstProbability)
+
+
+def path_price(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    return path_value(CallOrPut, S, K, rf, T, mu, vol, tree__periods)
+
+
+# root number of shares of the replicating portfolio
+def path_delta(CallOrPut, S, K, rf, T, mu, vol, tree__periods):
+    u, d, discFact, probUp = crr_factors(rf, T, mu, vol, tree__periods)
+    valueUp = path_value(CallOrPut, S, K, rf, T, mu, vol, tree__periods, "up")
+    valueDown = path_value(CallOrPut, S, K, rf, T, mu, vol, tree__periods, "down")
+    return (valueUp - valueDown) / ((u - d) * S)
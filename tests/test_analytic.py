@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from Asian_Option_CRR import (_arithmetic_average_moments, _crr_factors, price_asian_crr_lattice, price_asian_geometric,
+                              price_asian_levy)
+from Asian_Option_MC import _geometric_crr_price
+
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+@pytest.mark.parametrize("CallOrPut, phi", [("Call", 1), ("Put", -1)])
+def test_geometric_price_is_the_limit_of_the_tree(CallOrPut, phi):
+    step, u, d, discFact, probUp, probDown = _crr_factors(0.05, 3, 0.10, 0.15, 400)
+    treePrice = _geometric_crr_price(phi, 100, 100, u, d, discFact, probUp, 400)
+    assert price_asian_geometric(CallOrPut, tree__periods=400, **INPUTS) == pytest.approx(treePrice, abs=1e-2)
+
+
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+def test_levy_price_is_near_a_deep_tree(CallOrPut):
+    treePrice = price_asian_crr_lattice(CallOrPut, tree__periods=200, grid_points=200, **INPUTS)
+    assert price_asian_levy(CallOrPut, tree__periods=200, **INPUTS) == pytest.approx(treePrice, rel=3e-2)
+
+
+# the geometric average is below the arithmetic one on every path
+@pytest.mark.parametrize("K", [80, 100, 120])
+def test_geometric_call_is_below_the_arithmetic_call(K):
+    inputs = dict(INPUTS, K=K)
+    assert price_asian_geometric("Call", tree__periods=50, **inputs) < price_asian_levy("Call", tree__periods=50,
+                                                                                          **inputs)
+
+
+def test_moments_match_the_sums_over_the_dates():
+    S, rf, T, vol, tree__periods = 100, 0.05, 3, 0.15, 6
+    times = T / tree__periods * np.arange(tree__periods + 1)
+    pairs = np.add.outer(times, times) * rf + np.minimum.outer(times, times) * vol ** 2
+
+    firstMoment, secondMoment = _arithmetic_average_moments(S, rf, T, vol, tree__periods)
+    assert firstMoment == pytest.approx(S * np.exp(rf * times).mean())
+    assert secondMoment == pytest.approx(S ** 2 * np.exp(pairs).mean())
+
+
+def test_arrays_broadcast_like_scalars():
+    K = np.array([90.0, 100.0, 110.0])
+    for price in (price_asian_geometric, price_asian_levy):
+        prices = price(np.array(["Call", "Put", "Call"]), 100, K, 0.05, 3, 0.1, 0.15, 12)
+        assert isinstance(prices, np.ndarray)
+        assert prices.tolist() == pytest.approx([price(c, 100, k, 0.05, 3, 0.1, 0.15, 12)
+                                                 for c, k in zip(("Call", "Put", "Call"), K)])
+
+
+def test_no_volatility_is_the_discounted_intrinsic_value():
+    forward = 100 * np.exp(0.05 * 3 * np.arange(7) / 6).mean()
+    assert price_asian_levy("Call", 100, 100, 0.05, 3, 0.1, 0.0, 6) == pytest.approx(np.exp(-0.15) * (forward - 100))
+    assert price_asian_geometric("Put", 100, 100, 0.05, 3, 0.1, 0.0, 6) == 0
+
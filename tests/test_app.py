@@ -0,0 +1,71 @@
+import warnings
+
+import pytest
+
+import backgroundJobs
+import costModel
+from costModel import CostModel
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    import app
+
+calibratedAtImport = costModel._costModel is not None
+
+
+# every engine within the limits up to 10 periods, then only the lattice up to 62 periods
+@pytest.fixture
+def small_limits(monkeypatch):
+    rates = {"tree": (1.0, 1.0), "bands": (1.0, 1.0), "lattice": (1.0, 1.0)}
+    monkeypatch.setattr(costModel, "_costModel", CostModel(rates, max_seconds=2 ** 11, max_bytes=2 ** 11))
+
+
+INPUTS = dict(CallOrPut="Call", S=100, K=100, Rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+def test_import_does_not_calibrate():
+    assert not calibratedAtImport
+
+
+def test_tree_route_fills_the_store(small_limits):
+    data = app.get_rep_strat_data(**INPUTS, tree_periods=3)
+    assert "arrays" in data
+    assert app.graph_option_pricee(data)["data"]
+
+
+@pytest.mark.parametrize("tree_periods, S", [(15, 100), (100, 100), (3, None), (3, 0)])
+def test_no_tree_empties_the_figures(small_limits, tree_periods, S):
+    data = app.get_rep_strat_data(**dict(INPUTS, S=S), tree_periods=tree_periods)
+    assert "hidden" in data
+    for graph in (app.graph_stock_simul, app.graph_portf_details, app.graph_nbr_of_shares, app.graph_cash_account,
+                  app.graph_option_pricee, app.graph_option_cumsum):
+        assert graph(data)["data"] == []
+
+
+def test_lattice_price_only_on_the_lattice_route(small_limits):
+    assert app.display_lattice_price(**INPUTS, tree_periods=3) == ""
+    assert app.display_lattice_price(**INPUTS, tree_periods=15).startswith("Lattice price: ")
+
+
+@pytest.mark.parametrize("S, K", [(None, 100), (100, None), (0, 100), (100, -1)])
+def test_lattice_price_with_cleared_inputs(small_limits, S, K):
+    assert app.display_lattice_price(**dict(INPUTS, S=S, K=K), tree_periods=15) == ""
+
+
+def test_tree_periods_message(small_limits):
+    assert app.check_input_tree_periods(None)[0] == "Cannot be lower than 1."
+    assert "Estimated" in app.check_input_tree_periods(3)[0]
+    assert "lattice" in app.check_input_tree_periods(15)[0]
+    assert "lower the tree periods" in app.check_input_tree_periods(100)[0]
+
+
+# background mode: the store of a hidden tree holds no job to cancel when the next inputs come
+def test_job_after_a_hidden_tree(small_limits, monkeypatch):
+    monkeypatch.setattr(app, "jobManager", backgroundJobs.JobManager(workers=1, min_periods=10))
+
+    job = app.submit_rep_strat_job(**INPUTS, tree_periods=3, previousJob=None)
+    job = app.submit_rep_strat_job(**dict(INPUTS, S=None), tree_periods=3, previousJob=job)
+    assert "hidden" in app.poll_rep_strat_job(1, job)[0]
+
+    job = app.submit_rep_strat_job(**INPUTS, tree_periods=3, previousJob=job)
+    assert "arrays" in app.poll_rep_strat_job(1, job)[0]
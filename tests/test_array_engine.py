@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR, RepStrat_Asian_Option_CRR_Array
+
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+@pytest.mark.parametrize("tree__periods", [1, 2, 5, 8])
+def test_array_engine_matches_the_dict_engine(CallOrPut, tree__periods):
+    expected = RepStrat_Asian_Option_CRR(CallOrPut, tree__periods=tree__periods, **INPUTS)
+    result = RepStrat_Asian_Option_CRR_Array(CallOrPut, tree__periods=tree__periods, **INPUTS)
+
+    assert len(result) == len(expected)
+    for item, expectedItem in zip(result, expected):
+        assert list(item) == list(expectedItem) if isinstance(expectedItem, list) else item == expectedItem
+
+
+def test_array_engine_matches_the_dict_engine_away_from_the_money():
+    inputs = dict(INPUTS, K=130, rf=0.02, vol=0.40)
+    expected = RepStrat_Asian_Option_CRR("Put", tree__periods=6, **inputs)
+    result = RepStrat_Asian_Option_CRR_Array("Put", tree__periods=6, **inputs)
+    assert np.array_equal(result[3], expected[3]) and np.array_equal(result[0], expected[0])
@@ -0,0 +1,120 @@
+import time
+
+import pytest
+
+import backgroundJobs
+import resultCache
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Array, RepStrat_Asian_Option_CRR_Bands
+from backgroundJobs import JobCancelled, JobManager
+from resultCache import LRUCache, bands_key, normalize_inputs
+
+
+INPUTS = dict(CallOrPut="Call", S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    monkeypatch.setattr(resultCache, "repStratCache", LRUCache())
+    monkeypatch.setattr(resultCache, "sharedTreeCache", None)
+    manager = JobManager(workers=1, min_periods=0)
+    yield manager
+    if manager._executor is not None:
+        manager._executor.shutdown()
+
+
+# the final status: the job is forgotten once it has been reported done or failed
+def wait(manager, jobId, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = manager.status(jobId)
+        if status[0] != "running":
+            return status
+        time.sleep(0.01)
+    raise TimeoutError(jobId)
+
+
+def wait_until_started(manager, jobId, timeout=60):
+    deadline = time.monotonic() + timeout
+    while manager._progress.get(jobId, 0.0) == 0.0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def assert_same_labels(result, expected):
+    assert [list(label) for label in result[:6]] == [list(label) for label in expected[:6]]
+    assert tuple(result[-4:]) == tuple(expected[-4:])
+
+
+def test_small_trees_are_computed_inline(jobs):
+    jobs.min_periods = 10
+    status, result = jobs.status(jobs.submit(tree__periods=4, **INPUTS))
+
+    assert status == "done" and jobs._executor is None
+    assert_same_labels(result, RepStrat_Asian_Option_CRR_Array(tree__periods=4, **INPUTS))
+
+
+def test_job_result_matches_the_tree_and_is_cached(jobs):
+    jobId = jobs.submit(tree__periods=6, **INPUTS)
+    status, result = wait(jobs, jobId)
+
+    assert status == "done"
+    assert_same_labels(result, RepStrat_Asian_Option_CRR_Array(tree__periods=6, **INPUTS))
+    assert resultCache.repStratCache.get(normalize_inputs(tree__periods=6, **INPUTS)) is result
+    assert jobs.status(jobId) == ("unknown", None)
+
+
+# a page closed mid-job never polls it: the result still goes to the cache, and leaves the manager after the TTL
+def test_uncollected_job_leaves_only_a_cache_entry(jobs, monkeypatch):
+    monkeypatch.setattr(backgroundJobs, "FINISHED_TTL", 0)
+    jobId = jobs.submit(tree__periods=6, **INPUTS)
+    jobs._jobs[jobId][1].result(timeout=60)
+
+    deadline = time.monotonic() + 10
+    while jobId in jobs._jobs and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert jobs.stats()["jobs"] == 0 and jobId not in jobs._progress
+    assert jobs.status("another job") == ("unknown", None) and not jobs._finished
+    assert resultCache.repStratCache.get(normalize_inputs(tree__periods=6, **INPUTS)) is not None
+
+
+def test_failure_is_reported_once(jobs):
+    jobId = jobs.submit(tree__periods=6, **dict(INPUTS, CallOrPut="Straddle"))
+    status, error = wait(jobs, jobId)
+
+    assert status == "failed" and isinstance(error, ValueError)
+    assert jobs.status(jobId) == ("unknown", None)
+
+
+def test_bands_job_matches_the_bands_engine(jobs):
+    status, result = wait(jobs, jobs.submit(tree__periods=6, engine="bands", **INPUTS))
+
+    assert status == "done"
+    assert result == RepStrat_Asian_Option_CRR_Bands(tree__periods=6, **INPUTS)
+    assert resultCache.repStratCache.get(bands_key(normalize_inputs(tree__periods=6, **INPUTS))) is not None
+
+
+def test_cancelled_jobs_stop_and_the_next_one_runs(jobs):
+    running = jobs.submit(tree__periods=20, **INPUTS)
+    pending = jobs.submit(tree__periods=20, **dict(INPUTS, K=110))
+    runningFuture, pendingFuture = jobs._jobs[running][1], jobs._jobs[pending][1]
+    wait_until_started(jobs, running)
+
+    jobs.cancel(pending)
+    jobs.cancel(running)
+
+    # the pool queues one job more than it has workers, so the second one may already have left the queue
+    for future in (runningFuture, pendingFuture):
+        if not future.cancelled():
+            with pytest.raises(JobCancelled):
+                future.result(timeout=60)
+    assert jobs.status(running) == jobs.status(pending) == ("unknown", None)
+
+    status, result = wait(jobs, jobs.submit(tree__periods=5, **INPUTS))
+    assert status == "done"
+    assert_same_labels(result, RepStrat_Asian_Option_CRR_Array(tree__periods=5, **INPUTS))
+
+
+# a request thread computing an inline tree holds the staged engine's lock while another one starts the pool
+def test_pool_processes_do_not_inherit_held_locks(jobs):
+    with resultCache.stagedRepStrat._lock:
+        status, result = wait(jobs, jobs.submit(tree__periods=6, **INPUTS), timeout=30)
+    assert status == "done"
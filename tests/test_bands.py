@@ -0,0 +1,54 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Array, RepStrat_Asian_Option_CRR_Bands
+from storeEncoding import encode_bands, encode_rep_strat
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    import app
+
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+# the labels are the levels one after the other, level i having 2 ** i nodes
+def label_levels(label, tree__periods):
+    return np.split(np.asarray(label), np.cumsum([2 ** i for i in range(tree__periods)]))
+
+
+def test_large_trees_are_drawn_as_bands():
+    data = encode_bands(RepStrat_Asian_Option_CRR_Bands("Call", tree__periods=9, **INPUTS), 9)
+    assert app.use_lod(data)
+    figure = app.lod_figure(data, "optionprice")
+    assert [len(trace.x) for trace in figure["data"]] == [10, 10, 10]
+
+
+def test_small_trees_are_drawn_as_trees():
+    data = encode_rep_strat(RepStrat_Asian_Option_CRR_Array("Call", tree__periods=4, **INPUTS), 4)
+    assert not app.use_lod(data)
+
+
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+@pytest.mark.parametrize("tree__periods", [1, 4, 7])
+def test_bands_engine_matches_the_labels_of_each_level(CallOrPut, tree__periods):
+    bands = RepStrat_Asian_Option_CRR_Bands(CallOrPut, tree__periods=tree__periods, **INPUTS)
+    result = RepStrat_Asian_Option_CRR_Array(CallOrPut, tree__periods=tree__periods, **INPUTS)
+
+    for (low, median, high), label in zip(bands[:6], result[:6]):
+        levels = label_levels(label, tree__periods)
+        assert len(low) == len(median) == len(high) == tree__periods + 1
+        # the labels are rounded to cents, the bands are not
+        assert low == pytest.approx([level.min() for level in levels], abs=0.005)
+        assert median == pytest.approx([np.median(level) for level in levels], abs=0.005)
+        assert high == pytest.approx([level.max() for level in levels], abs=0.005)
+    assert bands[6:] == result[10:]
+
+
+# forward, backward and replication passes
+def test_each_level_of_each_pass_is_reported():
+    levels = []
+    RepStrat_Asian_Option_CRR_Bands("Call", tree__periods=5, on_level=lambda: levels.append(1), **INPUTS)
+    assert len(levels) == 3 * 5
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from Asian_Option_CRR import price_asian_crr_batch
+from reference import path_delta, path_price
+
+
+CONTRACTS = {"CallOrPut": np.array(["Call", "Put", "Call", "Put", "Call"]),
+             "S": np.array([100, 100, 80, 120, 100]), "K": np.array([100, 110, 100, 100, 90]),
+             "rf": np.array([0.05, 0.05, 0.0, 0.02, 0.05]), "T": np.array([3, 1, 2, 3, 0.5]),
+             "mu": 0.10, "vol": np.array([0.15, 0.3, 0.2, 0.15, 0.6])}
+
+
+def reference(function, tree__periods):
+    contracts = np.broadcast_arrays(*CONTRACTS.values())
+    return np.array([function(*contract, tree__periods) for contract in zip(*contracts)])
+
+
+# 4 periods prices the contracts vectorized together, 12 periods one contract at a time
+@pytest.mark.parametrize("tree__periods", [4, 12])
+def test_batch_matches_the_paths(tree__periods):
+    price, delta = price_asian_crr_batch(**CONTRACTS, tree__periods=tree__periods, return_delta=True)
+    np.testing.assert_allclose(price, reference(path_price, tree__periods), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(delta, reference(path_delta, tree__periods), rtol=1e-10, atol=1e-12)
+
+
+def test_inputs_are_broadcast():
+    K = np.array([[90], [100], [110]])
+    price = price_asian_crr_batch("Call", 100, K, 0.05, 3, 0.1, np.array([0.1, 0.2]), 5)
+    assert price.shape == (3, 2)
+    assert price[1, 0] == pytest.approx(path_price("Call", 100, 100, 0.05, 3, 0.1, 0.1, 5), rel=1e-12)
+
+
+def test_unknown_option_type_is_rejected():
+    with pytest.raises(ValueError, match="CallOrPut"):
+        price_asian_crr_batch(np.array(["Call", "Straddle"]), 100, 100, 0.05, 3, 0.1, 0.15, 3)
@@ -0,0 +1,87 @@
+import csv
+import sys
+
+import pytest
+
+import batchPricing
+from Asian_Option_CRR import price_asian_crr
+from batchPricing import price_file
+
+
+CONTRACTS = [["Call", 100, 100, 0.05, 3, 0.1, 0.15, 4, "a"],
+             ["Put", 90, 100, 0.02, 1, 0.1, 0.25, 6, "b"],
+             ["Call", 110, 95, 0.05, 2, 0.1, 0.2, 4, "c"]]
+
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline="") as file:
+        return list(csv.DictReader(file))
+
+
+@pytest.fixture
+def contracts(tmp_path):
+    path = tmp_path / "contracts.csv"
+    write_csv(path, batchPricing.CONTRACT_FIELDS + ("tree__periods", "book"), CONTRACTS)
+    return path
+
+
+@pytest.fixture
+def existing_output(tmp_path):
+    path = tmp_path / "prices.csv"
+    path.write_text("previous results\n")
+    return path
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_tree_prices_match_the_tree(contracts, tmp_path, workers):
+    report = price_file(str(contracts), str(tmp_path / "prices.csv"), "tree", workers=workers, chunk_size=2)
+
+    rows = read_csv(tmp_path / "prices.csv")
+    assert report["rows"] == 3 and report["chunks"] == 2
+    assert [row["book"] for row in rows] == ["a", "b", "c"]
+    for row, contract in zip(rows, CONTRACTS):
+        assert float(row["price"]) == pytest.approx(price_asian_crr(*contract[:8]))
+    assert [name for name in tmp_path.iterdir() if name.name.startswith(".")] == []
+
+
+def test_missing_columns_leave_the_output_alone(tmp_path, existing_output):
+    write_csv(tmp_path / "contracts.csv", ("CallOrPut", "S", "K"), [["Call", 100, 100]])
+    with pytest.raises(ValueError, match="missing columns"):
+        price_file(str(tmp_path / "contracts.csv"), str(existing_output), "tree", tree__periods=4)
+    assert existing_output.read_text() == "previous results\n"
+
+
+def test_missing_periods_and_engine_leave_the_output_alone(tmp_path, existing_output):
+    write_csv(tmp_path / "contracts.csv", batchPricing.CONTRACT_FIELDS, [row[:7] for row in CONTRACTS])
+    with pytest.raises(ValueError, match="tree__periods"):
+        price_file(str(tmp_path / "contracts.csv"), str(existing_output), "tree")
+    with pytest.raises(ValueError, match="engine"):
+        price_file(str(tmp_path / "contracts.csv"), str(existing_output), "exact", tree__periods=4)
+    with pytest.raises(FileNotFoundError):
+        price_file(str(tmp_path / "missing.csv"), str(existing_output), "tree", tree__periods=4)
+    assert existing_output.read_text() == "previous results\n"
+
+
+def test_failed_run_leaves_the_output_alone(contracts, tmp_path, existing_output, monkeypatch):
+    def failing_engine(contracts, tree__periods, options):
+        raise RuntimeError("engine failed")
+
+    monkeypatch.setitem(batchPricing.ENGINE_FUNCTIONS, "tree", failing_engine)
+    with pytest.raises(RuntimeError):
+        price_file(str(contracts), str(existing_output), "tree")
+    assert existing_output.read_text() == "previous results\n"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["contracts.csv", "prices.csv"]
+
+
+def test_parquet_without_pyarrow_fails_before_writing(contracts, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ImportError, match="pyarrow"):
+        price_file(str(contracts), str(tmp_path / "prices.parquet"), "tree")
+    assert not (tmp_path / "prices.parquet").exists()
@@ -0,0 +1,33 @@
+import pytest
+
+from Asian_Option_CRR import price_asian_crr, price_asian_crr_compressed
+from reference import path_price
+
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, vol=0.15)
+
+
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+@pytest.mark.parametrize("mu", [0.0, 0.10])
+@pytest.mark.parametrize("tree__periods", [1, 6, 11])
+def test_compressed_price_is_the_tree_price(CallOrPut, mu, tree__periods):
+    price = price_asian_crr_compressed(CallOrPut, mu=mu, tree__periods=tree__periods, **INPUTS)
+    assert price == pytest.approx(price_asian_crr(CallOrPut, mu=mu, tree__periods=tree__periods, **INPUTS), rel=1e-12)
+    assert price == pytest.approx(path_price(CallOrPut, mu=mu, tree__periods=tree__periods, **INPUTS), rel=1e-10)
+
+
+# states merge when u d = 1, or when u^a d^b = 1 for small a, b (u d^2 = 1 at 12 periods); every state still stands
+# for its paths
+@pytest.mark.parametrize("mu, tree__periods, merged", [(0.0, 11, True), (0.10, 11, False), (0.10, 12, True)])
+def test_states_merge_only_on_resonant_factors(mu, tree__periods, merged):
+    price, stats = price_asian_crr_compressed("Call", mu=mu, tree__periods=tree__periods, return_stats=True, **INPUTS)
+
+    assert stats["paths"] == [2 ** i for i in range(tree__periods + 1)]
+    assert (stats["states"][-1] < 2 ** tree__periods) == merged
+    assert all(states <= 2 ** i for i, states in enumerate(stats["states"]))
+    assert price == pytest.approx(price_asian_crr("Call", mu=mu, tree__periods=tree__periods, **INPUTS), rel=1e-12)
+
+
+def test_tolerance_below_the_packing_limit_is_rejected():
+    with pytest.raises(ValueError, match="sum_tolerance"):
+        price_asian_crr_compressed("Call", mu=0.0, tree__periods=4, sum_tolerance=1e-13, **INPUTS)
@@ -0,0 +1,51 @@
+import pytest
+
+import costModel
+from costModel import CostModel
+
+
+RATES = {"tree": (1e-6, 100.0), "bands": (1e-7, 10.0), "lattice": (1e-5, 1000.0)}
+
+
+def test_routing_falls_back_to_cheaper_engines():
+    model = CostModel(RATES, max_seconds=1.0, max_bytes=2 ** 30)
+    assert model.plan(10)[0] == "tree"
+    assert model.plan(21)[0] == "bands"
+    assert model.plan(200)[0] == "lattice"
+    assert model.plan(10 ** 6)[0] == "reject"
+    assert model.plan(0)[0] == "reject"
+
+
+def test_level_of_detail_skips_the_tree():
+    model = CostModel(RATES, max_seconds=1.0, max_bytes=2 ** 30)
+    assert model.plan(10, lod_max_nodes=511)[0] == "bands"
+    assert model.plan(8, lod_max_nodes=511)[0] == "tree"
+
+
+def test_estimates_do_not_overflow():
+    model = CostModel(RATES)
+    assert model.estimate("tree", 5000)["seconds"] > model.max_seconds
+
+
+def test_calibration_routes_small_trees_to_the_tree():
+    model = CostModel.calibrate()
+    assert set(model.rates) == set(costModel.ENGINES)
+    assert model.plan(3)[0] == "tree"
+
+
+def test_rates_file_round_trip(tmp_path):
+    path = str(tmp_path / "rates.json")
+    CostModel(RATES).save(path)
+    assert CostModel.load(path).rates == RATES
+
+
+def test_get_cost_model_reads_then_writes_the_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "rates.json")
+    CostModel(RATES).save(path)
+    monkeypatch.setattr(costModel, "_costModel", None)
+    assert costModel.get_cost_model(path).rates == RATES
+
+    monkeypatch.setattr(costModel, "_costModel", None)
+    missing = str(tmp_path / "calibrated.json")
+    model = costModel.get_cost_model(missing)
+    assert CostModel.load(missing).rates == pytest.approx(model.rates)
@@ -0,0 +1,33 @@
+import math
+
+import pytest
+
+from Asian_Option_CRR import greeks_asian_crr, hedge_asian_crr, price_asian_crr
+
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+def central_difference(CallOrPut, name, tree__periods, bump=1e-5):
+    up = price_asian_crr(CallOrPut, tree__periods=tree__periods, **dict(INPUTS, **{name: INPUTS[name] + bump}))
+    down = price_asian_crr(CallOrPut, tree__periods=tree__periods, **dict(INPUTS, **{name: INPUTS[name] - bump}))
+    return (up - down) / (2 * bump)
+
+
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+@pytest.mark.parametrize("tree__periods", [1, 4, 9])
+def test_greeks_match_the_tree(CallOrPut, tree__periods):
+    greeks = greeks_asian_crr(CallOrPut, tree__periods=tree__periods, **INPUTS)
+
+    assert greeks["price"] == pytest.approx(price_asian_crr(CallOrPut, tree__periods=tree__periods, **INPUTS))
+    assert greeks["delta"] == pytest.approx(hedge_asian_crr(CallOrPut, tree__periods=tree__periods, **INPUTS)[0])
+    assert greeks["vega"] == pytest.approx(central_difference(CallOrPut, "vol", tree__periods), rel=1e-5, abs=1e-6)
+    assert greeks["rho"] == pytest.approx(central_difference(CallOrPut, "rf", tree__periods), rel=1e-5, abs=1e-6)
+    assert greeks["theta"] == pytest.approx(-central_difference(CallOrPut, "T", tree__periods), rel=1e-5, abs=1e-6)
+
+
+# gamma needs the two deltas of level 1, so a tree of one period has none
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+def test_gamma_needs_two_periods(CallOrPut):
+    assert math.isnan(greeks_asian_crr(CallOrPut, tree__periods=1, **INPUTS)["gamma"])
+    assert greeks_asian_crr(CallOrPut, tree__periods=6, **INPUTS)["gamma"] > 0
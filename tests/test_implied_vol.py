@@ -0,0 +1,43 @@
+import math
+
+import numpy as np
+import pytest
+
+from Asian_Option_CRR import price_asian_crr
+from impliedVolatility import implied_vol_asian_crr, implied_vol_asian_crr_batch
+
+
+CONTRACT = dict(S=100, K=100, rf=0.05, T=3, mu=0.10)
+
+
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+@pytest.mark.parametrize("vol", [0.08, 0.15, 0.6])
+def test_tree_price_round_trips(CallOrPut, vol):
+    price = price_asian_crr(CallOrPut, vol=vol, tree__periods=8, **CONTRACT)
+    result = implied_vol_asian_crr(price, CallOrPut, tree__periods=8, **CONTRACT)
+
+    assert result["converged"]
+    assert result["vol"] == pytest.approx(vol, abs=1e-6)
+    assert price_asian_crr(CallOrPut, vol=result["vol"], tree__periods=8, **CONTRACT) == pytest.approx(price, abs=1e-8)
+    # the Levy seed leaves a few tree prices to bisection's dozens
+    assert result["iterations"] <= 10
+
+
+def test_quotes_outside_the_tree_prices_have_no_vol():
+    assert math.isnan(implied_vol_asian_crr(-1.0, "Call", tree__periods=6, **CONTRACT)["vol"])
+    result = implied_vol_asian_crr(150.0, "Call", tree__periods=6, **CONTRACT)
+    assert math.isnan(result["vol"]) and not result["converged"]
+
+
+def test_sheet_matches_the_quotes_one_by_one():
+    # low vols on in-the-money calls are left out: no path ends out of the money, so every vol gives the same price
+    vols = np.array([[0.15, 0.2, 0.3], [0.25, 0.15, 0.05]])
+    CallOrPut = np.array([["Call"] * 3, ["Put"] * 3])
+    K = np.array([90.0, 100.0, 110.0])
+    prices = np.vectorize(lambda c, k, v: price_asian_crr(c, 100, k, 0.05, 3, 0.1, v, 8))(CallOrPut, K, vols)
+
+    result = implied_vol_asian_crr_batch(prices, CallOrPut, 100, K, 0.05, 3, 0.1, 8)
+    assert result["vol"].shape == (2, 3) and result["converged"].all()
+    assert result["vol"] == pytest.approx(vols, abs=1e-6)
+    assert result["vol"][1, 2] == pytest.approx(implied_vol_asian_crr(prices[1, 2], "Put", 100, 110, 0.05, 3, 0.1,
+                                                                      8)["vol"], abs=1e-9)
@@ -0,0 +1,57 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import costModel
+import instrumentation
+from instrumentation import PeakAllocation
+
+
+@pytest.fixture(params=["reset_peak", "restart"])
+def tracing(request, monkeypatch):
+    # "restart" is the Python < 3.9 path, where tracemalloc has no reset_peak
+    if request.param == "restart" and hasattr(tracemalloc, "reset_peak"):
+        monkeypatch.delattr(tracemalloc, "reset_peak")
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def test_nested_peaks(tracing):
+    with PeakAllocation() as outer:
+        first = np.ones(2 ** 20)
+        del first
+        with PeakAllocation() as inner:
+            second = np.ones(2 ** 18)
+            del second
+
+    assert 2 ** 21 <= inner.peak_bytes < 2 ** 23 // 3
+    assert outer.peak_bytes >= 2 ** 23
+
+
+def test_phases_recorded(tracing, monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    metrics = instrumentation.PhaseMetrics()
+    monkeypatch.setattr(instrumentation, "metrics", metrics)
+
+    with instrumentation.phase("outer", 3):
+        with instrumentation.phase("inner", 3):
+            values = np.ones(2 ** 16)
+        del values
+
+    summary = metrics.summary()
+    assert summary["inner"]["3"]["count"] == 1
+    assert summary["outer"]["3"]["peak_bytes_max"] >= summary["inner"]["3"]["peak_bytes_max"] >= 2 ** 19
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_calibration_measures_memory(monkeypatch, enabled):
+    monkeypatch.setattr(instrumentation, "ENABLED", enabled)
+    monkeypatch.setattr(instrumentation, "metrics", instrumentation.PhaseMetrics())
+    wasTracing = tracemalloc.is_tracing()
+
+    seconds, peakBytes = costModel._measure("tree", 6, repeat=1)
+
+    assert seconds > 0 and peakBytes > 0
+    assert tracemalloc.is_tracing() == wasTracing
@@ -0,0 +1,38 @@
+import pytest
+
+from Asian_Option_CRR import lattice_nodes, price_asian_crr, price_asian_crr_batch, price_asian_crr_lattice
+
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+@pytest.mark.parametrize("tree__periods", [12, 16, 20])
+def test_error_falls_as_grid_points_grow(CallOrPut, tree__periods):
+    exact = price_asian_crr(CallOrPut, tree__periods=tree__periods, **INPUTS)
+    errors = [abs(price_asian_crr_lattice(CallOrPut, tree__periods=tree__periods, grid_points=m, **INPUTS) - exact)
+              for m in (100, 200, 400, 800)]
+    assert errors == sorted(errors, reverse=True)
+    assert errors[-1] < 1e-5
+
+
+# a band of 1.5 caps the grids from 12 periods on: the edge values used to bias the price by about 1e-2 at 20 periods
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+def test_capped_band_does_not_bias_the_price(CallOrPut):
+    exact = price_asian_crr(CallOrPut, tree__periods=20, **INPUTS)
+    price = price_asian_crr_lattice(CallOrPut, tree__periods=20, grid_points=400, band_width=1.5, **INPUTS)
+    assert abs(price - exact) < 1e-3
+
+
+def test_price_and_delta_match_the_tree():
+    price, delta = price_asian_crr_lattice("Call", tree__periods=10, grid_points=100, return_delta=True, **INPUTS)
+    treePrice, treeDelta = price_asian_crr_batch("Call", tree__periods=10, return_delta=True, **INPUTS)
+    assert price == pytest.approx(float(treePrice), abs=1e-3)
+    assert delta == pytest.approx(float(treeDelta), abs=1e-4)
+
+
+def test_pruned_nodes_do_not_change_the_price():
+    assert lattice_nodes(64) == 65 * 66 // 2
+    assert lattice_nodes(2000) < 2001 * 2002 // 8
+    assert price_asian_crr_lattice("Put", tree__periods=300, **INPUTS) == pytest.approx(
+        price_asian_crr_lattice("Put", tree__periods=300, node_width=50.0, **INPUTS), abs=1e-12)
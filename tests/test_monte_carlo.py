@@ -0,0 +1,58 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from Asian_Option_CRR import hedge_asian_crr, price_asian_crr, price_asian_crr_lattice
+from Asian_Option_MC import _geometric_crr_price, price_asian_mc
+from reference import crr_factors
+
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+def test_crr_price_is_within_four_standard_errors_of_the_tree(CallOrPut):
+    price, error, delta = price_asian_mc(CallOrPut, tree__periods=10, paths=20000, seed=1, **INPUTS)
+    treePrice = price_asian_crr(CallOrPut, tree__periods=10, **INPUTS)
+    treeDelta, treeCash = hedge_asian_crr(CallOrPut, tree__periods=10, **INPUTS)
+
+    assert 0 < error < 0.05
+    assert abs(price - treePrice) < 4 * error
+    assert delta == pytest.approx(treeDelta, abs=0.01)
+
+
+def test_gbm_price_is_near_a_deep_tree():
+    price, error, delta = price_asian_mc("Call", tree__periods=200, paths=20000, seed=2, dynamics="gbm", **INPUTS)
+    assert abs(price - price_asian_crr_lattice("Call", tree__periods=200, grid_points=200, **INPUTS)) < 4 * error + 0.02
+
+
+def test_control_variate_reduces_the_error():
+    plain = price_asian_mc("Call", tree__periods=10, paths=20000, seed=3, control_variate=False, **INPUTS)
+    controlled = price_asian_mc("Call", tree__periods=10, paths=20000, seed=3, **INPUTS)
+    assert controlled[1] < plain[1] / 5
+
+
+# the chunks have their own streams, so the results do not depend on where they run
+def test_results_depend_only_on_seed_paths_and_chunks():
+    arguments = dict(tree__periods=8, paths=5000, seed=4, max_chunk_bytes=2 ** 16, **INPUTS)
+    assert price_asian_mc("Put", workers=2, **arguments) == pytest.approx(price_asian_mc("Put", **arguments), rel=1e-12)
+    assert price_asian_mc("Put", **arguments) != price_asian_mc("Put", **dict(arguments, seed=5))
+
+
+@pytest.mark.parametrize("CallOrPut, phi", [("Call", 1), ("Put", -1)])
+def test_geometric_control_price_matches_the_paths(CallOrPut, phi):
+    tree__periods = 8
+    u, d, discFact, probUp = crr_factors(0.05, 3, 0.10, 0.15, tree__periods)
+    downs = np.array(list(itertools.product((0, 1), repeat=tree__periods)))
+    logs = np.log(100.0) + np.cumsum(np.where(downs == 1, np.log(d), np.log(u)), axis=1)
+    geometric = np.exp((np.log(100.0) + logs.sum(axis=1)) / (tree__periods + 1))
+    probabilities = np.prod(np.where(downs == 1, 1 - probUp, probUp), axis=1)
+    expected = discFact ** tree__periods * np.sum(probabilities * np.maximum(phi * (geometric - 100), 0))
+
+    assert _geometric_crr_price(phi, 100, 100, u, d, discFact, probUp, tree__periods) == pytest.approx(expected)
+
+
+def test_unknown_dynamics_are_rejected():
+    with pytest.raises(ValueError, match="dynamics"):
+        price_asian_mc("Call", tree__periods=4, dynamics="heston", **INPUTS)
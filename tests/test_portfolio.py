@@ -0,0 +1,27 @@
+import numpy as np
+
+from Asian_Option_CRR import price_asian_crr_batch
+from portfolioPricing import price_portfolio
+
+
+def test_portfolio_matches_the_batch_pricer_in_input_order():
+    rng = np.random.default_rng(1)
+    contracts = [{"CallOrPut": ["Call", "Put"][n % 2], "S": float(S), "K": 100.0, "rf": 0.05, "T": 3, "mu": 0.1,
+                  "vol": float(vol)}
+                 for n, (S, vol) in enumerate(zip(rng.uniform(80, 120, 25), rng.uniform(0.1, 0.4, 25)))]
+
+    prices, deltas, workerStats = price_portfolio(contracts, 6, workers=2, chunk_size=4)
+
+    columns = {field: np.array([contract[field] for contract in contracts]) for field in contracts[0]}
+    expectedPrices, expectedDeltas = price_asian_crr_batch(**columns, tree__periods=6, return_delta=True)
+    np.testing.assert_array_equal(prices, expectedPrices)
+    np.testing.assert_array_equal(deltas, expectedDeltas)
+    assert sum(stats["chunks"] for stats in workerStats.values()) == 7
+    assert sum(stats["contracts"] for stats in workerStats.values()) == 25
+
+
+def test_portfolio_takes_columns():
+    prices, deltas, workerStats = price_portfolio({"CallOrPut": "Put", "S": [90, 100, 110], "K": 100, "rf": 0.05,
+                                                   "T": 1, "mu": 0.1, "vol": 0.2}, 4, workers=1)
+    np.testing.assert_array_equal(prices, price_asian_crr_batch("Put", np.array([90, 100, 110]), 100, 0.05, 1, 0.1,
+                                                                0.2, 4))
@@ -0,0 +1,28 @@
+import pytest
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR, hedge_asian_crr, price_asian_crr
+from reference import path_delta, path_price
+
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+CASES = [("Call", INPUTS), ("Put", INPUTS), ("Call", dict(INPUTS, K=120, vol=0.4)), ("Put", dict(INPUTS, S=80, rf=0))]
+
+
+@pytest.mark.parametrize("CallOrPut, inputs", CASES)
+@pytest.mark.parametrize("tree__periods", [1, 3, 8])
+def test_price_and_hedge_match_the_paths(CallOrPut, inputs, tree__periods):
+    price = price_asian_crr(CallOrPut, tree__periods=tree__periods, **inputs)
+    delta, cash = hedge_asian_crr(CallOrPut, tree__periods=tree__periods, **inputs)
+
+    assert price == pytest.approx(path_price(CallOrPut, tree__periods=tree__periods, **inputs), rel=1e-12, abs=1e-12)
+    assert delta == pytest.approx(path_delta(CallOrPut, tree__periods=tree__periods, **inputs), rel=1e-10, abs=1e-12)
+    assert cash == pytest.approx(price - delta * inputs["S"], abs=1e-12)
+
+
+@pytest.mark.parametrize("CallOrPut, inputs", CASES)
+def test_price_and_hedge_match_the_tree_labels(CallOrPut, inputs):
+    nbrofshares, cash, portfolio, optionprice = RepStrat_Asian_Option_CRR(CallOrPut, tree__periods=5, **inputs)[:4]
+    delta, rootCash = hedge_asian_crr(CallOrPut, tree__periods=5, **inputs)
+
+    assert round(price_asian_crr(CallOrPut, tree__periods=5, **inputs), 2) == optionprice[0] == portfolio[0]
+    assert (round(delta, 2), round(rootCash, 2)) == (nbrofshares[0], cash[0])
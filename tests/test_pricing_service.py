@@ -0,0 +1,103 @@
+import threading
+
+import flask
+import pytest
+
+import resultCache
+from Asian_Option_CRR import price_asian_crr, price_asian_crr_batch
+from pricingService import MAX_BATCH, MicroBatcher, install_pricing_routes
+
+
+CONTRACT = {"CallOrPut": "Call", "S": 100, "K": 100, "rf": 0.05, "T": 3, "mu": 0.1, "vol": 0.15, "tree__periods": 6}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    resultCache.repStratCache.clear()
+    yield
+    resultCache.repStratCache.clear()
+
+
+def client(window_ms=0, max_batch=MAX_BATCH, **limits):
+    server = flask.Flask(__name__)
+    batcher = install_pricing_routes(server, MicroBatcher(window_ms=window_ms, max_batch=max_batch), **limits)
+    return server.test_client(), batcher
+
+
+def test_single_contract_is_priced_by_the_tree():
+    test, batcher = client()
+    response = test.post("/api/price", json=CONTRACT)
+
+    price, delta = price_asian_crr_batch(**CONTRACT, return_delta=True)
+    assert response.status_code == 200
+    assert response.get_json() == pytest.approx({"price": float(price), "delta": float(delta)})
+    assert response.get_json()["price"] == pytest.approx(price_asian_crr(**CONTRACT))
+    assert response.headers["X-Pricing-Cache-Hits"] == "0"
+
+    assert test.post("/api/price", json=CONTRACT).headers["X-Pricing-Cache-Hits"] == "1"
+
+
+def test_batch_keeps_the_order_and_prices_duplicates_once():
+    test, batcher = client()
+    contracts = [CONTRACT, dict(CONTRACT, CallOrPut="Put", K=110), CONTRACT, dict(CONTRACT, tree__periods=3)]
+    response = test.post("/api/price", json={"contracts": contracts})
+
+    results = response.get_json()["results"]
+    assert [result["price"] for result in results] == pytest.approx([price_asian_crr(**c) for c in contracts])
+    assert batcher.stats()["contracts"] == 3
+
+
+@pytest.mark.parametrize("body, message", [
+    (dict(CONTRACT, CallOrPut="Straddle"), "CallOrPut"),
+    (dict(CONTRACT, vol=-0.1), "positive"),
+    (dict(CONTRACT, tree__periods=100), "tree__periods"),
+    ({"S": 100}, "missing fields"),
+    ({"contracts": []}, "contracts"),
+])
+def test_invalid_requests_get_a_400(body, message):
+    test, batcher = client()
+    response = test.post("/api/price", json=body)
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+# what a gunicorn worker with --threads sees: concurrent requests within one window share an engine call
+def test_concurrent_requests_are_batched():
+    test, batcher = client(window_ms=200)
+    responses = []
+
+    def post(K):
+        responses.append(test.post("/api/price", json=dict(CONTRACT, K=K)))
+
+    threads = [threading.Thread(target=post, args=(K,)) for K in (90, 95, 100, 105)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert max(int(response.headers["X-Pricing-Batch-Size"]) for response in responses) > 1
+    assert batcher.stats()["batches"] < 4
+
+
+@pytest.mark.parametrize("window_ms", [0, 50])
+def test_large_requests_are_priced_in_batches_of_max_batch(window_ms):
+    test, batcher = client(window_ms=window_ms, max_batch=4)
+    contracts = [dict(CONTRACT, K=K) for K in range(90, 100)]
+    response = test.post("/api/price", json={"contracts": contracts})
+
+    results = response.get_json()["results"]
+    assert [result["price"] for result in results] == pytest.approx([price_asian_crr(**c) for c in contracts])
+    assert response.headers["X-Pricing-Batch-Size"] == "4"
+    assert batcher.stats()["batches"] == 3
+
+
+# 2**6 leaves per distinct contract
+def test_requests_over_the_leaves_budget_get_a_400():
+    test, batcher = client(max_leaves=2 ** 7)
+    assert test.post("/api/price", json={"contracts": [CONTRACT] * 5}).status_code == 200
+
+    response = test.post("/api/price", json={"contracts": [dict(CONTRACT, K=K) for K in (90, 95, 100)]})
+    assert response.status_code == 400
+    assert "tree leaves" in response.get_json()["error"]
+    assert batcher.stats()["contracts"] == 1
@@ -0,0 +1,40 @@
+import pytest
+
+import resultCache
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Array
+from resultCache import LRUCache, cached_rep_strat, normalize_inputs
+
+
+INPUTS = ("Call", 100, 100, 0.05, 3, 0.1, 0.15, 4)
+
+
+@pytest.fixture
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(resultCache, "repStratCache", LRUCache())
+    monkeypatch.setattr(resultCache, "sharedTreeCache", None)
+    return resultCache.repStratCache
+
+
+def test_slider_values_are_normalized_to_their_steps():
+    assert normalize_inputs("Call", 100, 100, 0.05000000001, 3.1, 0.1, 0.1499, 4) == normalize_inputs(*INPUTS)
+    assert normalize_inputs("Call", 100, 100, 0.06, 3, 0.1, 0.15, 4) != normalize_inputs(*INPUTS)
+
+
+def test_cached_result_is_the_tree_and_a_hit_the_second_time(empty_cache):
+    result = cached_rep_strat(*INPUTS)
+    assert result == RepStrat_Asian_Option_CRR_Array(*normalize_inputs(*INPUTS))
+    assert cached_rep_strat("Call", 100, 100, 0.0500001, 3, 0.1, 0.15, 4) is result
+    assert (empty_cache.hits, empty_cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = LRUCache(max_bytes=300)
+    for key in "abc":
+        cache.put(key, key, size=100)
+    cache.get("a")
+    cache.put("d", "d", size=100)
+
+    assert cache.get("b") is None and cache.get("a") == "a"
+    assert cache.stats()["bytes"] == 300 and cache.evictions == 1
+    cache.put("huge", "huge", size=301)
+    assert cache.get("huge") is None
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Array
+from sharedCache import SharedTreeCache
+from storeEncoding import encode_rep_strat
+
+
+def key(S, tree__periods=4):
+    return ("Call", float(S), 100.0, 0.05, 3.0, 0.1, 0.15, tree__periods)
+
+
+def result(S, tree__periods=4):
+    return RepStrat_Asian_Option_CRR_Array(*key(S, tree__periods))
+
+
+def test_round_trip(tmp_path):
+    cache = SharedTreeCache(str(tmp_path), 2 ** 20)
+    assert cache.get(key(100)) is None
+
+    computed = result(100)
+    cache.put(key(100), computed)
+    cached = cache.get(key(100))
+
+    assert len(cached) == len(computed)
+    for label, expected in zip(cached[:6], computed[:6]):
+        assert isinstance(label, np.memmap)
+        assert label.tolist() == expected
+    assert cached[6:10] == computed[6:10]
+    assert cached[10:] == tuple(float(x) for x in computed[10:])
+    assert encode_rep_strat(cached, 4) == encode_rep_strat(computed, 4)
+
+
+def test_evicted_entry_stays_readable_while_mapped(tmp_path):
+    cache = SharedTreeCache(str(tmp_path), 2 ** 20)
+    cache.put(key(100), result(100))
+    cached = cache.get(key(100))
+
+    cache.max_bytes = 0
+    cache.evict()
+    assert cache.get(key(100)) is None
+    assert cached[3].tolist() == result(100)[3]
+
+
+def test_directory_is_scanned_only_when_over_the_limit(tmp_path, monkeypatch):
+    entryBytes = 6 * 31 * 8
+    cache = SharedTreeCache(str(tmp_path), 10 * entryBytes)
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or entries())
+
+    for S in range(90, 120):
+        cache.put(key(S), result(S))
+
+    # one scan on the first put, then one each time the running total goes over 10 entries (down to 7)
+    assert len(scans) == 1 + (30 - 10 + 2) // 4
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    assert cache._bytes == cache.stats()["bytes"]
+    assert cache.get(key(119)) is not None and cache.get(key(90)) is None
+
+
+def test_other_workers_entries_are_counted_at_the_next_scan(tmp_path):
+    entryBytes = 6 * 31 * 8
+    cache = SharedTreeCache(str(tmp_path), 10 * entryBytes)
+    other = SharedTreeCache(str(tmp_path), 10 * entryBytes)
+
+    cache.put(key(100), result(100))
+    for S in range(101, 112):
+        other.put(key(S), result(S))
+    assert cache._bytes == entryBytes
+
+    cache.evict()
+    assert cache._bytes == other._bytes <= cache.max_bytes
+
+
+@pytest.mark.parametrize("tree__periods", [1, 6])
+def test_layout_comes_from_the_number_of_periods(tmp_path, tree__periods):
+    cache = SharedTreeCache(str(tmp_path), 2 ** 20)
+    cache.put(key(100, tree__periods), result(100, tree__periods))
+    assert cache.get(key(100, tree__periods))[6:10] == result(100, tree__periods)[6:10]
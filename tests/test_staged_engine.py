@@ -0,0 +1,55 @@
+import pytest
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Array
+from stagedEngine import StagedRepStrat, total_steps
+
+
+INPUTS = dict(CallOrPut="Call", S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15, tree__periods=5)
+
+# one input moved at a time, as the sliders do, with the stages each change reruns
+CHANGES = [({}, {"layout", "forward", "payoff", "backward", "replication"}),
+           ({"K": 105}, {"payoff", "backward", "replication"}),
+           ({"CallOrPut": "Put"}, {"payoff", "backward", "replication"}),
+           ({"rf": 0.02}, {"backward", "replication"}),
+           ({"vol": 0.3}, {"forward", "payoff", "backward", "replication"}),
+           ({"S": 90}, {"forward", "payoff", "backward", "replication"}),
+           ({"tree__periods": 4}, {"layout", "forward", "payoff", "backward", "replication"}),
+           ({}, set())]
+
+
+def test_each_change_reruns_only_its_stages_and_matches_the_array_engine():
+    engine = StagedRepStrat()
+    inputs = dict(INPUTS)
+    for change, stages in CHANGES:
+        inputs.update(change)
+        runs = engine.stats()["runs"]
+
+        result = engine.compute(**inputs)
+
+        assert {name for name, count in engine.stats()["runs"].items() if count > runs[name]} == stages
+        expected = RepStrat_Asian_Option_CRR_Array(**inputs)
+        assert len(result) == len(expected)
+        for item, expectedItem in zip(result, expected):
+            assert list(item) == list(expectedItem) if isinstance(expectedItem, list) else item == expectedItem
+
+
+def test_interrupted_run_keeps_the_previous_stages():
+    engine = StagedRepStrat()
+    engine.compute(**INPUTS)
+    calls = []
+
+    def cancel():
+        calls.append(1)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        engine.compute(**dict(INPUTS, vol=0.3), on_level=cancel)
+    assert engine.compute(**dict(INPUTS, vol=0.3))[3] == RepStrat_Asian_Option_CRR_Array(**dict(INPUTS, vol=0.3))[3]
+    assert engine.compute(**INPUTS)[0] == RepStrat_Asian_Option_CRR_Array(**INPUTS)[0]
+
+
+def test_full_run_reports_every_step():
+    calls = []
+    StagedRepStrat().compute(**INPUTS, on_level=lambda: calls.append(1))
+    assert len(calls) == total_steps(5)
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+import warnings
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    import app
+
+
+# scipy.special is loaded by the first analytic price, not by the workers' import of the app
+def test_import_does_not_load_scipy():
+    code = "import sys, warnings; warnings.simplefilter('ignore'); import app; print('scipy' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    assert output.split()[-1] == "False"
+
+
+def test_logos_are_served_as_assets():
+    client = app.server.test_client()
+    layout = client.get("/_dash-layout").get_data(as_text=True)
+    assert "data:image" not in layout
+    assert client.get(app.logo1path).status_code == 200
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Array, RepStrat_Asian_Option_CRR_Bands
+from sharedCache import LABEL_FIELDS
+from storeEncoding import decode_factors, decode_labels, decode_layout, encode_bands, encode_rep_strat
+
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+@pytest.mark.parametrize("S", [100, 2e7])
+def test_labels_round_trip_through_json(S):
+    result = RepStrat_Asian_Option_CRR_Array("Call", **dict(INPUTS, S=S, K=S), tree__periods=5)
+    data = json.loads(json.dumps(encode_rep_strat(result, 5)))
+
+    for name, label in zip(LABEL_FIELDS, result[:6]):
+        assert decode_labels(data, name) == label
+    assert decode_layout(data) == tuple(result[6:10])
+    assert decode_factors(data) == tuple(result[10:])
+
+
+def test_large_prices_fall_back_to_float64():
+    result = RepStrat_Asian_Option_CRR_Array("Call", **dict(INPUTS, S=2e7, K=2e7), tree__periods=3)
+    assert encode_rep_strat(result, 3)["arrays"]["stocks"]["dtype"] == "float64"
+    result = RepStrat_Asian_Option_CRR_Array("Call", tree__periods=3, **INPUTS)
+    assert encode_rep_strat(result, 3)["arrays"]["stocks"]["dtype"] == "float32"
+
+
+def test_bands_have_one_entry_per_level():
+    data = encode_bands(RepStrat_Asian_Option_CRR_Bands("Put", tree__periods=7, **INPUTS), 7)
+    assert set(data["bands"]) == set(LABEL_FIELDS)
+    assert all(len(band) == 3 and all(len(level) == 8 for level in band) for band in data["bands"].values())
@@ -0,0 +1,21 @@
+import pytest
+
+from Asian_Option_CRR import price_asian_crr, price_asian_crr_streaming
+from reference import path_price
+
+
+INPUTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+
+
+# 1 KiB holds subtrees of 5 periods: the trees are cut at level tree__periods - 5 (or not at all)
+@pytest.mark.parametrize("CallOrPut", ["Call", "Put"])
+@pytest.mark.parametrize("tree__periods", [1, 5, 8, 12])
+def test_cut_trees_match_the_paths(CallOrPut, tree__periods):
+    price = price_asian_crr_streaming(CallOrPut, tree__periods=tree__periods, max_memory_bytes=2 ** 10, **INPUTS)
+    assert price == pytest.approx(path_price(CallOrPut, tree__periods=tree__periods, **INPUTS), rel=1e-12)
+
+
+def test_memory_limit_does_not_change_the_price():
+    prices = [price_asian_crr_streaming("Put", tree__periods=14, max_memory_bytes=limit, **dict(INPUTS, K=110))
+              for limit in (0, 2 ** 8, 2 ** 12, 2 ** 30)]
+    assert prices == pytest.approx([price_asian_crr("Put", tree__periods=14, **dict(INPUTS, K=110))] * 4, rel=1e-12)
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import Asian_Option_CRR
+import treeKernels
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def level():
+    rng = np.random.default_rng(0)
+    stock = rng.uniform(50, 150, 64)
+    return stock, stock + rng.uniform(0, 1000, 64), rng.uniform(0, 50, 128), rng.uniform(0, 50, 64)
+
+
+def test_compiled_steps_match_the_numpy_steps_to_the_last_bit(level):
+    pytest.importorskip("numba")
+    if not treeKernels.ENABLED:
+        pytest.skip("ASIAN_NUMBA=0")
+    stock, cumsum, children, portfolio = level
+    u, d, growth = 1.0838, 0.9607, 1.0125
+
+    forward = treeKernels.forward_step(stock, cumsum, u, d)
+    assert all(np.array_equal(a, b) for a, b in zip(forward, Asian_Option_CRR._numpy_forward_step(stock, cumsum, u, d)))
+    assert np.array_equal(treeKernels.backward_step(children, 0.99, 0.6, 0.4),
+                          Asian_Option_CRR._numpy_backward_step(children, 0.99, 0.6, 0.4))
+    replication = treeKernels.replication_step(stock, forward[0], portfolio, children, u, d, growth)
+    expected = Asian_Option_CRR._numpy_replication_step(stock, forward[0], portfolio, children, u, d, growth)
+    assert all(np.array_equal(a, b) for a, b in zip(replication, expected))
+
+
+def test_steps_fall_back_to_numpy():
+    code = "import Asian_Option_CRR as m, treeKernels; print(treeKernels.ENABLED, m._forward_step is m._numpy_forward_step)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT,
+                            env=dict(os.environ, ASIAN_NUMBA="0")).stdout
+    assert output.split() == ["False", "True"]
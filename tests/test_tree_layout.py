@@ -0,0 +1,47 @@
+import pytest
+
+from treeLayout import cached_tree_layout, tree_layout
+
+
+# the layout the app used to build from a networkx graph of the tree (as in benchmarks/bench_layout.py)
+def networkx_layout(tree__periods):
+    nx = pytest.importorskip("networkx")
+
+    G_Stock = nx.Graph()
+    for i in range(0, tree__periods):
+        for j in range(1, (2 ** i) + 1):
+            G_Stock.add_edge((i, j), (i + 1, 2 * j - 1))
+            G_Stock.add_edge((i, j), (i + 1, 2 * j))
+
+    pos = {}
+    count = tree__periods
+    for node in G_Stock.nodes():
+        pos[node] = (node[0], tree__periods + 2 + node[0] - (2 + count) * node[1])
+        count += 1
+
+    edge_x, edge_y = [], []
+    for edge in G_Stock.edges():
+        x0, y0 = pos[edge[0]]
+        x1, y1 = pos[edge[1]]
+        edge_x += [x0, x1, None]
+        edge_y += [y0, y1, None]
+
+    node_x = [pos[node][0] for node in pos]
+    node_y = [pos[node][1] for node in pos]
+    return edge_x, edge_y, node_x, node_y
+
+
+@pytest.mark.parametrize("tree__periods", [1, 2, 5, 9])
+def test_closed_form_matches_networkx(tree__periods):
+    assert tree_layout(tree__periods) == networkx_layout(tree__periods)
+
+
+def test_coordinates_are_plain_ints():
+    edge_x, edge_y, node_x, node_y = tree_layout(3)
+    assert all(type(x) is int for x in node_x + node_y)
+    assert all(x is None or type(x) is int for x in edge_x + edge_y)
+
+
+def test_cached_layout_is_the_same_layout():
+    assert cached_tree_layout(6) == tuple(tree_layout(6))
+    assert cached_tree_layout(6) is cached_tree_layout(6)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+import resultCache
+from Asian_Option_CRR import RepStrat_Asian_Option_CRR_Array
+from resultCache import LRUCache, cached_rep_strat
+from sharedCache import SharedTreeCache
+from warmup import SLIDER_VALUES, warm_cache, warmup_inputs
+
+
+@pytest.fixture
+def caches(monkeypatch, tmp_path):
+    monkeypatch.setattr(resultCache, "repStratCache", LRUCache())
+    monkeypatch.setattr(resultCache, "sharedTreeCache", SharedTreeCache(str(tmp_path), 2 ** 30))
+    return resultCache.repStratCache, resultCache.sharedTreeCache
+
+
+def test_star_moves_one_slider_at_a_time():
+    keys = warmup_inputs("star", tree_periods=(3, 4))
+    # the default position of each slider is the same key
+    perOption = sum(len(values) for values in SLIDER_VALUES.values()) - (len(SLIDER_VALUES) - 1)
+    assert len(keys) == 2 * 2 * perOption
+    assert ("Call", 100.0, 100.0, 0.05, 3.0, 0.1, 0.15, 3) in keys
+    with pytest.raises(ValueError):
+        warmup_inputs("grid")
+
+
+def test_warmed_entries_are_hits_with_the_tree(caches):
+    repStratCache, sharedTreeCache = caches
+    keys = warmup_inputs("star", tree_periods=(3,))[:20]
+
+    report = warm_cache(keys, workers=2)
+
+    assert report["entries"] == 20 and repStratCache.stats()["entries"] == 20
+    assert sharedTreeCache.stats()["entries"] == 20
+    for key in keys[:3]:
+        result = cached_rep_strat(*key)
+        expected = RepStrat_Asian_Option_CRR_Array(*key)
+        assert [np.asarray(item).tolist() for item in result[:6]] == list(expected[:6])
+    assert repStratCache.hits == 3
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+
+#######################################################################################################################
+### Compiled kernels for the tree passes (optional)
+###
+### When numba is installed, the per-level steps of the forward pass (stock prices and running sums), of the
+### backward induction and of the replication pass are compiled loops over the nodes of the level instead of numpy
+### expressions over strided slices. Asian_Option_CRR picks them at import time and falls back to its numpy steps
+### otherwise, or when ASIAN_NUMBA=0.
+###
+### Each node does the same floating-point operations in the same order as the numpy steps (no fastmath), so both
+### give the same results to the last bit.
+###
+### Kernels are compiled with cache=True: the machine code is written next to this file, or under NUMBA_CACHE_DIR,
+### and later processes (gunicorn workers, pool workers) load it instead of compiling again. Point NUMBA_CACHE_DIR
+### to a writable directory when the app directory is read-only.
+#######################################################################################################################
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+ENABLED = numba is not None and os.environ.get("ASIAN_NUMBA", "1") != "0"
+
+
+if ENABLED:
+    @numba.njit(cache=True)
+    def forward_step(stock, cumsum, u, d):
+        nextStock = np.empty(2 * stock.size)
+        nextSum = np.empty(2 * stock.size)
+        for j in range(stock.size):
+            nextStock[2 * j] = stock[j] * u
+            nextStock[2 * j + 1] = stock[j] * d
+            nextSum[2 * j] = nextStock[2 * j] + cumsum[j]
+            nextSum[2 * j + 1] = nextStock[2 * j + 1] + cumsum[j]
+        return nextStock, nextSum
+
+    @numba.njit(cache=True)
+    def backward_step(children, discFact, probUp, probDown):
+        values = np.empty(children.size // 2)
+        for j in range(values.size):
+            values[j] = discFact * (probUp * children[2 * j] + probDown * children[2 * j + 1])
+        return values
+
+    @numba.njit(cache=True)
+    def replication_step(stock, nextStock, portfolio, children, u, d, growth):
+        shares = np.empty(stock.size)
+        cash = np.empty(stock.size)
+        nextPortfolio = np.empty(2 * stock.size)
+        for j in range(stock.size):
+            shares[j] = (children[2 * j] - children[2 * j + 1]) / ((u - d) * stock[j])
+            cash[j] = portfolio[j] - shares[j] * stock[j]
+            nextPortfolio[2 * j] = cash[j] * growth + shares[j] * nextStock[2 * j]
+            nextPortfolio[2 * j + 1] = cash[j] * growth + shares[j] * nextStock[2 * j + 1]
+        return shares, cash, nextPortfolio
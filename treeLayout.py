@@ -0,0 +1,55 @@
+from functools import lru_cache
+
+import numpy as np
+
+#######################################################################################################################
+### Tree layout
+###
+### Coordinates of the nodes and edges of the binary path tree, computed from the node indices instead of walking a
+### networkx graph. Nodes are numbered breadth-first: node j (1-based) of level i has index k = 2**i - 1 + j - 1, and
+### the children of node k are nodes 2k+1 (up) and 2k+2 (down). Node (i, j) is drawn at
+###
+###     x = i,    y = tree__periods + 2 + i - (2 + tree__periods + k) * j
+###
+### which is the position the app has always used. Edges come parent by parent, up child first.
+#######################################################################################################################
+
+def node_indices(tree__periods):
+    k = np.arange(2 ** (tree__periods + 1) - 1)
+    level = np.repeat(np.arange(tree__periods + 1), 2 ** np.arange(tree__periods + 1))
+    j = k - (2 ** level - 1) + 1
+    return level, j, k
+
+
+# (2, nodes) array of x and y, breadth-first
+def node_coordinates(tree__periods):
+    level, j, k = node_indices(tree__periods)
+
+    coordinates = np.empty((2, k.size), dtype=np.int64)
+    coordinates[0] = level
+    coordinates[1] = tree__periods + 2 + level - (2 + tree__periods + k) * j
+    return coordinates
+
+
+# (2, edges, 3) array of [parent, child, None] segments for x and y, ready to be flattened into plotly line traces
+def edge_segments(coordinates):
+    children = np.arange(1, coordinates.shape[1])
+    parents = (children - 1) // 2
+
+    segments = np.full((2, children.size, 3), None, dtype=object)
+    segments[:, :, 0] = coordinates[:, parents]
+    segments[:, :, 1] = coordinates[:, children]
+    return segments
+
+
+# edge_x, edge_y, node_x, node_y lists as returned by the replication strategy engines
+def tree_layout(tree__periods):
+    coordinates = node_coordinates(tree__periods)
+    segments = edge_segments(coordinates)
+    return segments[0].ravel().tolist(), segments[1].ravel().tolist(), coordinates[0].tolist(), coordinates[1].tolist()
+
+
+# the same lists for every tree of tree__periods periods: callers must not modify them
+@lru_cache(maxsize=16)
+def cached_tree_layout(tree__periods):
+    return tree_layout(tree__periods)
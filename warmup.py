@@ -0,0 +1,92 @@
+import argparse
+import itertools
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import resultCache
+from resultCache import normalize_inputs
+
+#######################################################################################################################
+### Cache warm-up
+###
+### Precomputes the replication strategy over the slider positions of the app and loads the results into the
+### result cache (and into the shared on-disk cache when ASIAN_SHARED_CACHE_DIR is set), so that first hits on common
+### slider positions are cache hits.
+###
+###   "star": every position of one slider at a time, the others at their default, for calls and puts
+###   "full": the cartesian product of all slider positions, for calls and puts
+###
+### Run at app startup with ASIAN_WARMUP=star|full, or standalone (useful with a shared cache directory):
+###   python warmup.py --mode star --periods 3 4 --workers 8
+#######################################################################################################################
+
+# defaults and ranges of the app inputs (see the Input tab of app.py); vol=0 is left out, the tree is degenerate there
+DEFAULTS = dict(S=100, K=100, rf=0.05, T=3, mu=0.10, vol=0.15)
+SLIDER_VALUES = {"rf": np.arange(0, 0.1001, 0.01),
+                 "T": np.arange(0.25, 5.001, 0.25),
+                 "mu": np.arange(-0.30, 0.3001, 0.01),
+                 "vol": np.arange(0.01, 0.5001, 0.01)}
+
+
+def warmup_inputs(mode="star", tree_periods=(3,), S=DEFAULTS["S"], K=DEFAULTS["K"]):
+    defaults = dict(DEFAULTS, S=S, K=K)
+    keys = set()
+
+    for CallOrPut, tree__periods in itertools.product(("Call", "Put"), tree_periods):
+        if mode == "star":
+            for slider, values in SLIDER_VALUES.items():
+                for value in values:
+                    inputs = dict(defaults, **{slider: value})
+                    keys.add(normalize_inputs(CallOrPut, tree__periods=tree__periods, **inputs))
+        elif mode == "full":
+            for rf, T, mu, vol in itertools.product(*SLIDER_VALUES.values()):
+                keys.add(normalize_inputs(CallOrPut, S, K, rf, T, mu, vol, tree__periods))
+        else:
+            raise ValueError(f"mode must be 'star' or 'full', got {mode!r}")
+
+    return sorted(keys)
+
+
+def _compute(key):
+    sharedTreeCache = resultCache.sharedTreeCache
+    result = sharedTreeCache.get(key) if sharedTreeCache is not None else None
+    if result is None:
+        # keys come sorted and in chunks, so consecutive keys of a worker mostly differ in one input
+        result = resultCache.stagedRepStrat.compute(*key)
+        if sharedTreeCache is not None:
+            sharedTreeCache.put(key, result)
+    return key, result
+
+
+# returns how many entries were warmed, how long it took, what the cache holds and the peak RSS of this process
+def warm_cache(keys, workers=None):
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for key, result in executor.map(_compute, keys, chunksize=16):
+            resultCache.repStratCache.put(key, result)
+
+    return {"entries": len(keys),
+            "seconds": time.perf_counter() - start,
+            "cache_bytes": resultCache.repStratCache.stats()["bytes"],
+            "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+
+
+def format_report(report):
+    return (f"warm-up: {report['entries']} entries in {report['seconds']:.2f}s, "
+            f"cache holds {report['cache_bytes'] / 2 ** 20:.1f} MB, peak RSS {report['peak_rss_bytes'] / 2 ** 20:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=("star", "full"), default="star")
+    parser.add_argument("--periods", nargs="*", type=int, default=[3])
+    parser.add_argument("--S", type=float, default=DEFAULTS["S"])
+    parser.add_argument("--K", type=float, default=DEFAULTS["K"])
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print(format_report(warm_cache(warmup_inputs(args.mode, args.periods, args.S, args.K), args.workers)))